@@ -0,0 +1,105 @@
+"""指标计算后端性能基准
+
+对比 pandas 后端（rolling/ewm）与 NumPy 后端（indicator_kernels）在不同K线数量、
+不同指标组合下的单次计算耗时，并校验两者结果在容差范围内一致。
+
+运行方式（在项目根目录）：
+    python benchmarks/bench_indicator_backends.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from technical_indicators import (  # noqa: E402
+    create_indicator_graph, calculate_mfi, _indicator_columns
+)
+
+SIZES = [200, 500, 2_000, 5_000]
+INDICATOR_SETS = {
+    "rsi": ["rsi"],
+    "atr": ["atr"],
+    "boll": ["boll"],
+    "vwma": ["vwma"],
+    "mfi": ["mfi"],
+    "all": ["close_50_sma", "close_200_sma", "close_10_ema", "macd", "rsi", "boll", "atr", "vwma", "mfi"],
+}
+
+# 结果容差：pandas 的滚动方差是在线算法，价格不变的窗口会残留约1e-6的标准差，
+# NumPy 内核按两遍法计算得到0，因此绝对容差取1e-5
+RTOL = 1e-9
+ATOL = 1e-5
+
+
+def make_daily(n: int) -> pd.DataFrame:
+    """生成日K线（含停牌式的连续相同价格和零成交量）"""
+    rng = np.random.default_rng(1)
+    close = np.round(100 + np.cumsum(rng.normal(0, 1, n)), 2)
+    close[n // 3:n // 3 + 30] = close[n // 3]
+    volume = rng.integers(0, 100_000, n)
+    volume[n // 3:n // 3 + 30] = 0
+    return pd.DataFrame({
+        "time": 946_684_800 + 86_400 * np.arange(n),
+        "open": np.round(close + rng.normal(0, 0.5, n), 2),
+        "high": np.round(close + rng.random(n) * 2, 2),
+        "low": np.round(close - rng.random(n) * 2, 2),
+        "close": close,
+        "volume": volume
+    })
+
+
+def compute(df: pd.DataFrame, indicators: list, backend: str) -> list:
+    """用指定后端计算一组指标，返回各输出列"""
+    graph = create_indicator_graph(df, backend)
+    columns = []
+    for indicator in indicators:
+        if indicator == "mfi":
+            columns.append(calculate_mfi(graph))
+        else:
+            columns.extend(series for _, series, _ in _indicator_columns(graph, indicator))
+    return [np.asarray(column, dtype=np.float64) for column in columns]
+
+
+def timed(df: pd.DataFrame, indicators: list, backend: str, repeat: int) -> float:
+    """平均单次计算耗时（秒）"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        compute(df, indicators, backend)
+    return (time.perf_counter() - started) / repeat
+
+
+def max_error(expected: list, actual: list) -> float:
+    """校验结果一致，返回最大绝对误差"""
+    error = 0.0
+    for a, b in zip(expected, actual):
+        if not np.array_equal(np.isnan(a), np.isnan(b)):
+            raise AssertionError("两种后端的NaN位置不一致")
+        if not np.allclose(a, b, rtol=RTOL, atol=ATOL, equal_nan=True):
+            raise AssertionError("两种后端的结果超出容差")
+        valid = ~np.isnan(a)
+        if valid.any():
+            error = max(error, float(np.max(np.abs(a[valid] - b[valid]))))
+    return error
+
+
+def main() -> None:
+    print(f"{'bars':>8}{'indicators':>12}{'pandas (us)':>14}{'numpy (us)':>13}{'speedup':>10}{'max err':>12}")
+    for size in SIZES:
+        df = make_daily(size)
+        repeat = max(20, 200_000 // size)
+        for name, indicators in INDICATOR_SETS.items():
+            error = max_error(compute(df, indicators, "pandas"), compute(df, indicators, "numpy"))
+            pandas_time = timed(df, indicators, "pandas", repeat)
+            numpy_time = timed(df, indicators, "numpy", repeat)
+            print(
+                f"{size:>8}{name:>12}{pandas_time * 1e6:>14.1f}{numpy_time * 1e6:>13.1f}"
+                f"{pandas_time / numpy_time:>9.1f}x{error:>12.1e}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""JSON编解码性能基准
+
+- /api/kline 响应序列化（5000根K线）：
+  FastAPI默认路径（jsonable_encoder 逐项转换后用标准库 json 渲染）对比
+  直接返回 FastJSONResponse（json_codec.dumps）
+- 上游K线响应解析（5000根K线）：response.json()（先解码为字符串）对比 json_codec.loads(response.content)
+
+运行方式（在项目根目录）：
+    python benchmarks/bench_json_codec.py
+"""
+import json
+import os
+import sys
+import time
+
+import httpx
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_codec  # noqa: E402
+from kline_bars import KlineBars  # noqa: E402
+from main import build_kline_rows  # noqa: E402
+
+BARS = 5_000
+REPEAT = 20
+
+
+def make_bars(n: int) -> KlineBars:
+    """生成日K线"""
+    rng = np.random.default_rng(1)
+    close = np.round(100 + np.cumsum(rng.normal(0, 1, n)), 3)
+    return KlineBars(
+        time=946_684_800 + 86_400 * np.arange(n),
+        open=close, high=close + 1, low=close - 1, close=close,
+        volume=rng.integers(0, 100_000, n)
+    )
+
+
+def make_upstream_payload(bars: KlineBars) -> bytes:
+    """生成上游 api-quote-kline 响应体"""
+    items = [
+        {"k": int(t), "o": float(c), "c": float(c), "h": float(c) + 1, "l": float(c) - 1, "v": int(v)}
+        for t, c, v in zip(bars.time, bars.close, bars.volume)
+    ]
+    return json.dumps({"code": 0, "data": {"list": items}}).encode("utf-8")
+
+
+def timed(func, *args) -> float:
+    """平均单次耗时（秒）"""
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        func(*args)
+    return (time.perf_counter() - started) / REPEAT
+
+
+def render_default(result: dict) -> bytes:
+    """FastAPI默认路径：jsonable_encoder + JSONResponse"""
+    return JSONResponse(jsonable_encoder(result)).body
+
+
+def render_fast(result: dict) -> bytes:
+    """直接返回 FastJSONResponse"""
+    return json_codec.FastJSONResponse(result).body
+
+
+def parse_text(content: bytes) -> dict:
+    """response.json() 的等价实现"""
+    return httpx.Response(200, content=content).json()
+
+
+def main() -> None:
+    bars = make_bars(BARS)
+    rows = build_kline_rows(bars, None, "US", True)
+    result = {"meta": {"symbol": "BENCH", "interval": "daily", "data_points": len(rows)}, "data": rows}
+    if json.loads(render_default(result)) != json.loads(render_fast(result)):
+        raise AssertionError("两种序列化结果不一致")
+
+    payload = make_upstream_payload(bars)
+    if parse_text(payload) != json_codec.loads(payload):
+        raise AssertionError("两种解析结果不一致")
+
+    print(f"JSON backend: {json_codec.JSON_BACKEND}, {BARS} bars")
+    default_time = timed(render_default, result)
+    fast_time = timed(render_fast, result)
+    print(f"{'kline response (ms)':<28}{'default':>10}{'codec':>10}{'speedup':>10}")
+    print(f"{'':<28}{default_time * 1000:>10.2f}{fast_time * 1000:>10.2f}{default_time / fast_time:>9.1f}x")
+
+    text_time = timed(parse_text, payload)
+    codec_time = timed(json_codec.loads, payload)
+    print(f"{'upstream parse (ms)':<28}{'json()':>10}{'codec':>10}{'speedup':>10}")
+    print(f"{'':<28}{text_time * 1000:>10.2f}{codec_time * 1000:>10.2f}{text_time / codec_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""K线解析性能基准
+
+对比逐条循环解析（原 main.get_kline / get_technical_analysis 中的写法）
+与 kline_bars.parse_kline_list 向量化解析在 1万~10万 条K线上的耗时，并校验两者结果一致。
+
+运行方式（在项目根目录）：
+    python benchmarks/bench_kline_normalizer.py
+"""
+import os
+import random
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kline_bars import parse_kline_list  # noqa: E402
+
+SIZES = [10_000, 50_000, 100_000]
+REPEAT = 5
+
+
+def make_daily(n: int) -> list:
+    """生成日K格式数据（k/o/c/h/l/v）"""
+    rng = random.Random(1)
+    price = 100.0
+    items = []
+    for i in range(n):
+        open_price = price
+        price = max(1.0, price * (1 + rng.gauss(0, 0.02)))
+        items.append({
+            "k": 1_500_000_000 + i * 86400,
+            "o": round(open_price, 3),
+            "c": round(price, 3),
+            "h": round(max(open_price, price) * 1.01, 3),
+            "l": round(min(open_price, price) * 0.99, 3),
+            "v": rng.randint(1000, 99999)
+        })
+    return items
+
+
+def make_minute(n: int) -> list:
+    """生成分时格式数据（time/price/open/high/low/volume，价格为原始整数）"""
+    rng = random.Random(2)
+    price = 100.0
+    items = []
+    for i in range(n):
+        open_price = price
+        price = max(1.0, price * (1 + rng.gauss(0, 0.001)))
+        items.append({
+            "time": 1_700_000_000 + i * 60,
+            "price": int(price * 10000),
+            "open": int(open_price * 10000) if i % 50 else 0,
+            "high": int(max(open_price, price) * 10000),
+            "low": int(min(open_price, price) * 10000),
+            "volume": rng.randint(10, 999)
+        })
+    return items
+
+
+def _loop_price(item: dict, cc_key: str, short_key: str, raw_key: str) -> float:
+    """逐条解析的参考实现（单个价格字段）"""
+    value = item.get(cc_key)
+    if value:
+        return float(value)
+    value = item.get(short_key)
+    if value:
+        value = float(value)
+        return value / 10000 if value > 100000 else value
+    value = item.get(raw_key)
+    if value:
+        return float(value) / 10000
+    return 0.0
+
+
+def parse_loop(kline_list: list) -> tuple:
+    """逐条循环解析的参考实现"""
+    rows = []
+    for item in kline_list:
+        time_val = item.get("time") or item.get("k")
+        if not time_val:
+            continue
+        close_price = _loop_price(item, "cc_price", "c", "price")
+        if close_price <= 0:
+            continue
+        rows.append((
+            int(time_val),
+            _loop_price(item, "cc_open", "o", "open") or close_price,
+            _loop_price(item, "cc_high", "h", "high") or close_price,
+            _loop_price(item, "cc_low", "l", "low") or close_price,
+            close_price,
+            int(float(item.get("volume") or item.get("v") or 0))
+        ))
+    return tuple(np.array(column) for column in zip(*rows))
+
+
+def check_equal(kline_list: list) -> None:
+    """校验向量化解析与参考实现结果一致"""
+    bars = parse_kline_list(kline_list)
+    expected = parse_loop(kline_list)
+    actual = (bars.time, bars.open, bars.high, bars.low, bars.close, bars.volume)
+    for name, exp, act in zip(("time", "open", "high", "low", "close", "volume"), expected, actual):
+        if not np.allclose(exp, act, rtol=0, atol=1e-9):
+            raise AssertionError(f"列 {name} 结果不一致")
+
+
+def main() -> None:
+    print(f"{'format':<8}{'bars':>10}{'loop (ms)':>14}{'vectorized (ms)':>18}{'speedup':>10}")
+    for name, factory in (("daily", make_daily), ("minute", make_minute)):
+        for size in SIZES:
+            data = factory(size)
+            check_equal(data)
+            loop_time = min(timeit.repeat(lambda: parse_loop(data), number=1, repeat=REPEAT))
+            vec_time = min(timeit.repeat(lambda: parse_kline_list(data), number=1, repeat=REPEAT))
+            print(
+                f"{name:<8}{size:>10}{loop_time * 1000:>14.2f}"
+                f"{vec_time * 1000:>18.2f}{loop_time / vec_time:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
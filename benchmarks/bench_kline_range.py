@@ -0,0 +1,59 @@
+"""K线日期范围截取性能基准
+
+对比多年日K线上一周范围查询的两种实现：
+- 布尔掩码：对整个时间列做比较后复制筛选结果，O(n)
+- 二分查找：KlineBars.time_range 在升序时间列上 searchsorted 后返回零拷贝视图，O(log n + 输出)
+
+运行方式（在项目根目录）：
+    python benchmarks/bench_kline_range.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kline_bars import KlineBars  # noqa: E402
+
+SIZES = [2_500, 25_000, 250_000]
+REPEAT = 2_000
+
+
+def make_daily(n: int) -> KlineBars:
+    """生成日K线"""
+    rng = np.random.default_rng(1)
+    close = np.round(100 + np.cumsum(rng.normal(0, 1, n)), 2)
+    return KlineBars.from_dataframe(pd.DataFrame({
+        "time": 946_684_800 + 86_400 * np.arange(n),
+        "open": close, "high": close + 1, "low": close - 1, "close": close,
+        "volume": rng.integers(0, 100_000, n)
+    }))
+
+
+def main() -> None:
+    print(f"{'bars':>10}{'mask (us)':>14}{'searchsorted (us)':>20}{'speedup':>10}")
+    for size in SIZES:
+        bars = make_daily(size)
+        start = int(bars.time[size // 2])
+        end = start + 6 * 86_400
+
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            masked = bars.filter((bars.time >= start) & (bars.time <= end))
+        mask_time = (time.perf_counter() - started) / REPEAT
+
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            ranged = bars.time_range(start, end)
+        range_time = (time.perf_counter() - started) / REPEAT
+
+        assert np.array_equal(masked.time, ranged.time)
+        assert np.shares_memory(ranged.close, bars.close)
+        print(f"{size:>10}{mask_time * 1e6:>14.1f}{range_time * 1e6:>20.1f}{mask_time / range_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""流式指标性能基准
+
+模拟分时轮询：每次轮询时最后一根分钟K线更新、偶尔新增一根分钟K线，对比
+- 批量计算：每次轮询把完整分钟序列重采样后，新建 IndicatorGraph 重新计算全部指标
+- 流式计算：streaming_indicators 的计算图只重采样并更新变化的K线
+并校验两者在最终K线上的全部指标输出一致。流式计算每次轮询的耗时应基本不随K线数增长。
+
+运行方式（在项目根目录）：
+    python benchmarks/bench_streaming_indicators.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kline_bars import KlineBars  # noqa: E402
+from technical_indicators import (  # noqa: E402
+    IndicatorGraph, INDICATOR_GROUPS, SUPPORTED_INDICATORS, _indicator_columns, resample_kline_data
+)
+from streaming_indicators import StreamingIndicatorEngine  # noqa: E402
+
+SIZES = [1_000, 5_000, 20_000]
+POLLS = 200
+# (时间间隔, 重采样间隔)
+INTERVALS = [("1min", None), ("5min", "5min"), ("60min", "1h")]
+
+
+def make_minute(n: int) -> KlineBars:
+    """生成分钟K线（含停牌式的连续相同价格和零成交量）"""
+    rng = np.random.default_rng(1)
+    close = np.round(100 + np.cumsum(rng.normal(0, 0.1, n)), 2)
+    close[n // 3:n // 3 + 30] = close[n // 3]
+    volume = rng.integers(0, 5000, n)
+    volume[10:40] = 0
+    return KlineBars(
+        time=1_700_000_040 + 60 * np.arange(n),
+        open=np.round(close + rng.normal(0, 0.05, n), 2),
+        high=np.round(close + rng.random(n) * 0.2, 2),
+        low=np.round(close - rng.random(n) * 0.2, 2),
+        close=close,
+        volume=volume
+    )
+
+
+def poll_bars(bars: KlineBars, start: int):
+    """生成轮询序列（与分时缓存相同，每次为新的序列）：最后一根K线的收盘价变化，每5次新增一根K线"""
+    size = start
+    for i in range(POLLS):
+        if i % 5 == 4:
+            size += 1
+        close = bars.close[:size].copy()
+        close[-1] += 0.01 * (i % 5)
+        yield KlineBars(bars.time[:size], bars.open[:size], bars.high[:size], bars.low[:size], close, bars.volume[:size])
+    yield bars.filter(slice(0, size))
+
+
+def batch_frame(bars: KlineBars, resample_interval):
+    """批量计算的输入：完整序列（需要时重采样）"""
+    df = bars.to_dataframe()
+    return resample_kline_data(df, resample_interval) if resample_interval else df
+
+
+# 每组指标只计算一次（与 calculate_indicators_series 相同）
+INDICATORS = list({INDICATOR_GROUPS.get(name, name): name for name in SUPPORTED_INDICATORS}.values())
+
+
+def compute_all(graph) -> list:
+    """计算全部支持的指标"""
+    return [series for indicator in INDICATORS for _, series, _ in _indicator_columns(graph, indicator)]
+
+
+def check_equal(batch: list, streaming: list) -> None:
+    """校验流式结果与批量结果一致"""
+    for expected, actual in zip(batch, streaming):
+        expected = expected.to_numpy(dtype=np.float64)
+        actual = actual.to_numpy(dtype=np.float64)
+        if not np.array_equal(expected, actual, equal_nan=True):
+            raise AssertionError("流式指标与批量计算结果不一致")
+
+
+def main() -> None:
+    print(f"{'interval':>10}{'bars':>10}{'batch (ms/poll)':>18}{'streaming (ms/poll)':>22}{'speedup':>10}")
+    for interval, resample_interval in INTERVALS:
+        for size in SIZES:
+            polls = list(poll_bars(make_minute(size + POLLS), size))
+
+            started = time.perf_counter()
+            for bars in polls:
+                batch = compute_all(IndicatorGraph(batch_frame(bars, resample_interval)))
+            batch_time = (time.perf_counter() - started) / len(polls)
+
+            engine = StreamingIndicatorEngine()
+            with engine.use("BENCH", interval, polls[0], resample_interval) as graph:
+                compute_all(graph)
+            started = time.perf_counter()
+            for bars in polls:
+                with engine.use("BENCH", interval, bars, resample_interval) as graph:
+                    streaming = compute_all(graph)
+            streaming_time = (time.perf_counter() - started) / len(polls)
+
+            check_equal(batch, streaming)
+            if engine.get_stats()["rebuilds"] != 1:
+                raise AssertionError("轮询过程中计算图被重建")
+            print(
+                f"{interval:>10}{size:>10}{batch_time * 1000:>18.2f}"
+                f"{streaming_time * 1000:>22.2f}{batch_time / streaming_time:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""上游熔断器模块
+
+按富途API方法（_m 参数，没有时为URL路径最后一段）分别熔断：某个方法连续失败达到阈值后熔断器打开，
+冷却期内对该方法的调用直接抛出 CircuitOpenError，不再等待上游超时；冷却期结束后放行
+一个探测请求（半开），成功则恢复，失败则重新打开。
+
+只在事件循环中使用（不是线程安全的）。
+"""
+from typing import Any, Dict
+import time
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，调用被快速拒绝"""
+
+
+class CircuitBreaker:
+    """单个上游方法的熔断器"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        """
+        初始化熔断器
+
+        Args:
+            name: 上游方法名
+            failure_threshold: 连续失败多少次后打开
+            recovery_timeout: 打开后的冷却时间（秒），之后进入半开状态放行一个探测请求
+        """
+        self.name = name
+        self._failure_threshold = max(1, failure_threshold)
+        self._recovery_timeout = recovery_timeout
+
+        self._state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_started = None  # 半开状态下进行中的探测请求的开始时间
+
+        self._successes = 0
+        self._failures = 0
+        self._rejected = 0
+        self._trips = 0
+
+    @property
+    def state(self) -> str:
+        """当前状态（冷却期已过的打开状态在下一次调用时才转为半开）"""
+        return self._state
+
+    def before_call(self) -> None:
+        """
+        调用上游前检查熔断状态
+
+        Raises:
+            CircuitOpenError: 熔断器打开（或半开状态下已有探测请求在进行中）
+        """
+        if self._state == STATE_OPEN:
+            remaining = self._opened_at + self._recovery_timeout - time.monotonic()
+            if remaining > 0:
+                self._rejected += 1
+                raise CircuitOpenError(f"上游接口 {self.name} 暂时不可用（熔断中，{remaining:.0f}秒后重试）")
+            self._state = STATE_HALF_OPEN
+            self._probe_started = None
+
+        if self._state == STATE_HALF_OPEN:
+            now = time.monotonic()
+            # 探测请求被取消时不会记录结果，超过冷却时间后允许新的探测
+            if self._probe_started is not None and now - self._probe_started < self._recovery_timeout:
+                self._rejected += 1
+                raise CircuitOpenError(f"上游接口 {self.name} 暂时不可用（正在探测恢复）")
+            self._probe_started = now
+
+    def record_success(self) -> None:
+        """上游调用成功"""
+        self._successes += 1
+        self._consecutive_failures = 0
+        self._state = STATE_CLOSED
+        self._probe_started = None
+
+    def record_failure(self) -> None:
+        """上游调用失败（超时、网络错误、5xx/429等）"""
+        self._failures += 1
+        self._consecutive_failures += 1
+        if self._state == STATE_HALF_OPEN or self._consecutive_failures >= self._failure_threshold:
+            if self._state != STATE_OPEN:
+                self._trips += 1
+            self._state = STATE_OPEN
+            self._opened_at = time.monotonic()
+            self._probe_started = None
+
+    def reset(self) -> None:
+        """手动恢复为关闭状态"""
+        self._state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._probe_started = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取熔断器状态和统计"""
+        retry_in = 0.0
+        if self._state == STATE_OPEN:
+            retry_in = max(0.0, self._opened_at + self._recovery_timeout - time.monotonic())
+        return {
+            "state": self._state,
+            "consecutive_failures": self._consecutive_failures,
+            "trips": self._trips,
+            "successes": self._successes,
+            "failures": self._failures,
+            "rejected": self._rejected,
+            "retry_in_seconds": retry_in
+        }
+
+
+class CircuitBreakerRegistry:
+    """按上游方法名管理熔断器（首次使用时创建）"""
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self._failure_threshold = failure_threshold
+        self._recovery_timeout = recovery_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        """获取指定上游方法的熔断器"""
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, self._failure_threshold, self._recovery_timeout)
+            self._breakers[name] = breaker
+        return breaker
+
+    def reset(self) -> int:
+        """恢复所有熔断器，返回之前处于打开/半开状态的数量"""
+        opened = sum(1 for breaker in self._breakers.values() if breaker.state != STATE_CLOSED)
+        for breaker in self._breakers.values():
+            breaker.reset()
+        return opened
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取所有熔断器的状态"""
+        return {
+            "failure_threshold": self._failure_threshold,
+            "recovery_timeout": self._recovery_timeout,
+            "open": sum(1 for breaker in self._breakers.values() if breaker.state != STATE_CLOSED),
+            "breakers": {name: breaker.get_stats() for name, breaker in self._breakers.items()}
+        }
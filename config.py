@@ -26,6 +26,69 @@ API_KEY = os.getenv("API_KEY", "")
 FUTU_BASE_URL = "https://www.futunn.com"
 FUTU_MATCH_URL = "https://m-match.futunn.com"
 
+# 上游HTTP连接池配置（每个上游主机一个长连接客户端）
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100"))  # 每个主机最大连接数
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20"))  # 每个主机最大空闲长连接数
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))  # 空闲长连接保持时间（秒）
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))  # 默认请求超时（秒）
+
+# 上游限流配置（每个上游主机一个自适应令牌桶，下单/撤单优先）
+RATE_LIMIT_RATE = float(os.getenv("RATE_LIMIT_RATE", "20"))  # 每个主机每秒最大请求数（0表示不限流）
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "40"))  # 允许的突发请求数（令牌桶容量）
+RATE_LIMIT_MIN_RATE = float(os.getenv("RATE_LIMIT_MIN_RATE", "2"))  # 收到429/错误后自适应降速的下限（每秒请求数）
+RATE_LIMIT_TRADE_RESERVE = float(os.getenv("RATE_LIMIT_TRADE_RESERVE", "4"))  # 为下单/撤单保留的令牌数
+
+# 上游重试与熔断配置（只重试GET请求；按 _m 方法熔断）
+UPSTREAM_GET_TIMEOUT = float(os.getenv("UPSTREAM_GET_TIMEOUT", "10"))  # GET请求单次尝试的超时（秒），POST使用 HTTP_TIMEOUT
+UPSTREAM_RETRY_ATTEMPTS = int(os.getenv("UPSTREAM_RETRY_ATTEMPTS", "2"))  # GET请求超时/网络错误/5xx/429后的最大重试次数
+UPSTREAM_RETRY_BASE_DELAY = float(os.getenv("UPSTREAM_RETRY_BASE_DELAY", "0.2"))  # 重试退避的基础间隔（秒，每次翻倍并随机抖动）
+UPSTREAM_RETRY_MAX_DELAY = float(os.getenv("UPSTREAM_RETRY_MAX_DELAY", "2"))  # 重试退避的最大间隔（秒）
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))  # 同一方法连续失败多少次后熔断
+CIRCUIT_BREAKER_RECOVERY_TIMEOUT = float(os.getenv("CIRCUIT_BREAKER_RECOVERY_TIMEOUT", "30"))  # 熔断后的冷却时间（秒），之后放行探测请求
+
+# 股票代码解析缓存配置（代码 -> security_id）
+SYMBOL_CACHE_MAX_ENTRIES = int(os.getenv("SYMBOL_CACHE_MAX_ENTRIES", "10000"))
+SYMBOL_CACHE_TTL_SECONDS = float(os.getenv("SYMBOL_CACHE_TTL_SECONDS", "86400"))  # 找到的股票缓存24小时
+SYMBOL_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("SYMBOL_CACHE_NEGATIVE_TTL_SECONDS", "300"))  # 未找到的代码缓存5分钟
+
+# K线缓存配置
+KLINE_CACHE_MAX_ENTRIES = int(os.getenv("KLINE_CACHE_MAX_ENTRIES", "5000"))  # 最大缓存条目数（0表示不限制）
+KLINE_CACHE_MAX_BYTES = int(float(os.getenv("KLINE_CACHE_MAX_MB", "256")) * 1024 * 1024)  # 最大估算内存（MB，0表示不限制）
+KLINE_CACHE_SWEEP_INTERVAL = float(os.getenv("KLINE_CACHE_SWEEP_INTERVAL", "300"))  # 后台清理过期缓存的间隔（秒，0表示不启动）
+KLINE_CACHE_SESSION_TTL = float(os.getenv("KLINE_CACHE_SESSION_TTL", "60"))  # 交易时段内日K及以上缓存的有效期（秒）
+KLINE_CACHE_CLOSE_GRACE = float(os.getenv("KLINE_CACHE_CLOSE_GRACE", "900"))  # 收盘后仍按交易时段处理的宽限期（秒）
+KLINE_DERIVE_FROM_DAILY = os.getenv("KLINE_DERIVE_FROM_DAILY", "true").lower() in ("1", "true", "yes")  # 周K/月K/季K/年K优先由日K聚合
+KLINE_DERIVE_MIN_PERIODS = int(os.getenv("KLINE_DERIVE_MIN_PERIODS", "30"))  # 日K聚合结果少于该周期数时改为请求上游
+
+# 分时K线缓存配置
+INTRADAY_CACHE_TTL = float(os.getenv("INTRADAY_CACHE_TTL", "5"))  # 交易时段内分时数据的有效期（秒）
+INTRADAY_CACHE_REFRESH_INTERVAL = float(os.getenv("INTRADAY_CACHE_REFRESH_INTERVAL", "5"))  # 后台刷新间隔（秒，0表示不启动）
+INTRADAY_CACHE_IDLE_SECONDS = float(os.getenv("INTRADAY_CACHE_IDLE_SECONDS", "120"))  # 超过该时间未被访问的分时序列停止后台刷新（秒）
+INTRADAY_CACHE_MAX_ENTRIES = int(os.getenv("INTRADAY_CACHE_MAX_ENTRIES", "500"))  # 最大缓存股票数（0表示不限制）
+
+# 流式指标配置（分时级别的指标增量更新）
+STREAMING_INDICATORS_ENABLED = os.getenv("STREAMING_INDICATORS_ENABLED", "true").lower() in ("1", "true", "yes")  # 分时级别指标使用增量计算（工作池 process 模式下不生效）
+STREAMING_INDICATORS_MAX_ENTRIES = int(os.getenv("STREAMING_INDICATORS_MAX_ENTRIES", "200"))  # 最多保留的流式计算图数（0表示不限制）
+
+# 技术指标结果缓存（K线未变化时直接返回上次的计算结果）与日期范围计算配置
+INDICATOR_CACHE_MAX_ENTRIES = int(os.getenv("INDICATOR_CACHE_MAX_ENTRIES", "1000"))  # 最大缓存结果数（0表示不缓存）
+INDICATOR_WARMUP_TOLERANCE = float(os.getenv("INDICATOR_WARMUP_TOLERANCE", "1e-12"))  # 按日期范围计算时EMA类指标预热的收敛容差
+INDICATOR_BACKEND = os.getenv("INDICATOR_BACKEND", "pandas").lower()  # 全量计算指标的后端：pandas / numpy
+
+# CPU任务工作池配置（重采样、指标计算、结果格式化不在事件循环中执行）
+WORKER_POOL_MODE = os.getenv("WORKER_POOL_MODE", "thread").lower()  # thread / process / inline
+WORKER_POOL_MAX_WORKERS = int(os.getenv("WORKER_POOL_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))  # 工作线程/进程数
+WORKER_POOL_MAX_QUEUE = int(os.getenv("WORKER_POOL_MAX_QUEUE", "32"))  # 最大排队任务数，超过时返回503
+
+# 请求耗时分解配置（Server-Timing 响应头）
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() in ("1", "true", "yes")  # 响应头中输出各阶段耗时
+SERVER_TIMING_LOG = os.getenv("SERVER_TIMING_LOG", "false").lower() in ("1", "true", "yes")  # 每个请求结束后输出一行JSON耗时日志
+
+# 批量行情配置
+QUOTE_BATCH_SIZE = int(os.getenv("QUOTE_BATCH_SIZE", "50"))  # 单次 batchGetSecurityQuote 请求的最大证券数
+QUOTE_BATCH_MAX_CODES = int(os.getenv("QUOTE_BATCH_MAX_CODES", "200"))  # 批量行情接口单次最多股票代码数
+
 # 市场类型映射（用于API请求）
 MARKET_TYPE = {
     "US": 100,  # 美股
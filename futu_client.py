@@ -1,18 +1,204 @@
 """富途API客户端"""
+import asyncio
+import random
+import time
 import httpx
 import pandas as pd
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+from urllib.parse import urlparse
 from config import (
     FUTU_COOKIE, FUTU_CSRF_TOKEN, FUTU_BASE_URL, FUTU_MATCH_URL,
     MARKET_TYPE, ORDER_SIDE, ORDER_TYPE, PERIOD_TYPE, SECURITY_TYPE,
-    ACCOUNT_MAPPING
+    ACCOUNT_MAPPING, HTTP2_ENABLED, HTTP_POOL_MAX_CONNECTIONS,
+    HTTP_POOL_MAX_KEEPALIVE, HTTP_KEEPALIVE_EXPIRY, HTTP_TIMEOUT,
+    RATE_LIMIT_RATE, RATE_LIMIT_BURST, RATE_LIMIT_MIN_RATE, RATE_LIMIT_TRADE_RESERVE,
+    UPSTREAM_GET_TIMEOUT, UPSTREAM_RETRY_ATTEMPTS, UPSTREAM_RETRY_BASE_DELAY, UPSTREAM_RETRY_MAX_DELAY,
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD, CIRCUIT_BREAKER_RECOVERY_TIMEOUT,
+    QUOTE_BATCH_SIZE, INTRADAY_CACHE_REFRESH_INTERVAL,
+    KLINE_DERIVE_FROM_DAILY, KLINE_DERIVE_MIN_PERIODS, STREAMING_INDICATORS_ENABLED,
+    INDICATOR_WARMUP_TOLERANCE, INDICATOR_BACKEND
 )
 from models import (
     AccountInfo, Position, StockQuote, TradeRequest, 
     TradeResponse, StockSearchResult
 )
-from technical_indicators import calculate_indicators_series, SUPPORTED_INDICATORS
+from technical_indicators import (
+    calculate_indicators_series, calculate_single_indicator, resample_kline_data,
+    aggregate_daily_kline_data, indicator_lookback, indicator_window, slice_for_range, SUPPORTED_INDICATORS
+)
 from kline_cache import get_kline_cache
+from intraday_cache import get_intraday_cache
+from streaming_indicators import get_streaming_engine
+from indicator_cache import get_indicator_cache, bars_fingerprint
+from worker_pool import get_worker_pool
+from kline_bars import KlineBars, extract_kline_list, parse_kline_list
+from single_flight import SingleFlight
+from rate_limiter import HostRateLimiter, PRIORITY_TRADE, PRIORITY_MARKET_DATA, PRIORITY_BACKGROUND
+from circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError
+import json_codec
+from metrics import UPSTREAM_LATENCY, UPSTREAM_IN_FLIGHT, UPSTREAM_ERRORS
+from tracing import span, traced
+from symbol_cache import get_symbol_cache
+from market_time import get_market_timezone_name, format_local_times, local_date_bounds
+
+# HTTP/2 依赖 h2 包（httpx[http2]），未安装时回退到 HTTP/1.1
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+
+# 可由日K聚合得到的K线类型 -> 聚合周期
+_DERIVED_KLINE_INTERVALS = {
+    3: "weekly",
+    4: "monthly",
+    5: "yearly",
+    11: "quarterly"
+}
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """解析429响应的 Retry-After 请求头（秒数格式）"""
+    if response.status_code != 429:
+        return None
+    try:
+        return max(0.0, float(response.headers.get("Retry-After", "")))
+    except ValueError:
+        return None
+
+
+def _is_upstream_failure(error: Exception) -> bool:
+    """是否为上游故障（计入熔断、GET请求可重试）：超时/网络错误、5xx、429、空响应或无效JSON"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status_code = error.response.status_code
+        return status_code >= 500 or status_code == 429
+    return isinstance(error, (httpx.TransportError, ValueError))
+
+
+def _backoff_delay(attempt: int) -> float:
+    """第 attempt 次重试前的等待时间：指数退避加全抖动"""
+    return random.uniform(0, min(UPSTREAM_RETRY_MAX_DELAY, UPSTREAM_RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+
+def _calculate_indicator_data(
+    df: pd.DataFrame,
+    indicators: List[str],
+    market_type: str,
+    interval: str,
+    raw_values: bool,
+    graph,
+    start_time: Optional[int],
+    end_time: Optional[int]
+) -> Dict[str, Any]:
+    """计算一个或多个指标（单个指标时不做多指标合并）"""
+    if len(indicators) == 1:
+        with span("calculate_single_indicator"):
+            return calculate_single_indicator(
+                df, indicators[0], market_type, interval, raw_values=raw_values, graph=graph,
+                start_time=start_time, end_time=end_time, backend=INDICATOR_BACKEND
+            )
+    with span("calculate_indicators_series"):
+        return calculate_indicators_series(
+            df, indicators, market_type, interval, raw_values=raw_values, graph=graph,
+            start_time=start_time, end_time=end_time, backend=INDICATOR_BACKEND
+        )
+
+
+def kline_summary(df: pd.DataFrame) -> Dict[str, Any]:
+    """K线概况：数量、最新价、首末时间戳（没有K线时后三项为None）"""
+    if len(df) == 0:
+        return {"count": 0, "latest_price": None, "start_time": None, "end_time": None}
+    return {
+        "count": len(df),
+        "latest_price": float(df["close"].iloc[-1]),
+        "start_time": int(df["time"].iloc[0]),
+        "end_time": int(df["time"].iloc[-1])
+    }
+
+
+def compute_indicator_data(
+    df: pd.DataFrame,
+    indicators: List[str],
+    market_type: str,
+    interval: str,
+    raw_values: bool = False,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    计算日期范围内的技术指标时间序列（CPU密集，在工作池中执行）
+    
+    - 只返回市场本地日期在 [start_date, end_date] 内的数据
+    - 只截取范围内的K线加上指标预热所需的历史K线（按时间二分查找），
+      EMA类指标的预热长度按收敛容差 INDICATOR_WARMUP_TOLERANCE 计算
+    - 使用 INDICATOR_BACKEND 指定的后端（pandas / numpy）
+    
+    Args:
+        df: K线数据（已重采样）
+        indicators: 指标列表
+        market_type: 市场类型
+        interval: 时间间隔
+        raw_values: 指标值返回浮点数
+        start_date: 结果开始日期（YYYY-MM-DD，可选）
+        end_date: 结果结束日期（YYYY-MM-DD，可选）
+    
+    Returns:
+        {日期字符串: {指标名: 值}}，出错时返回 {"error": ...}
+    """
+    start_time, end_time = local_date_bounds(start_date, end_date, market_type)
+    if start_time is not None or end_time is not None:
+        lookback = indicator_lookback(indicators, INDICATOR_WARMUP_TOLERANCE)
+        df = slice_for_range(df, lookback, start_time, end_time)
+    return _calculate_indicator_data(
+        df, indicators, market_type, interval, raw_values, None, start_time, end_time
+    )
+
+
+def compute_streaming_indicator_data(
+    bars: KlineBars,
+    resample_interval: Optional[str],
+    indicators: List[str],
+    market_type: str,
+    interval: str,
+    raw_values: bool,
+    streaming_key: tuple,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    在流式计算图上计算分时级别的技术指标（CPU密集，在工作池中执行）
+    
+    计算图保存完整历史状态，每次只重采样并更新新增/变化的分钟，再按日期范围输出
+    
+    Args:
+        bars: 原始分钟K线（分时缓存中的序列）
+        resample_interval: 重采样间隔（如 5min/1h），为None时不重采样
+        indicators: 指标列表
+        market_type: 市场类型
+        interval: 时间间隔
+        raw_values: 指标值返回浮点数
+        streaming_key: 流式计算图的键 (security_id, interval)
+        start_date: 结果开始日期（YYYY-MM-DD，可选）
+        end_date: 结果结束日期（YYYY-MM-DD，可选）
+    
+    Returns:
+        ({日期字符串: {指标名: 值}}，出错时为 {"error": ...}, 重采样后的K线概况 kline_summary)
+    """
+    start_time, end_time = local_date_bounds(start_date, end_date, market_type)
+    with get_streaming_engine().use(*streaming_key, bars, resample_interval) as graph:
+        df = graph.df
+        summary = kline_summary(df)
+        if resample_interval and len(df) < 20:
+            return {}, summary
+        return _calculate_indicator_data(
+            df, indicators, market_type, interval, raw_values, graph, start_time, end_time
+        ), summary
+
+
+# 上游调用的限流优先级：下单/撤单最高，热门资讯/热门榜单最低，其余为行情/账户查询
+_TRADE_METHODS = frozenset({"inputOrder", "inputIntegratedOrder", "cancelOrder", "cancelIntegratedOrder"})
+_BACKGROUND_PATHS = frozenset({"/search-stock/hot-news", "/stock/get-hot-list"})
 
 
 class FutuClient:
@@ -27,7 +213,6 @@ class FutuClient:
             "Accept-Encoding": "gzip, deflate, br, zstd",
             "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
             "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
             "Cookie": self.cookie,
             "Host": "www.futunn.com",
             "Pragma": "no-cache",
@@ -48,6 +233,98 @@ class FutuClient:
         }
         # 使用环境变量配置的账户映射
         self._account_mapping = ACCOUNT_MAPPING
+        # 按上游主机复用的长连接客户端（由 start()/close() 管理生命周期）
+        self._http_clients: Dict[str, httpx.AsyncClient] = {}
+        # 按上游主机的自适应限流器
+        self._rate_limiters: Dict[str, HostRateLimiter] = {}
+        # 按上游方法（_m）的熔断器
+        self._circuit_breakers = CircuitBreakerRegistry(
+            failure_threshold=CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            recovery_timeout=CIRCUIT_BREAKER_RECOVERY_TIMEOUT
+        )
+        self._retries = 0  # GET请求的重试次数
+        # 合并飞行中的相同GET请求
+        self._single_flight = SingleFlight()
+        # 分时缓存后台刷新任务
+        self._intraday_refresher: Optional[asyncio.Task] = None
+        # 周K/月K/季K/年K由日K聚合 / 回退到上游的次数
+        self._derived_klines = 0
+        self._derive_fallbacks = 0
+    
+    def _create_http_client(self) -> httpx.AsyncClient:
+        """创建带连接池的HTTP客户端（支持时启用HTTP/2多路复用）"""
+        limits = httpx.Limits(
+            max_connections=HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        )
+        return httpx.AsyncClient(
+            http2=HTTP2_ENABLED and _HTTP2_AVAILABLE,
+            limits=limits,
+            timeout=HTTP_TIMEOUT
+        )
+    
+    def _get_http_client(self, host: str) -> httpx.AsyncClient:
+        """
+        获取指定上游主机的长连接客户端（不存在或已关闭时自动创建）
+        
+        Args:
+            host: 上游主机名（如 www.futunn.com）
+        """
+        client = self._http_clients.get(host)
+        if client is None or client.is_closed:
+            client = self._create_http_client()
+            self._http_clients[host] = client
+        return client
+    
+    def _get_rate_limiter(self, host: str) -> Optional[HostRateLimiter]:
+        """获取指定上游主机的限流器（未启用限流时返回None）"""
+        if RATE_LIMIT_RATE <= 0:
+            return None
+        limiter = self._rate_limiters.get(host)
+        if limiter is None:
+            limiter = HostRateLimiter(
+                rate=RATE_LIMIT_RATE,
+                burst=RATE_LIMIT_BURST,
+                min_rate=RATE_LIMIT_MIN_RATE,
+                trade_reserve=RATE_LIMIT_TRADE_RESERVE
+            )
+            self._rate_limiters[host] = limiter
+        return limiter
+    
+    @staticmethod
+    def _request_priority(path: str, api_method: Optional[str]) -> str:
+        """上游请求的限流优先级"""
+        if api_method in _TRADE_METHODS:
+            return PRIORITY_TRADE
+        if path in _BACKGROUND_PATHS:
+            return PRIORITY_BACKGROUND
+        return PRIORITY_MARKET_DATA
+    
+    async def start(self) -> None:
+        """预先为所有上游主机创建连接池（在应用启动时调用）"""
+        for base_url in (FUTU_BASE_URL, FUTU_MATCH_URL):
+            self._get_http_client(urlparse(base_url).netloc)
+        
+        if INTRADAY_CACHE_REFRESH_INTERVAL > 0 and self._intraday_refresher is None:
+            self._intraday_refresher = asyncio.create_task(
+                self._refresh_intraday_loop(INTRADAY_CACHE_REFRESH_INTERVAL)
+            )
+    
+    async def close(self) -> None:
+        """停止后台任务并关闭所有上游连接池（在应用关闭时调用）"""
+        if self._intraday_refresher is not None:
+            self._intraday_refresher.cancel()
+            try:
+                await self._intraday_refresher
+            except asyncio.CancelledError:
+                pass
+            self._intraday_refresher = None
+        
+        clients = list(self._http_clients.values())
+        self._http_clients.clear()
+        for client in clients:
+            await client.aclose()
     
     def _normalize_stock_code(self, stock_code: str) -> str:
         """
@@ -123,21 +400,27 @@ class FutuClient:
         # 默认返回美股（兜底）
         return "US"
         
-    async def _request(self, method: str, url: str, api_method: str = None, **kwargs) -> Dict[str, Any]:
+    async def _request(
+        self, method: str, url: str, api_method: str = None, timeout: Optional[float] = None, **kwargs
+    ) -> Dict[str, Any]:
         """
         发送HTTP请求
         
+        - GET请求：合并相同的飞行中请求，超时/网络错误/5xx/429时按指数退避重试
+        - POST请求（下单/撤单等）：不合并、不重试
+        - 同一上游方法（_m）连续失败时熔断，熔断期间直接抛出 CircuitOpenError
+        
         Args:
             method: HTTP方法 (GET/POST)
             url: 请求URL
             api_method: 富途API方法名（用于设置x-paper-trading-method请求头）
+            timeout: 单次尝试的超时（秒，默认GET为 UPSTREAM_GET_TIMEOUT，POST为 HTTP_TIMEOUT）
             **kwargs: 其他请求参数
         """
         # 构建请求头（每次请求都复制基础请求头）
         headers = self.base_headers.copy()
         
         # 根据URL动态设置Host请求头
-        from urllib.parse import urlparse
         parsed_url = urlparse(url)
         headers["Host"] = parsed_url.netloc
         
@@ -148,17 +431,151 @@ class FutuClient:
         elif 'params' in kwargs and '_m' in kwargs['params']:
             headers["x-paper-trading-method"] = kwargs['params']['_m']
         
-        async with httpx.AsyncClient() as client:
-            response = await client.request(
-                method, url, headers=headers, timeout=30.0, **kwargs
+        priority = self._request_priority(parsed_url.path, headers.get("x-paper-trading-method"))
+        # 上游方法名：_m 参数，没有时为URL路径最后一段（如 api-quote-kline、search-target-stock）
+        breaker = self._circuit_breakers.get(
+            headers.get("x-paper-trading-method") or parsed_url.path.rstrip("/").rsplit("/", 1)[-1]
+        )
+        
+        # 只合并和重试GET请求；下单/撤单等POST请求每次都必须真正发送，且不能重复提交
+        if method.upper() == "GET" and "json" not in kwargs and "data" not in kwargs:
+            params = kwargs.get("params") or {}
+            key = (
+                "GET",
+                url,
+                tuple(sorted((k, str(v)) for k, v in params.items())),
+                headers.get("x-paper-trading-method")
             )
-            response.raise_for_status()
-            
-            content = response.text
-            if not content:
-                raise ValueError(f"API返回空响应: {url}")
+            return await self._single_flight.do(
+                key, lambda: self._call_upstream(
+                    method, url, headers, priority, breaker,
+                    timeout if timeout is not None else UPSTREAM_GET_TIMEOUT, UPSTREAM_RETRY_ATTEMPTS,
+                    **kwargs
+                )
+            )
+        
+        return await self._call_upstream(method, url, headers, priority, breaker, timeout, 0, **kwargs)
+    
+    async def _call_upstream(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        priority: str,
+        breaker: CircuitBreaker,
+        timeout: Optional[float],
+        retries: int,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """经过熔断器发送请求，上游故障时最多重试 retries 次（熔断器打开后不再重试）"""
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        attempt = 0
+        while True:
+            try:
+                breaker.before_call()
+            except CircuitOpenError:
+                UPSTREAM_ERRORS.inc(breaker.name, "circuit_open")
+                raise
+            try:
+                result = await self._send(method, url, headers, priority, breaker.name, **kwargs)
+            except Exception as e:
+                if not _is_upstream_failure(e):
+                    # 上游正常响应了4xx等业务错误，方法本身是健康的
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                if attempt >= retries:
+                    raise
+                attempt += 1
+                self._retries += 1
+                await asyncio.sleep(_backoff_delay(attempt))
+                continue
+            breaker.record_success()
+            return result
+    
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        priority: str = PRIORITY_MARKET_DATA,
+        name: str = "unknown",
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        实际发送HTTP请求并解析JSON响应（先经过该主机的限流器）
+        
+        按上游方法名 name 记录耗时、进行中请求数和错误码指标，
+        并在当前请求的 Server-Timing 中记录 upstream.<name>（含限流等待）和 parse 阶段
+        """
+        host = headers["Host"]
+        limiter = self._get_rate_limiter(host)
+        with span(f"upstream.{name}"):
+            if limiter is not None:
+                await limiter.acquire(priority)
             
-            return response.json()
+            # 复用该主机的长连接客户端，避免每次请求重新握手
+            client = self._get_http_client(host)
+            UPSTREAM_IN_FLIGHT.inc(name)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, headers=headers, **kwargs)
+            except httpx.TransportError as e:
+                UPSTREAM_ERRORS.inc(name, "timeout" if isinstance(e, httpx.TimeoutException) else "network")
+                if limiter is not None:
+                    limiter.on_error()
+                raise
+            finally:
+                UPSTREAM_IN_FLIGHT.dec(name)
+                UPSTREAM_LATENCY.observe(time.perf_counter() - started, name)
+        if limiter is not None:
+            limiter.on_response(response.status_code, _retry_after(response))
+        if response.status_code >= 400:
+            UPSTREAM_ERRORS.inc(name, f"http_{response.status_code}")
+        response.raise_for_status()
+        
+        # 直接解析响应字节（orjson可用时使用orjson），不先解码为字符串
+        content = response.content
+        if not content.strip():
+            UPSTREAM_ERRORS.inc(name, "empty_response")
+            raise ValueError(f"API返回空响应: {url}")
+        
+        try:
+            with span("parse"):
+                data = json_codec.loads(content)
+        except ValueError:
+            UPSTREAM_ERRORS.inc(name, "invalid_json")
+            raise
+        
+        # 富途业务错误码（如1002未登录）
+        if isinstance(data, dict):
+            code = data.get("code")
+            if code not in (None, 0):
+                UPSTREAM_ERRORS.inc(name, str(code))
+        return data
+    
+    def reset_circuit_breakers(self) -> int:
+        """恢复所有熔断器，返回之前处于熔断状态的方法数"""
+        return self._circuit_breakers.reset()
+    
+    def get_upstream_stats(self) -> Dict[str, Any]:
+        """获取上游请求统计信息（请求合并等）"""
+        return {
+            "single_flight": self._single_flight.get_stats(),
+            "rate_limiter": {
+                host: limiter.get_stats() for host, limiter in self._rate_limiters.items()
+            },
+            "retries": self._retries,
+            "circuit_breakers": self._circuit_breakers.get_stats(),
+            "symbol_cache": get_symbol_cache().get_stats(),
+            "kline_derive": {
+                "enabled": KLINE_DERIVE_FROM_DAILY,
+                "min_periods": KLINE_DERIVE_MIN_PERIODS,
+                "derived": self._derived_klines,
+                "fallbacks": self._derive_fallbacks
+            }
+        }
     
     async def get_account_list(self) -> List[Dict[str, Any]]:
         """
@@ -436,6 +853,7 @@ class FutuClient:
         
         return {"positions": positions, "count": len(positions)}
     
+    @traced("search_stock")
     async def search_stock(self, keyword: str, market_type: str = None) -> List[StockSearchResult]:
         """
         搜索股票
@@ -499,6 +917,34 @@ class FutuClient:
             ))
         return stocks
     
+    async def resolve_stock(self, stock_code: str, market_type: str = None) -> Optional[StockSearchResult]:
+        """
+        将股票代码解析为证券信息（带缓存）
+        
+        相当于取 search_stock 的第一个结果，但会缓存解析结果（包括未找到的代码），
+        避免每次请求都调用搜索接口。
+        
+        Args:
+            stock_code: 股票代码（可能包含后缀，如 00700.HK）
+            market_type: 市场类型 (US/HK/CN)，如果不提供则自动判断
+            
+        Returns:
+            证券信息，未找到则返回None
+        """
+        normalized_code = self._normalize_stock_code(stock_code)
+        if not market_type:
+            market_type = self._detect_market_type(stock_code)
+        
+        cache = get_symbol_cache()
+        hit, stock = cache.get(normalized_code, market_type)
+        if hit:
+            return stock
+        
+        stocks = await self.search_stock(normalized_code, market_type)
+        stock = stocks[0] if stocks else None
+        cache.set(normalized_code, market_type, stock)
+        return stock
+    
     async def get_stock_quote(self, security_ids: List[str], market_type: str = "US") -> List[Dict[str, Any]]:
         """获取股票行情"""
         import json
@@ -561,6 +1007,82 @@ class FutuClient:
             quotes.append(quote_dict)
         return quotes
     
+    async def get_batch_quotes(self, stock_codes: List[str]) -> List[Dict[str, Any]]:
+        """
+        批量获取多只股票行情（自动判断市场类型）
+        
+        处理流程：
+        1. 并发解析所有股票代码（带缓存）
+        2. 按市场分组，每组按 QUOTE_BATCH_SIZE 分批调用 batchGetSecurityQuote
+        3. 按请求顺序合并结果
+        
+        Args:
+            stock_codes: 股票代码列表（可混合不同市场，可包含后缀）
+            
+        Returns:
+            与请求顺序一致的行情列表，每项包含 symbol 字段；
+            未找到或未获取到行情的代码返回 {"symbol": ..., "error": ...}
+        """
+        codes = [code.strip() for code in stock_codes if code and code.strip()]
+        unique_codes = list(dict.fromkeys(codes))
+        markets = {code: self._detect_market_type(code) for code in unique_codes}
+        
+        # 1. 并发解析股票代码
+        resolved = await asyncio.gather(
+            *[self.resolve_stock(code, markets[code]) for code in unique_codes],
+            return_exceptions=True
+        )
+        stocks = dict(zip(unique_codes, resolved))
+        
+        # 2. 按市场分组（同一证券只请求一次）
+        market_ids: Dict[str, List[str]] = {}
+        for code in unique_codes:
+            stock = stocks[code]
+            if isinstance(stock, StockSearchResult):
+                ids = market_ids.setdefault(markets[code], [])
+                if stock.security_id not in ids:
+                    ids.append(stock.security_id)
+        
+        batches = [
+            (market_type, ids[i:i + QUOTE_BATCH_SIZE])
+            for market_type, ids in market_ids.items()
+            for i in range(0, len(ids), QUOTE_BATCH_SIZE)
+        ]
+        batch_results = await asyncio.gather(
+            *[self.get_stock_quote(ids, market_type) for market_type, ids in batches],
+            return_exceptions=True
+        )
+        
+        quote_map: Dict[tuple, Dict[str, Any]] = {}
+        batch_errors: Dict[tuple, str] = {}
+        for (market_type, ids), result in zip(batches, batch_results):
+            if isinstance(result, Exception):
+                for security_id in ids:
+                    batch_errors[(market_type, security_id)] = str(result)
+                continue
+            for quote in result:
+                quote_map[(market_type, quote["security_id"])] = quote
+        
+        # 3. 按请求顺序合并
+        quotes = []
+        for code in codes:
+            stock = stocks[code]
+            if isinstance(stock, Exception):
+                quotes.append({"symbol": code, "error": f"解析股票代码失败: {str(stock)}"})
+                continue
+            if stock is None:
+                quotes.append({"symbol": code, "error": f"未找到股票: {code}"})
+                continue
+            
+            key = (markets[code], stock.security_id)
+            if key in quote_map:
+                quotes.append({"symbol": code, **quote_map[key]})
+            elif key in batch_errors:
+                quotes.append({"symbol": code, "error": f"获取行情失败: {batch_errors[key]}"})
+            else:
+                quotes.append({"symbol": code, "error": "未获取到行情数据"})
+        return quotes
+    
     async def place_order(self, trade_request: TradeRequest) -> TradeResponse:
         """
         下单交易（支持所有市场，自动选择正确的接口）
@@ -583,20 +1105,15 @@ class FutuClient:
                 message=f"未找到{market_type}市场的模拟账户，请先在富途牛牛中开通该市场的模拟交易账户"
             )
         
-        # 3. 搜索股票获取security_id（使用标准化的股票代码）
-        normalized_code = self._normalize_stock_code(trade_request.stock_code)
-        stocks = await self.search_stock(
-            normalized_code, 
-            market_type
-        )
+        # 3. 解析股票代码获取security_id（带缓存）
+        stock = await self.resolve_stock(trade_request.stock_code, market_type)
         
-        if not stocks:
+        if not stock:
             return TradeResponse(
                 success=False,
                 message=f"未找到股票: {trade_request.stock_code}"
             )
         
-        stock = stocks[0]
         security_id = stock.security_id
         
         # 4. 获取当前价格（如果是市价单）
@@ -905,6 +1422,8 @@ class FutuClient:
         """
         将Unix时间戳转换为市场本地时间字符串
         
+        批量转换请直接使用 market_time.format_local_times
+        
         Args:
             timestamp: Unix时间戳（秒）
             market_type: 市场类型 (US/HK/CN)
@@ -912,126 +1431,22 @@ class FutuClient:
         Returns:
             本地时间字符串，格式：YYYY-MM-DD HH:MM:SS (时区名称)
         """
-        from datetime import datetime
-        
-        try:
-            # 优先使用 zoneinfo (Python 3.9+)
-            from zoneinfo import ZoneInfo
-            
-            # 创建UTC时间
-            utc_time = datetime.fromtimestamp(timestamp, tz=ZoneInfo("UTC"))
-            
-            # 根据市场类型设置时区
-            if market_type == "US":
-                # 美国东部时间 (自动处理EST/EDT夏令时)
-                local_time = utc_time.astimezone(ZoneInfo("America/New_York"))
-                # 根据是否夏令时显示不同的时区名称
-                tz_name = local_time.strftime("%Z")  # 自动显示EST或EDT
-            elif market_type == "HK":
-                # 香港时间
-                local_time = utc_time.astimezone(ZoneInfo("Asia/Hong_Kong"))
-                tz_name = "HKT"
-            elif market_type == "CN":
-                # 中国标准时间
-                local_time = utc_time.astimezone(ZoneInfo("Asia/Shanghai"))
-                tz_name = "CST"
-            else:
-                # 默认使用UTC+8
-                local_time = utc_time.astimezone(ZoneInfo("Asia/Shanghai"))
-                tz_name = "UTC+8"
-                
-        except ImportError:
-            # 如果 zoneinfo 不可用，尝试使用 pytz
-            try:
-                import pytz
-                
-                # 创建UTC时间
-                utc_time = datetime.fromtimestamp(timestamp, tz=pytz.UTC)
-                
-                # 根据市场类型设置时区
-                if market_type == "US":
-                    # 美国东部时间 (自动处理EST/EDT夏令时)
-                    eastern = pytz.timezone('America/New_York')
-                    local_time = utc_time.astimezone(eastern)
-                    tz_name = local_time.strftime("%Z")  # 自动显示EST或EDT
-                elif market_type == "HK":
-                    # 香港时间
-                    hk_tz = pytz.timezone('Asia/Hong_Kong')
-                    local_time = utc_time.astimezone(hk_tz)
-                    tz_name = "HKT"
-                elif market_type == "CN":
-                    # 中国标准时间
-                    cn_tz = pytz.timezone('Asia/Shanghai')
-                    local_time = utc_time.astimezone(cn_tz)
-                    tz_name = "CST"
-                else:
-                    # 默认使用UTC+8
-                    cn_tz = pytz.timezone('Asia/Shanghai')
-                    local_time = utc_time.astimezone(cn_tz)
-                    tz_name = "UTC+8"
-                    
-            except ImportError:
-                # 如果都不可用，使用简单的固定偏移（不推荐，但作为后备方案）
-                from datetime import timezone, timedelta
-                
-                utc_time = datetime.fromtimestamp(timestamp, tz=timezone.utc)
-                
-                if market_type == "US":
-                    # 使用固定的UTC-5 (EST)，不处理夏令时
-                    local_tz = timezone(timedelta(hours=-5))
-                    tz_name = "EST"
-                elif market_type in ["HK", "CN"]:
-                    local_tz = timezone(timedelta(hours=8))
-                    tz_name = "HKT" if market_type == "HK" else "CST"
-                else:
-                    local_tz = timezone(timedelta(hours=8))
-                    tz_name = "UTC+8"
-                
-                local_time = utc_time.astimezone(local_tz)
-        
-        # 格式化为字符串（包含时区信息）
-        return f"{local_time.strftime('%Y-%m-%d %H:%M:%S')} {tz_name}"
+        return format_local_times([int(timestamp)], market_type)[0]
     
-    async def get_kline_data(
-        self, 
-        stock_id: str, 
+    async def _fetch_kline_payload(
+        self,
+        stock_id: str,
         kline_type: int = 1,
-        market_type: str = "US",
         symbol: int = None,
         security: int = 1,
         req_section: int = 1
     ) -> Dict[str, Any]:
         """
-        获取K线数据（带缓存）
+        从上游获取原始K线数据（不缓存、不做时间转换）
         
-        缓存策略：
-        - 日K及以上级别（daily/weekly/monthly/quarterly/yearly）使用缓存
-        - 分钟级数据不缓存，每次都从API获取
-        - 缓存有效期：当天，每天0点自动失效
-        
-        Args:
-            stock_id: 股票ID (security_id)
-            kline_type: K线类型
-                - 1: 分时（不缓存）
-                - 2: 日K（缓存）
-                - 3: 周K（缓存）
-                - 4: 月K（缓存）
-                - 5: 年K（缓存）
-                - 11: 季K（缓存）
-            market_type: 市场类型 (US/HK/CN)，用于时区转换
-            symbol: 符号类型（可选，会根据kline_type自动设置）
-            security: 证券类型（默认1）
-            req_section: 请求区段（默认1）
-            
         Returns:
-            K线数据（时间已转换为市场本地时间）
+            上游响应中的 data 字段，格式异常时返回空字典
         """
-        # 尝试从缓存获取（只缓存日K及以上级别）
-        cache = get_kline_cache()
-        cached_data = cache.get(stock_id, kline_type, market_type)
-        if cached_data is not None:
-            return cached_data
-        
         # 根据K线类型自动设置symbol参数
         # 参考富途API的实际参数映射
         if symbol is None:
@@ -1056,40 +1471,202 @@ class FutuClient:
         
         data = await self._request("GET", url, params=params)
         
-        # 处理响应格式
         if isinstance(data, dict):
             kline_data = data.get("data", {})
-            
-            # 转换K线数据中的时间戳
             if isinstance(kline_data, dict):
-                # 处理minus对象
-                if "minus" in kline_data and isinstance(kline_data["minus"], dict):
-                    minus_data = kline_data["minus"]
-                    
-                    # 处理minus.list中的时间戳
-                    kline_list = minus_data.get("list", [])
-                    for item in kline_list:
-                        if "time" in item:
-                            # 添加本地时间字段
-                            item["local_time"] = self._convert_timestamp_to_local_time(item["time"], market_type)
-                    
-                    # 处理minus.time_section中的时间戳
-                    if "time_section" in minus_data and isinstance(minus_data["time_section"], list):
-                        for section in minus_data["time_section"]:
-                            if "begin" in section:
-                                section["begin_local_time"] = self._convert_timestamp_to_local_time(section["begin"], market_type)
-                            if "end" in section:
-                                section["end_local_time"] = self._convert_timestamp_to_local_time(section["end"], market_type)
-                    
-                    # 处理minus.server_time
-                    if "server_time" in minus_data:
-                        minus_data["server_local_time"] = self._convert_timestamp_to_local_time(minus_data["server_time"], market_type)
+                return kline_data
+        return {}
+    
+    @traced("get_kline_data")
+    async def get_kline_data(
+        self, 
+        stock_id: str, 
+        kline_type: int = 1,
+        market_type: str = "US",
+        symbol: int = None,
+        security: int = 1,
+        req_section: int = 1
+    ) -> Dict[str, Any]:
+        """
+        获取原始K线数据（时间戳附带市场本地时间）
+        
+        注意：此方法每次都请求上游；接口层应使用带缓存的 get_kline_bars
+        
+        Args:
+            stock_id: 股票ID (security_id)
+            kline_type: K线类型
+                - 1: 分时
+                - 2: 日K
+                - 3: 周K
+                - 4: 月K
+                - 5: 年K
+                - 11: 季K
+            market_type: 市场类型 (US/HK/CN)，用于时区转换
+            symbol: 符号类型（可选，会根据kline_type自动设置）
+            security: 证券类型（默认1）
+            req_section: 请求区段（默认1）
             
-            # 缓存数据（只缓存日K及以上级别）
-            cache.set(stock_id, kline_type, market_type, kline_data)
+        Returns:
+            K线数据（时间已转换为市场本地时间）
+        """
+        kline_data = await self._fetch_kline_payload(
+            stock_id, kline_type, symbol, security, req_section
+        )
+        
+        # 转换K线数据中的时间戳
+        # 处理minus对象
+        if "minus" in kline_data and isinstance(kline_data["minus"], dict):
+            minus_data = kline_data["minus"]
             
-            return kline_data
-        return {}
+            # 收集所有需要转换的时间戳，一次批量转换：(目标对象, 新字段名, 时间戳)
+            targets = []
+            
+            # 处理minus.list中的时间戳
+            for item in minus_data.get("list", []):
+                if "time" in item:
+                    targets.append((item, "local_time", item["time"]))
+            
+            # 处理minus.time_section中的时间戳
+            if "time_section" in minus_data and isinstance(minus_data["time_section"], list):
+                for section in minus_data["time_section"]:
+                    if "begin" in section:
+                        targets.append((section, "begin_local_time", section["begin"]))
+                    if "end" in section:
+                        targets.append((section, "end_local_time", section["end"]))
+            
+            # 处理minus.server_time
+            if "server_time" in minus_data:
+                targets.append((minus_data, "server_local_time", minus_data["server_time"]))
+            
+            local_times = format_local_times([int(t) for _, _, t in targets], market_type)
+            for (target, field, _), local_time in zip(targets, local_times):
+                target[field] = local_time
+        
+        return kline_data
+    
+    async def _refresh_intraday(self, stock_id: str, market_type: str) -> KlineBars:
+        """
+        从上游获取分时数据并增量合并到分时缓存
+        
+        Returns:
+            合并后的分时序列；没有有效数据时返回空数据，并在 upstream_response 中附带上游响应
+        """
+        kline_data = await self._fetch_kline_payload(stock_id, 1)
+        bars = get_intraday_cache().update(stock_id, market_type, extract_kline_list(kline_data))
+        if len(bars) == 0:
+            return KlineBars.empty(upstream_response=kline_data)
+        return bars
+    
+    async def _refresh_intraday_loop(self, interval_seconds: float) -> None:
+        """后台定时刷新最近被访问过、且已失效的分时序列"""
+        cache = get_intraday_cache()
+        while True:
+            await asyncio.sleep(interval_seconds)
+            keys = cache.keys_to_refresh()
+            if not keys:
+                continue
+            results = await asyncio.gather(
+                *(self._refresh_intraday(stock_id, market_type) for stock_id, market_type in keys),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    cache.record_refresh_error()
+    
+    async def _derive_from_daily(
+        self,
+        stock_id: str,
+        kline_type: int,
+        market_type: str
+    ) -> Optional[KlineBars]:
+        """
+        由日K聚合得到周K/月K/季K/年K
+        
+        Returns:
+            聚合结果；日K历史不足 KLINE_DERIVE_MIN_PERIODS 个完整周期时返回None
+        """
+        daily_bars = await self.get_kline_bars(stock_id, 2, market_type)
+        if len(daily_bars) == 0:
+            return None
+        
+        df = aggregate_daily_kline_data(
+            daily_bars.to_dataframe(),
+            _DERIVED_KLINE_INTERVALS[kline_type],
+            tz=get_market_timezone_name(market_type)
+        )
+        if len(df) < KLINE_DERIVE_MIN_PERIODS:
+            return None
+        bars = KlineBars.from_dataframe(df)
+        bars.derived = True
+        return bars
+    
+    @traced("get_kline_bars")
+    async def get_kline_bars(
+        self,
+        stock_id: str,
+        kline_type: int = 1,
+        market_type: str = "US",
+        min_periods: int = 0
+    ) -> KlineBars:
+        """
+        获取列式K线数据（带缓存）
+        
+        缓存策略：
+        - 日K及以上级别（daily/weekly/monthly/quarterly/yearly）使用K线缓存
+        - 周K/月K/季K/年K优先由日K聚合得到（与日K共用一次上游请求），
+          聚合出的周期数少于 KLINE_DERIVE_MIN_PERIODS 时改为单独请求上游
+        - 聚合结果少于 min_periods（如 close_200_sma 需要200根）时使用单独缓存的上游数据，
+          不覆盖聚合结果，/api/kline 始终得到同一份序列
+        - 分时数据（kline_type=1）使用短有效期的分时缓存，刷新时只追加新的分钟，
+          1min/5min/15min/30min/60min 都由同一份分时序列重采样得到
+        - 缓存中直接保存解析好的NumPy列，命中时无需重新解析
+        
+        Args:
+            stock_id: 股票ID (security_id)
+            kline_type: K线类型（1=分时, 2=日K, 3=周K, 4=月K, 5=年K, 11=季K）
+            market_type: 市场类型 (US/HK/CN)
+            min_periods: 需要的最少K线数（技术指标的窗口长度），只影响是否使用日K聚合结果
+            
+        Returns:
+            KlineBars；没有有效K线时返回空数据，并在 upstream_response 中附带上游响应
+        """
+        if kline_type == 1:
+            cached_bars = get_intraday_cache().get(stock_id, market_type)
+            if cached_bars is not None:
+                return cached_bars
+            return await self._refresh_intraday(stock_id, market_type)
+        
+        cache = get_kline_cache()
+        cached_bars = cache.get(stock_id, kline_type, market_type)
+        if cached_bars is None and KLINE_DERIVE_FROM_DAILY and kline_type in _DERIVED_KLINE_INTERVALS:
+            cached_bars = await self._derive_from_daily(stock_id, kline_type, market_type)
+            if cached_bars is not None:
+                self._derived_klines += 1
+                cache.set(stock_id, kline_type, market_type, cached_bars)
+            else:
+                self._derive_fallbacks += 1
+        
+        variant = ""
+        if cached_bars is not None:
+            if not cached_bars.derived or len(cached_bars) >= min_periods:
+                return cached_bars
+            # 聚合结果不足指标窗口：上游数据单独缓存，不覆盖主缓存项中的聚合结果
+            variant = "upstream"
+            upstream_bars = cache.get(stock_id, kline_type, market_type, variant)
+            if upstream_bars is not None:
+                return upstream_bars
+            self._derive_fallbacks += 1
+        
+        kline_data = await self._fetch_kline_payload(stock_id, kline_type)
+        with span("parse_kline"):
+            bars = parse_kline_list(extract_kline_list(kline_data))
+        
+        if len(bars) == 0:
+            return KlineBars.empty(upstream_response=kline_data)
+        
+        # 缓存数据（只缓存日K及以上级别）
+        cache.set(stock_id, kline_type, market_type, bars, variant)
+        return bars
 
     async def get_technical_analysis(
         self,
@@ -1097,7 +1674,8 @@ class FutuClient:
         interval: str = "daily",
         indicator: str = "macd",
         start_date: str = None,
-        end_date: str = None
+        end_date: str = None,
+        raw_values: bool = False
     ) -> Dict[str, Any]:
         """
         获取技术分析指标（返回时间序列数据）
@@ -1107,12 +1685,14 @@ class FutuClient:
             interval: 时间间隔
                 - 分钟级: 1min, 5min, 15min, 30min, 60min
                 - 日线及以上: daily, weekly, monthly, quarterly, yearly
-            indicator: 要计算的指标（每次只返回一个指标）
+            indicator: 要计算的指标，多个指标用逗号分隔（如 "macd,rsi,boll,atr"）
                 可选指标：close_50_sma, close_200_sma, close_10_ema, macd,
                          rsi, boll, atr, vwma
+                多个指标基于同一份K线数据一次计算，结果按时间合并
                 RSI说明：返回4个周期的RSI值 - RSI(6)/RSI(12)/RSI(14)/RSI(24)
             start_date: 开始日期（可选，格式：YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS）
             end_date: 结束日期（可选，格式：YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS）
+            raw_values: 指标值返回浮点数而不是格式化字符串
         
         Returns:
             包含技术指标时间序列的字典
@@ -1139,6 +1719,17 @@ class FutuClient:
         
         kline_type, resample_interval = interval_mapping[interval]
         
+        # 解析指标列表（逗号分隔，去重并保持顺序）
+        indicators = list(dict.fromkeys(
+            name.strip() for name in (indicator or "").split(",") if name.strip()
+        ))
+        if not indicators:
+            return {
+                "error": "未指定技术指标",
+                "supported_indicators": list(SUPPORTED_INDICATORS.keys())
+            }
+        indicator = ",".join(indicators)
+        
         # 记录是否需要应用默认1个月限制（周K及以下时间间隔，且未指定日期范围）
         # 周K及以下包括：weekly, daily, 60min, 30min, 15min, 5min, 1min
         short_intervals = ["weekly", "daily", "60min", "30min", "15min", "5min", "1min"]
@@ -1148,39 +1739,27 @@ class FutuClient:
         normalized_symbol = self._normalize_stock_code(symbol)
         market_type = self._detect_market_type(normalized_symbol)
         
-        # 搜索股票获取security_id（使用标准化的代码）
-        stocks = await self.search_stock(normalized_symbol, market_type)
-        if not stocks:
+        # 解析股票代码获取security_id（带缓存）
+        stock = await self.resolve_stock(normalized_symbol, market_type)
+        if not stock:
             return {
                 "error": f"未找到股票: {symbol}",
                 "symbol": symbol,
                 "market_type": market_type
             }
         
-        stock = stocks[0]
         security_id = stock.security_id
         
-        # 获取K线数据
-        kline_data = await self.get_kline_data(
+        # 获取列式K线数据（带缓存）
+        # 由日K聚合的周K/月K等不足指标窗口长度（如 close_200_sma 需要200根）时改用上游数据
+        bars = await self.get_kline_bars(
             stock_id=security_id,
             kline_type=kline_type,
-            market_type=market_type
+            market_type=market_type,
+            min_periods=indicator_window([name for name in indicators if name in SUPPORTED_INDICATORS])
         )
         
-        # 提取K线列表
-        # 尝试不同的数据路径
-        kline_list = kline_data.get("minus", {}).get("list", [])
-        
-        # 如果 minus.list 为空，尝试其他路径
-        if not kline_list:
-            # 尝试直接从 data 获取
-            if "data" in kline_data:
-                kline_list = kline_data["data"].get("list", [])
-            # 尝试从根级别获取
-            if not kline_list and "list" in kline_data:
-                kline_list = kline_data["list"]
-        
-        if not kline_list:
+        if len(bars) == 0:
             return {
                 "error": "未获取到K线数据",
                 "symbol": symbol,
@@ -1188,297 +1767,102 @@ class FutuClient:
                 "market_type": market_type,
                 "interval": interval,
                 "message": "可能原因：1) 该股票在指定日期范围内没有交易数据 2) 股票代码不正确 3) 市场休市",
-                "upstream_response": kline_data
+                "upstream_response": bars.upstream_response
             }
         
-        # 解析日期范围（如果提供）
-        start_timestamp = None
-        end_timestamp = None
-        
-        if start_date:
-            from datetime import datetime
-            try:
-                # 清理日期字符串
-                start_date = start_date.strip()
-                
-                # 只接受日期格式 YYYY-MM-DD
-                if len(start_date) != 10:
-                    return {
-                        "error": f"日期格式错误: {start_date}，请只使用日期格式 YYYY-MM-DD（如 2025-11-01）",
-                        "symbol": symbol
-                    }
-                
-                # 根据市场类型使用对应的时区
-                try:
-                    from zoneinfo import ZoneInfo
-                    if market_type == "US":
-                        tz = ZoneInfo("America/New_York")
-                    elif market_type == "HK":
-                        tz = ZoneInfo("Asia/Hong_Kong")
-                    elif market_type == "CN":
-                        tz = ZoneInfo("Asia/Shanghai")
-                    else:
-                        tz = ZoneInfo("Asia/Shanghai")
-                    
-                    start_dt = datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=tz)
-                except ImportError:
-                    # 如果 zoneinfo 不可用，使用 pytz
-                    import pytz
-                    if market_type == "US":
-                        tz = pytz.timezone("America/New_York")
-                    elif market_type == "HK":
-                        tz = pytz.timezone("Asia/Hong_Kong")
-                    elif market_type == "CN":
-                        tz = pytz.timezone("Asia/Shanghai")
-                    else:
-                        tz = pytz.timezone("Asia/Shanghai")
-                    
-                    start_dt = tz.localize(datetime.strptime(start_date, "%Y-%m-%d"))
-                
-                start_timestamp = int(start_dt.timestamp())
-            except ValueError as e:
+        # 校验日期范围（只接受日期格式 YYYY-MM-DD，按市场本地日期），在生成结果缓存键之前统一去除空白
+        start_date = start_date.strip() if start_date else start_date
+        end_date = end_date.strip() if end_date else end_date
+        for label, date_value in (("开始", start_date), ("结束", end_date)):
+            if not date_value:
+                continue
+            if len(date_value) != 10:
                 return {
-                    "error": f"无效的开始日期格式: {start_date}，请使用 YYYY-MM-DD",
-                    "detail": str(e),
+                    "error": f"日期格式错误: {date_value}，请只使用日期格式 YYYY-MM-DD（如 2025-11-01）",
                     "symbol": symbol
                 }
-        
-        if end_date:
-            from datetime import datetime, timedelta
             try:
-                # 清理日期字符串
-                end_date = end_date.strip()
-                
-                # 只接受日期格式 YYYY-MM-DD
-                if len(end_date) != 10:
-                    return {
-                        "error": f"日期格式错误: {end_date}，请只使用日期格式 YYYY-MM-DD（如 2025-11-01）",
-                        "symbol": symbol
-                    }
-                
-                # 根据市场类型使用对应的时区
-                try:
-                    from zoneinfo import ZoneInfo
-                    if market_type == "US":
-                        tz = ZoneInfo("America/New_York")
-                    elif market_type == "HK":
-                        tz = ZoneInfo("Asia/Hong_Kong")
-                    elif market_type == "CN":
-                        tz = ZoneInfo("Asia/Shanghai")
-                    else:
-                        tz = ZoneInfo("Asia/Shanghai")
-                    
-                    end_dt = datetime.strptime(end_date, "%Y-%m-%d").replace(tzinfo=tz)
-                except ImportError:
-                    # 如果 zoneinfo 不可用，使用 pytz
-                    import pytz
-                    if market_type == "US":
-                        tz = pytz.timezone("America/New_York")
-                    elif market_type == "HK":
-                        tz = pytz.timezone("Asia/Hong_Kong")
-                    elif market_type == "CN":
-                        tz = pytz.timezone("Asia/Shanghai")
-                    else:
-                        tz = pytz.timezone("Asia/Shanghai")
-                    
-                    end_dt = tz.localize(datetime.strptime(end_date, "%Y-%m-%d"))
-                
-                # 设置为当天的23:59:59
-                end_dt = end_dt + timedelta(days=1) - timedelta(seconds=1)
-                end_timestamp = int(end_dt.timestamp())
+                local_date_bounds(date_value, None, market_type)
             except ValueError as e:
                 return {
-                    "error": f"无效的结束日期格式: {end_date}，请使用 YYYY-MM-DD",
+                    "error": f"无效的{label}日期格式: {date_value}，请使用 YYYY-MM-DD",
                     "detail": str(e),
                     "symbol": symbol
                 }
         
-        # 转换为DataFrame
+        # K线未变化（数量和最后一根K线相同）时直接返回上次的计算结果
+        result_cache = get_indicator_cache()
+        cache_key = (security_id, interval, indicator, start_date, end_date, raw_values)
+        fingerprint = bars_fingerprint(bars)
+        cached = result_cache.get(cache_key, fingerprint)
+        if cached is not None:
+            return {**cached, "meta": {**cached["meta"], "symbol": symbol}}
+        
         # 注意：不要在这里过滤日期范围！需要用所有历史数据计算技术指标
         # 日期范围过滤应该在计算完指标后，只过滤返回结果
-        df_data = []
-        for item in kline_list:
-            # 判断数据格式：日K及以上使用 k/o/c/h/l/v，分时使用 time/price/open/high/low/volume
-            
-            # 时间字段
-            time_val = item.get("time") or item.get("k")
-            
-            # 收盘价
-            close_price = item.get("cc_price")
-            if close_price is None:
-                # 尝试 c 字段（日K格式）
-                close_price = item.get("c")
-                if close_price is not None:
-                    # 检查是否需要除以10000（如果值过大，说明是原始值）
-                    close_price = float(close_price)
-                    # 如果价格大于100000，很可能需要除以10000
-                    if close_price > 100000:
-                        close_price = close_price / 10000
-                else:
-                    # 尝试 price 字段（分时格式）
-                    price_raw = item.get("price", 0)
-                    close_price = price_raw / 10000 if price_raw else 0
-            else:
-                close_price = float(close_price)
-            
-            # 开盘价
-            open_price = item.get("cc_open")
-            if open_price is None:
-                # 尝试 o 字段（日K格式）
-                open_price = item.get("o")
-                if open_price is not None:
-                    # 检查是否需要除以10000（如果值过大，说明是原始值）
-                    open_price = float(open_price)
-                    if open_price > 100000:
-                        open_price = open_price / 10000
-                else:
-                    # 尝试 open 字段（分时格式）
-                    open_raw = item.get("open", 0)
-                    open_price = open_raw / 10000 if open_raw else 0
-            else:
-                open_price = float(open_price)
-            
-            # 最高价
-            high_price = item.get("cc_high")
-            if high_price is None:
-                # 尝试 h 字段（日K格式）
-                high_price = item.get("h")
-                if high_price is not None:
-                    # 检查是否需要除以10000（如果值过大，说明是原始值）
-                    high_price = float(high_price)
-                    if high_price > 100000:
-                        high_price = high_price / 10000
-                else:
-                    # 尝试 high 字段（分时格式）
-                    high_raw = item.get("high", 0)
-                    high_price = high_raw / 10000 if high_raw else 0
-            else:
-                high_price = float(high_price)
-            
-            # 最低价
-            low_price = item.get("cc_low")
-            if low_price is None:
-                # 尝试 l 字段（日K格式）
-                low_price = item.get("l")
-                if low_price is not None:
-                    # 检查是否需要除以10000（如果值过大，说明是原始值）
-                    low_price = float(low_price)
-                    if low_price > 100000:
-                        low_price = low_price / 10000
-                else:
-                    # 尝试 low 字段（分时格式）
-                    low_raw = item.get("low", 0)
-                    low_price = low_raw / 10000 if low_raw else 0
-            else:
-                low_price = float(low_price)
-            
-            # 成交量
-            volume = item.get("volume") or item.get("v", 0)
-            
-            df_data.append({
-                "time": time_val,
-                "open": open_price,
-                "high": high_price,
-                "low": low_price,
-                "close": close_price,
-                "volume": volume
-            })
-        
-        # 检查是否有有效数据
-        if not df_data:
-            return {
-                "error": "指定日期范围内没有有效的K线数据",
-                "symbol": symbol,
-                "stock_name": stock.stock_name,
-                "market_type": market_type,
-                "interval": interval,
-                "date_range": {
-                    "start_date": start_date,
-                    "end_date": end_date
-                },
-                "message": "可能原因：1) 该日期范围内市场休市 2) 日期范围超出数据可用范围 3) 股票在该时间段未交易"
-            }
         
-        df = pd.DataFrame(df_data)
-        
-        # 确保所有价格列都是浮点数类型
-        try:
-            df['open'] = df['open'].astype(float)
-            df['high'] = df['high'].astype(float)
-            df['low'] = df['low'].astype(float)
-            df['close'] = df['close'].astype(float)
-            df['volume'] = df['volume'].astype(int)
-        except KeyError as e:
-            return {
-                "error": f"数据格式错误，缺少必需字段: {str(e)}",
-                "symbol": symbol,
-                "stock_name": stock.stock_name,
-                "interval": interval,
-                "available_columns": list(df.columns) if len(df) > 0 else [],
-                "message": "上游API返回的数据格式不符合预期"
-            }
-        
-        # 过滤掉无效数据（价格为0或时间为空）
-        df = df[(df['close'] > 0) & (df['time'].notna())].copy()
-        
-        # 对于 open/high/low 为 0 的情况，使用 close 价格填充
-        mask_open = df['open'] == 0
-        mask_high = df['high'] == 0
-        mask_low = df['low'] == 0
+        # 如果是周K及以下时间间隔且未指定日期范围，设置默认返回最近1个月的结果
+        # 注意：不要在这里过滤K线，因为需要用所有历史数据计算技术指标
+        # 只需要记录日期范围，稍后过滤返回结果
+        if apply_default_range and not start_date and not end_date:
+            # 获取数据中的最新时间戳（K线按时间升序）
+            latest_timestamp = int(bars.time[-1])
+            # 计算1个月前的时间戳（30天）
+            one_month_ago_timestamp = latest_timestamp - (30 * 24 * 60 * 60)
+            # 记录自动设置的日期范围（按市场本地日期，与 local_date_bounds 一致，用于后续过滤返回结果）
+            start_date, end_date = format_local_times(
+                [one_month_ago_timestamp, latest_timestamp], market_type, date_only=True
+            )
         
-        df.loc[mask_open, 'open'] = df.loc[mask_open, 'close']
-        df.loc[mask_high, 'high'] = df.loc[mask_high, 'close']
-        df.loc[mask_low, 'low'] = df.loc[mask_low, 'close']
+        pool = get_worker_pool()
         
-        if len(df) == 0:
+        # 分时级别复用该股票+时间间隔的流式计算图：重采样和指标更新都只处理新增/变化的分钟
+        # 计算图保存在本进程中，进程池模式下子进程各自持有一份且每次都要pickle全部分钟K线，因此改为全量计算
+        streaming_key = (
+            (security_id, interval)
+            if kline_type == 1 and STREAMING_INDICATORS_ENABLED and pool.mode != "process"
+            else None
+        )
+        indicator_data = None
+        if streaming_key is not None:
+            indicator_data, summary = await pool.run(
+                "calculate_indicators", compute_streaming_indicator_data,
+                bars, resample_interval, indicators, market_type, interval, raw_values,
+                streaming_key, start_date, end_date
+            )
+        else:
+            # 转换为DataFrame（缓存中已是解析好的列，无需逐条解析）
+            df = bars.to_dataframe()
+            # 如果是分时数据且需要重采样（CPU密集，在工作池中执行，不阻塞事件循环）
+            if resample_interval:
+                df = await pool.run("resample_kline_data", resample_kline_data, df, resample_interval)
+            summary = kline_summary(df)
+        
+        # 检查重采样后是否有足够的数据
+        if resample_interval and summary["count"] < 20:
             return {
-                "error": "过滤后没有有效的K线数据",
+                "error": f"重采样后数据不足（仅{summary['count']}条），无法计算技术指标",
                 "symbol": symbol,
                 "stock_name": stock.stock_name,
                 "market_type": market_type,
-                "interval": interval,
-                "message": "所有数据点的价格都为0或时间戳无效"
+                "interval": interval
             }
         
-        # 如果是周K及以下时间间隔且未指定日期范围，设置默认返回最近1个月的结果
-        # 注意：不要在这里过滤df，因为需要用所有历史数据计算技术指标
-        # 只需要记录日期范围，稍后过滤返回结果
-        if apply_default_range and len(df) > 0 and not start_date and not end_date:
-            from datetime import datetime, timedelta
-            # 获取数据中的最新时间戳
-            latest_timestamp = df['time'].max()
-            # 计算1个月前的时间戳（30天）
-            one_month_ago_timestamp = latest_timestamp - (30 * 24 * 60 * 60)
-            # 记录自动设置的日期范围（用于后续过滤返回结果）
-            start_date = datetime.fromtimestamp(one_month_ago_timestamp).strftime("%Y-%m-%d")
-            end_date = datetime.fromtimestamp(latest_timestamp).strftime("%Y-%m-%d")
-        
-        # 如果是分时数据且需要重采样
-        if resample_interval:
-            from technical_indicators import resample_kline_data
-            df = resample_kline_data(df, resample_interval)
-            
-            # 检查重采样后是否有足够的数据
-            if len(df) < 20:
-                return {
-                    "error": f"重采样后数据不足（仅{len(df)}条），无法计算技术指标",
-                    "symbol": symbol,
-                    "stock_name": stock.stock_name,
-                    "market_type": market_type,
-                    "interval": interval
-                }
-        
-        # 计算技术指标（返回时间序列）
-        from technical_indicators import calculate_single_indicator, SUPPORTED_INDICATORS
-        
         # 验证指标是否支持
-        if indicator not in SUPPORTED_INDICATORS:
+        unsupported = [name for name in indicators if name not in SUPPORTED_INDICATORS]
+        if unsupported:
             return {
-                "error": f"不支持的指标: {indicator}",
+                "error": f"不支持的指标: {', '.join(unsupported)}",
                 "supported_indicators": list(SUPPORTED_INDICATORS.keys())
             }
         
-        indicator_data = calculate_single_indicator(df, indicator, market_type, self._convert_timestamp_to_local_time, interval)
+        # 计算日期范围内的技术指标（返回时间序列），在工作池中执行
+        # 只截取范围内K线加上预热所需的历史K线计算，确保MACD等指标的准确性
+        if indicator_data is None:
+            indicator_data = await pool.run(
+                "calculate_indicators", compute_indicator_data,
+                df, indicators, market_type, interval, raw_values, start_date, end_date
+            )
         
         # 检查是否有错误
         if isinstance(indicator_data, dict) and "error" in indicator_data:
@@ -1489,41 +1873,8 @@ class FutuClient:
                 "market_type": market_type
             }
         
-        # 如果用户指定了日期范围，只返回该范围内的指标数据
-        # 但计算时使用了所有历史数据，确保MACD等指标的准确性
-        if start_date or end_date:
-            from datetime import datetime
-            filtered_data = {}
-            
-            for date_str, values in indicator_data.items():
-                # 解析日期字符串
-                try:
-                    # 尝试解析不同的日期格式
-                    if len(date_str) == 10:  # YYYY-MM-DD
-                        item_date = datetime.strptime(date_str, "%Y-%m-%d")
-                    else:  # YYYY-MM-DD HH:MM:SS
-                        item_date = datetime.strptime(date_str.split()[0], "%Y-%m-%d")
-                    
-                    # 检查是否在日期范围内
-                    if start_date:
-                        req_start = datetime.strptime(start_date, "%Y-%m-%d")
-                        if item_date < req_start:
-                            continue
-                    
-                    if end_date:
-                        req_end = datetime.strptime(end_date, "%Y-%m-%d")
-                        if item_date > req_end:
-                            continue
-                    
-                    filtered_data[date_str] = values
-                except:
-                    # 如果日期解析失败，保留该数据
-                    filtered_data[date_str] = values
-            
-            indicator_data = filtered_data
-        
         # 获取最新价格
-        latest_price = df['close'].iloc[-1]
+        latest_price = summary["latest_price"]
         
         # 获取时间范围（使用过滤后的数据）
         if indicator_data:
@@ -1532,11 +1883,8 @@ class FutuClient:
             first_date = dates[0]
             last_date = dates[-1]
         else:
-            # 如果没有数据，使用原始df的范围
-            start_time = int(df['time'].iloc[0])
-            end_time = int(df['time'].iloc[-1])
-            first_date = self._convert_timestamp_to_local_time(start_time, market_type)
-            last_date = self._convert_timestamp_to_local_time(end_time, market_type)
+            # 如果没有数据，使用K线的范围
+            first_date, last_date = format_local_times([summary["start_time"], summary["end_time"]], market_type)
         
         result = {
             "meta": {
@@ -1546,7 +1894,7 @@ class FutuClient:
                 "market_type": market_type,
                 "interval": interval,
                 "indicator": indicator,
-                "indicator_name": SUPPORTED_INDICATORS[indicator][0],
+                "indicator_name": ", ".join(SUPPORTED_INDICATORS[name][0] for name in indicators),
                 "latest_price": float(latest_price),
                 "data_points": len(indicator_data),
                 "start_date": first_date,
@@ -1555,10 +1903,14 @@ class FutuClient:
             "data": indicator_data
         }
         
+        if len(indicators) > 1:
+            result["meta"]["indicators"] = indicators
+        
         # 如果指定了日期范围，添加到meta中
         if start_date:
             result["meta"]["requested_start_date"] = start_date
         if end_date:
             result["meta"]["requested_end_date"] = end_date
         
+        result_cache.set(cache_key, fingerprint, result)
         return result
@@ -0,0 +1,127 @@
+"""技术指标结果缓存模块
+
+缓存 /api/technical-analysis 的完整结果，键为 (security_id, 时间间隔, 指标, 日期范围, 返回格式)。
+每个结果记录计算时K线的指纹（K线数量、最后一根K线的时间和收盘价，以及影响ATR/VWMA的最高/最低价和成交量）：
+- 读取时用K线缓存中的当前K线校验指纹，一致则直接返回缓存结果
+- 新K线到达或最后一根K线价格变化时指纹不一致，结果失效并重新计算
+"""
+from typing import Any, Dict, Optional, Tuple
+from collections import OrderedDict
+import threading
+
+from config import INDICATOR_CACHE_MAX_ENTRIES
+from kline_bars import KlineBars
+
+
+def bars_fingerprint(bars: KlineBars) -> tuple:
+    """K线指纹：(K线数量, 最后一根K线的时间, 收盘价, 最高价, 最低价, 成交量)"""
+    if len(bars) == 0:
+        return (0,)
+    return (
+        len(bars), int(bars.time[-1]), float(bars.close[-1]),
+        float(bars.high[-1]), float(bars.low[-1]), int(bars.volume[-1])
+    )
+
+
+class IndicatorResultCache:
+    """技术指标结果缓存类
+
+    缓存策略：
+    - 以 (security_id, 时间间隔, 指标, 开始日期, 结束日期, 是否返回浮点数) 为键
+    - 不设有效期，由K线指纹校验：指纹不一致时视为未命中并删除
+    - 超过 max_entries 时按LRU淘汰
+    - 缓存的结果被多个请求共享，调用方不应修改
+    - 线程安全
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最大缓存条目数（<=0 表示不缓存）
+        """
+        # key -> (K线指纹, 结果)
+        self._cache: "OrderedDict[tuple, Tuple[tuple, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._evictions = 0
+
+    def get(self, key: tuple, fingerprint: tuple) -> Optional[Dict[str, Any]]:
+        """
+        获取与当前K线指纹一致的缓存结果
+
+        Args:
+            key: 缓存键
+            fingerprint: 当前K线指纹（bars_fingerprint）
+
+        Returns:
+            缓存的结果，不存在或K线已变化时返回None
+        """
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            cached_fingerprint, result = entry
+            if cached_fingerprint != fingerprint:
+                del self._cache[key]
+                self._invalidations += 1
+                self._misses += 1
+                return None
+
+            self._cache.move_to_end(key)
+            self._hits += 1
+            return result
+
+    def set(self, key: tuple, fingerprint: tuple, result: Dict[str, Any]) -> None:
+        """
+        缓存计算结果
+
+        Args:
+            key: 缓存键
+            fingerprint: 计算时使用的K线指纹
+            result: 计算结果
+        """
+        if self._max_entries <= 0:
+            return
+
+        with self._lock:
+            self._cache[key] = (fingerprint, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._max_entries:
+                self._cache.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """清空所有缓存"""
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "total_cached": len(self._cache),
+                "max_entries": self._max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+                "invalidations": self._invalidations,
+                "evictions": self._evictions
+            }
+
+
+# 全局缓存实例
+_indicator_cache = IndicatorResultCache(max_entries=INDICATOR_CACHE_MAX_ENTRIES)
+
+
+def get_indicator_cache() -> IndicatorResultCache:
+    """获取全局技术指标结果缓存实例"""
+    return _indicator_cache
@@ -0,0 +1,277 @@
+"""分时K线增量缓存模块
+
+缓存分时数据（kline_type=1）的列式K线，1min/5min/15min/30min/60min 共用同一份序列：
+- 有效期很短（默认几秒），交易时段外有效到下一个交易时段开盘
+- 刷新时只解析并追加上游列表中的新分钟（最后一根可能尚未走完，会被替换），
+  已存储的历史分钟不再重复解析
+- 最近被访问过的序列由后台定时刷新，请求通常直接命中缓存
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime
+import threading
+import time
+
+import numpy as np
+
+from config import (
+    INTRADAY_CACHE_TTL, INTRADAY_CACHE_IDLE_SECONDS, INTRADAY_CACHE_MAX_ENTRIES,
+    KLINE_CACHE_CLOSE_GRACE
+)
+from kline_bars import KlineBars, parse_kline_list
+from market_time import next_kline_change_time
+
+
+def _item_time(item: Dict[str, Any]) -> float:
+    """读取单条上游K线的时间戳（分时为 time，日K格式为 k）"""
+    try:
+        return float(item.get("time") or item.get("k") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _concat(head: KlineBars, tail: KlineBars) -> KlineBars:
+    """拼接两段列式K线（head 在前）"""
+    return KlineBars(
+        np.concatenate((head.time, tail.time)),
+        np.concatenate((head.open, tail.open)),
+        np.concatenate((head.high, tail.high)),
+        np.concatenate((head.low, tail.low)),
+        np.concatenate((head.close, tail.close)),
+        np.concatenate((head.volume, tail.volume))
+    )
+
+
+def merge_intraday_bars(
+    current: Optional[KlineBars],
+    kline_list: List[Dict[str, Any]]
+) -> Tuple[KlineBars, int]:
+    """
+    将最新的上游分时列表增量合并到已缓存的序列
+
+    - 没有缓存、或上游序列起点晚于缓存起点（新交易日）时，完整解析
+    - 否则保留缓存中早于最后一根K线的部分，只解析上游列表尾部
+      时间 >= 缓存最后一根K线的条目（最后一根可能尚未走完，需要替换）
+
+    Args:
+        current: 已缓存的分时序列
+        kline_list: 上游返回的分时列表（按时间升序）
+
+    Returns:
+        (合并后的序列, 本次解析的上游条目数)
+    """
+    if current is None or len(current) == 0 or not kline_list:
+        return parse_kline_list(kline_list), len(kline_list)
+
+    first_time = _item_time(kline_list[0])
+    if first_time > current.time[0]:
+        # 上游序列已切换到新的交易日
+        return parse_kline_list(kline_list), len(kline_list)
+
+    cut = float(current.time[-1])
+    start = len(kline_list)
+    while start > 0 and _item_time(kline_list[start - 1]) >= cut:
+        start -= 1
+
+    tail = parse_kline_list(kline_list[start:])
+    keep = int(np.searchsorted(current.time, cut, side="left"))
+    if len(tail) == 0:
+        return current, 0
+    return _concat(current.filter(slice(0, keep)), tail), len(kline_list) - start
+
+
+class IntradayCache:
+    """分时K线缓存类
+
+    缓存策略：
+    - 以 (市场类型, 股票ID) 为键，每只股票一份分时序列
+    - 交易时段内 ttl_seconds 后失效，非交易时段有效到下一个交易时段开盘
+    - 超过 idle_seconds 未被访问的序列不再后台刷新，超过 max_entries 时按LRU淘汰
+    - 线程安全
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 5,
+        idle_seconds: float = 120,
+        max_entries: int = 500,
+        close_grace_seconds: float = 900
+    ):
+        """
+        初始化缓存
+
+        Args:
+            ttl_seconds: 交易时段内的有效期（秒）
+            idle_seconds: 序列多久未被访问后停止后台刷新（秒）
+            max_entries: 最大缓存条目数（<=0 表示不限制）
+            close_grace_seconds: 收盘后仍视为交易时段的宽限期（秒）
+        """
+        # key -> {"bars", "updated_at", "expires_at", "accessed_at"}
+        self._cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._ttl_seconds = ttl_seconds
+        self._idle_seconds = idle_seconds
+        self._max_entries = max_entries
+        self._close_grace_seconds = close_grace_seconds
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._refreshes = 0
+        self._refresh_errors = 0
+        self._items_parsed = 0
+        self._items_received = 0
+
+    def _compute_expires_at(self, market_type: str, now: float) -> float:
+        """计算失效时间：交易时段内为 now + TTL，否则为下一个交易时段开盘"""
+        expires_at = next_kline_change_time(
+            market_type,
+            now,
+            session_ttl_seconds=self._ttl_seconds,
+            close_grace_seconds=self._close_grace_seconds
+        )
+        return expires_at if expires_at is not None else now + self._ttl_seconds
+
+    def get(self, stock_id: str, market_type: str) -> Optional[KlineBars]:
+        """从缓存获取仍然有效的分时序列，不存在或已失效时返回None"""
+        key = (market_type, stock_id)
+        now = time.time()
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                entry["accessed_at"] = now
+                self._cache.move_to_end(key)
+                if now < entry["expires_at"]:
+                    self._hits += 1
+                    return entry["bars"]
+            self._misses += 1
+            return None
+
+    def update(self, stock_id: str, market_type: str, kline_list: List[Dict[str, Any]]) -> KlineBars:
+        """
+        用最新的上游分时列表增量更新缓存
+
+        Args:
+            stock_id: 股票ID
+            market_type: 市场类型
+            kline_list: 上游返回的分时列表
+
+        Returns:
+            更新后的分时序列（上游没有有效数据时返回空序列，且不写入缓存）
+        """
+        key = (market_type, stock_id)
+        with self._lock:
+            entry = self._cache.get(key)
+            current = entry["bars"] if entry is not None else None
+
+        bars, parsed = merge_intraday_bars(current, kline_list)
+        now = time.time()
+
+        with self._lock:
+            self._refreshes += 1
+            self._items_parsed += parsed
+            self._items_received += len(kline_list)
+            if len(bars) == 0:
+                return bars
+
+            entry = self._cache.get(key)
+            self._cache[key] = {
+                "bars": bars,
+                "updated_at": now,
+                "expires_at": self._compute_expires_at(market_type, now),
+                "accessed_at": entry["accessed_at"] if entry is not None else now
+            }
+            self._cache.move_to_end(key)
+            while self._max_entries > 0 and len(self._cache) > self._max_entries:
+                self._cache.popitem(last=False)
+                self._evictions += 1
+        return bars
+
+    def record_refresh_error(self) -> None:
+        """记录一次后台刷新失败"""
+        with self._lock:
+            self._refresh_errors += 1
+
+    def keys_to_refresh(self) -> List[Tuple[str, str]]:
+        """
+        获取需要后台刷新的序列，并清理长时间未被访问的序列
+
+        Returns:
+            [(股票ID, 市场类型)]：最近被访问过且已到失效时间的序列
+        """
+        now = time.time()
+        keys = []
+        with self._lock:
+            for key, entry in list(self._cache.items()):
+                if now - entry["accessed_at"] > self._idle_seconds:
+                    if now >= entry["expires_at"]:
+                        del self._cache[key]
+                    continue
+                if now >= entry["expires_at"]:
+                    market_type, stock_id = key
+                    keys.append((stock_id, market_type))
+        return keys
+
+    def clear(self) -> None:
+        """清空所有缓存"""
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        now = time.time()
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "total_cached": len(self._cache),
+                "valid_count": sum(1 for entry in self._cache.values() if now < entry["expires_at"]),
+                "max_entries": self._max_entries,
+                "ttl_seconds": self._ttl_seconds,
+                "idle_seconds": self._idle_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "refreshes": self._refreshes,
+                "refresh_errors": self._refresh_errors,
+                "items_received": self._items_received,
+                "items_parsed": self._items_parsed
+            }
+
+    def get_cache_info(self, stock_id: str, market_type: str) -> Dict[str, Any]:
+        """获取指定分时序列的缓存信息"""
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get((market_type, stock_id))
+            if entry is None:
+                return {
+                    "cached": False,
+                    "reason": "缓存不存在"
+                }
+            bars = entry["bars"]
+            return {
+                "cached": True,
+                "valid": now < entry["expires_at"],
+                "bars": len(bars),
+                "last_bar_time": int(bars.time[-1]) if len(bars) else None,
+                "estimated_bytes": bars.nbytes,
+                "cache_time": datetime.fromtimestamp(entry["updated_at"]).isoformat(),
+                "age_seconds": now - entry["updated_at"],
+                "remaining_seconds": max(entry["expires_at"] - now, 0),
+                "expires_at": datetime.fromtimestamp(entry["expires_at"]).isoformat()
+            }
+
+
+# 全局缓存实例
+_intraday_cache = IntradayCache(
+    ttl_seconds=INTRADAY_CACHE_TTL,
+    idle_seconds=INTRADAY_CACHE_IDLE_SECONDS,
+    max_entries=INTRADAY_CACHE_MAX_ENTRIES,
+    close_grace_seconds=KLINE_CACHE_CLOSE_GRACE
+)
+
+
+def get_intraday_cache() -> IntradayCache:
+    """获取全局分时K线缓存实例"""
+    return _intraday_cache
@@ -0,0 +1,67 @@
+"""JSON编解码模块
+
+安装了 orjson 时使用 orjson（比标准库快数倍，原生支持 numpy 数组和标量），
+未安装时回退到标准库 json。两种实现的输出格式一致：UTF-8、不转义非ASCII字符、无多余空格。
+
+- loads: 解析上游响应（直接解析 response.content 的字节，不先解码为字符串）
+- dumps: 序列化接口响应
+- FastJSONResponse: 使用 dumps 渲染的 JSONResponse；接口直接返回它时可跳过
+  FastAPI 对返回值的 jsonable_encoder 逐项转换
+"""
+from typing import Any, Union
+import json
+
+import numpy as np
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+from tracing import span
+
+# orjson 为可选依赖，未安装时回退到标准库 json
+try:
+    import orjson
+    JSON_BACKEND = "orjson"
+except ImportError:
+    orjson = None
+    JSON_BACKEND = "json"
+
+
+def _default(obj: Any) -> Any:
+    """序列化 JSON 原生不支持的类型（numpy 数组/标量、pydantic 模型）"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def loads(data: Union[bytes, str]) -> Any:
+        """解析JSON（字节或字符串）"""
+        return orjson.loads(data)
+
+    def dumps(obj: Any) -> bytes:
+        """序列化为UTF-8编码的JSON字节"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+else:
+    def loads(data: Union[bytes, str]) -> Any:
+        """解析JSON（字节或字符串）"""
+        return json.loads(data)
+
+    def dumps(obj: Any) -> bytes:
+        """序列化为UTF-8编码的JSON字节"""
+        return json.dumps(
+            obj, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """使用 json_codec.dumps 渲染的JSON响应（渲染耗时记为 Server-Timing 的 render 阶段）"""
+
+    def render(self, content: Any) -> bytes:
+        with span("render"):
+            return dumps(content)
@@ -0,0 +1,289 @@
+"""K线列式数据模块
+
+将上游返回的K线列表解析为按时间升序排列的NumPy列（time/open/high/low/close/volume），
+供K线缓存直接存储，接口层无需每次重新解析。
+"""
+from operator import itemgetter
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+
+class KlineBars:
+    """列式K线数据
+
+    - 所有列为等长的NumPy数组，按时间升序排列
+    - time: Unix时间戳（秒，int64）
+    - open/high/low/close: 价格（float64，已完成 /10000 换算）
+    - volume: 成交量（int64）
+    - 数组为只读，缓存中的数据可被多个请求安全共享
+    """
+
+    __slots__ = ("time", "open", "high", "low", "close", "volume", "upstream_response", "derived")
+
+    def __init__(
+        self,
+        time: np.ndarray,
+        open: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+        upstream_response: Optional[Dict[str, Any]] = None
+    ):
+        self.time = time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        # 上游原始响应（仅在没有有效K线时保留，用于返回排错信息）
+        self.upstream_response = upstream_response
+        # 是否由日K聚合得到（历史长度受日K历史限制）
+        self.derived = False
+
+        for column in (self.time, self.open, self.high, self.low, self.close, self.volume):
+            column.flags.writeable = False
+
+    @classmethod
+    def empty(cls, upstream_response: Optional[Dict[str, Any]] = None) -> "KlineBars":
+        """创建空的K线数据"""
+        return cls(
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.int64),
+            upstream_response=upstream_response
+        )
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    @property
+    def nbytes(self) -> int:
+        """所有列占用的字节数（用于缓存内存估算）"""
+        return (
+            self.time.nbytes + self.open.nbytes + self.high.nbytes
+            + self.low.nbytes + self.close.nbytes + self.volume.nbytes
+        )
+
+    def filter(self, mask) -> "KlineBars":
+        """按布尔掩码或切片筛选K线，返回新的KlineBars（切片时各列为零拷贝视图）"""
+        return KlineBars(
+            self.time[mask], self.open[mask], self.high[mask],
+            self.low[mask], self.close[mask], self.volume[mask]
+        )
+
+    def time_range(self, start_time: Optional[int] = None, end_time: Optional[int] = None) -> "KlineBars":
+        """
+        按时间范围截取K线（在升序时间列上二分查找，返回零拷贝视图）
+
+        Args:
+            start_time: 开始时间戳（包含，None表示不限制）
+            end_time: 结束时间戳（包含，None表示不限制）
+
+        Returns:
+            范围内的K线；范围覆盖全部数据时返回自身
+        """
+        lo = 0 if start_time is None else int(np.searchsorted(self.time, start_time, side="left"))
+        hi = len(self) if end_time is None else int(np.searchsorted(self.time, end_time, side="right"))
+        if lo == 0 and hi == len(self):
+            return self
+        return self.filter(slice(lo, max(lo, hi)))
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "KlineBars":
+        """从包含 time/open/high/low/close/volume 列的DataFrame创建"""
+        return cls(
+            df["time"].to_numpy(dtype=np.int64),
+            df["open"].to_numpy(dtype=np.float64),
+            df["high"].to_numpy(dtype=np.float64),
+            df["low"].to_numpy(dtype=np.float64),
+            df["close"].to_numpy(dtype=np.float64),
+            df["volume"].to_numpy(dtype=np.int64)
+        )
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """转换为包含 time/open/high/low/close/volume 列的DataFrame"""
+        return pd.DataFrame({
+            "time": self.time,
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "volume": self.volume
+        })
+
+
+def extract_kline_list(kline_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    从上游K线响应中提取K线列表
+
+    依次尝试 minus.list、data.list、list 三种数据路径
+    """
+    if not isinstance(kline_data, dict):
+        return []
+
+    minus = kline_data.get("minus")
+    kline_list = minus.get("list", []) if isinstance(minus, dict) else []
+
+    if not kline_list:
+        if isinstance(kline_data.get("data"), dict):
+            kline_list = kline_data["data"].get("list", [])
+        if not kline_list and "list" in kline_data:
+            kline_list = kline_data["list"]
+
+    return kline_list or []
+
+
+# 各价格列的候选字段：(已换算字段, 日K短字段, 分时原始字段)
+_PRICE_FIELDS = {
+    "close": ("cc_price", "c", "price"),
+    "open": ("cc_open", "o", "open"),
+    "high": ("cc_high", "h", "high"),
+    "low": ("cc_low", "l", "low"),
+}
+
+# 日K短字段大于该值时视为未换算的原始值（需除以10000）
+_RAW_PRICE_THRESHOLD = 100000
+
+
+def _to_float(value: Any) -> float:
+    """将单个字段值转换为浮点数，无法转换时返回NaN"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _column(kline_list: List[Dict[str, Any]], key: str, present: set) -> Optional[np.ndarray]:
+    """
+    提取某个字段的整列数据（float64，缺失值为NaN）
+
+    字段在所有K线中都不存在时返回None，调用方可直接跳过该候选字段
+    """
+    if key not in present:
+        return None
+
+    # 快速路径：所有K线都有该字段且均为数值
+    try:
+        return np.fromiter(map(itemgetter(key), kline_list), dtype=np.float64, count=len(kline_list))
+    except (KeyError, TypeError, ValueError):
+        pass
+
+    values = [item.get(key) for item in kline_list]
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        # 含有空字符串等无法整体转换的值时逐个转换
+        return np.array([_to_float(value) for value in values], dtype=np.float64)
+
+
+def _pick_price_column(
+    kline_list: List[Dict[str, Any]],
+    fields: tuple,
+    present: set,
+    size: int
+) -> np.ndarray:
+    """
+    按优先级向量化选择价格列
+
+    - cc_*（如 cc_price）：已换算的价格
+    - 短字段（如 c，日K格式）：值大于100000时视为原始值，除以10000
+    - 长字段（如 price，分时格式）：原始整数值，除以10000
+    每一行取第一个非空且非零的候选值，都没有时为0
+    """
+    cc_key, short_key, raw_key = fields
+    result = np.zeros(size, dtype=np.float64)
+    chosen = np.zeros(size, dtype=bool)
+
+    cc_values = _column(kline_list, cc_key, present)
+    if cc_values is not None:
+        mask = np.nan_to_num(cc_values) != 0
+        result[mask] = cc_values[mask]
+        chosen |= mask
+
+    short_values = _column(kline_list, short_key, present)
+    if short_values is not None:
+        mask = ~chosen & (np.nan_to_num(short_values) != 0)
+        scaled = np.where(short_values > _RAW_PRICE_THRESHOLD, short_values / 10000, short_values)
+        result[mask] = scaled[mask]
+        chosen |= mask
+
+    raw_values = _column(kline_list, raw_key, present)
+    if raw_values is not None:
+        mask = ~chosen & (np.nan_to_num(raw_values) != 0)
+        result[mask] = raw_values[mask] / 10000
+
+    return result
+
+
+def _first_nonzero(primary: Optional[np.ndarray], fallback: Optional[np.ndarray], size: int) -> np.ndarray:
+    """按行取第一个非空且非零的值（对应 a or b 语义），都没有时为0"""
+    result = np.zeros(size, dtype=np.float64)
+    for values in (fallback, primary):
+        if values is not None:
+            mask = np.nan_to_num(values) != 0
+            result[mask] = values[mask]
+    return result
+
+
+def parse_kline_list(kline_list: List[Dict[str, Any]]) -> KlineBars:
+    """
+    将上游K线列表解析为列式数据（向量化实现）
+
+    - 日K及以上使用 k/o/c/h/l/v 字段，分时使用 time/price/open/high/low/volume 字段
+    - 每个字段只做一次整列提取，字段选择、/10000换算和填充均使用NumPy掩码完成
+    - 丢弃没有时间或收盘价为0的数据
+    - open/high/low 为0时使用收盘价填充
+    - 结果按时间升序排列
+
+    Args:
+        kline_list: 上游返回的K线列表
+
+    Returns:
+        KlineBars
+    """
+    if not kline_list:
+        return KlineBars.empty()
+
+    size = len(kline_list)
+    # 所有K线中出现过的字段（只提取存在的字段）
+    present = set().union(*kline_list)
+
+    time_arr = _first_nonzero(
+        _column(kline_list, "time", present),
+        _column(kline_list, "k", present),
+        size
+    )
+    prices = {
+        name: _pick_price_column(kline_list, fields, present, size)
+        for name, fields in _PRICE_FIELDS.items()
+    }
+    volume_arr = _first_nonzero(
+        _column(kline_list, "volume", present),
+        _column(kline_list, "v", present),
+        size
+    )
+
+    close_arr = prices["close"]
+    valid = (time_arr != 0) & (close_arr > 0)
+
+    close_arr = close_arr[valid]
+    columns = [
+        np.where(prices[name][valid] == 0, close_arr, prices[name][valid])
+        for name in ("open", "high", "low")
+    ]
+    time_arr = time_arr[valid].astype(np.int64)
+    columns.append(close_arr)
+    columns.append(volume_arr[valid].astype(np.int64))
+
+    # 上游数据通常已按时间排序，只有乱序时才重新排序
+    if len(time_arr) > 1 and np.any(np.diff(time_arr) < 0):
+        order = np.argsort(time_arr, kind="stable")
+        time_arr = time_arr[order]
+        columns = [column[order] for column in columns]
+
+    return KlineBars(time_arr, *columns)
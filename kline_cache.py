@@ -2,34 +2,102 @@
 
 只缓存日K线及以上级别的数据（daily, weekly, monthly, quarterly, yearly）
 分钟级数据不缓存，因为实时性要求高
+
+缓存失效时间按市场交易时段计算：交易时段内使用短有效期，
+非交易时段缓存一直有效到下一个交易时段开盘（K线不会变化）
 """
 from typing import Dict, Any, Optional
+from collections import OrderedDict
 from datetime import datetime, timedelta
+import sys
 import threading
 import time
 
+from config import (
+    KLINE_CACHE_MAX_ENTRIES, KLINE_CACHE_MAX_BYTES,
+    KLINE_CACHE_SESSION_TTL, KLINE_CACHE_CLOSE_GRACE
+)
+from market_time import next_kline_change_time
+
+
+def _estimate_size(obj: Any, depth: int = 0) -> int:
+    """估算缓存对象占用的内存字节数（近似值）
+    
+    - 带 nbytes 属性的对象（如NumPy数组）直接使用 nbytes
+    - dict/list/tuple 递归累加元素大小
+    - 其他对象使用 sys.getsizeof
+    """
+    nbytes = getattr(obj, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    
+    size = sys.getsizeof(obj)
+    if depth > 8:
+        return size
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += sys.getsizeof(key) + _estimate_size(value, depth + 1)
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            size += _estimate_size(item, depth + 1)
+    return size
+
 
 class KlineCache:
     """K线数据缓存类
     
     缓存策略：
     - 只缓存日K线及以上级别的数据
-    - 每只股票独立的24小时失效时间
+    - 按市场交易时段计算每项的失效时间：
+      交易时段内（含收盘宽限期）session_ttl_seconds 后失效，
+      非交易时段有效到下一个交易时段开盘
+    - 没有交易时段定义的市场使用 ttl_hours 固定有效期
     - 分钟级数据不缓存
+    - 条目数和估算内存超过上限时按LRU淘汰
+    - 可选后台线程定期清理过期缓存
     - 线程安全
     """
     
-    def __init__(self, ttl_hours: int = 24):
+    def __init__(
+        self,
+        ttl_hours: int = 24,
+        max_entries: int = 5000,
+        max_bytes: int = 256 * 1024 * 1024,
+        session_ttl_seconds: float = 60,
+        close_grace_seconds: float = 900
+    ):
         """
         初始化缓存
         
         Args:
-            ttl_hours: 缓存有效期（小时），默认24小时
+            ttl_hours: 未知市场的缓存有效期（小时），默认24小时
+            max_entries: 最大缓存条目数（<=0 表示不限制）
+            max_bytes: 缓存数据的最大估算字节数（<=0 表示不限制）
+            session_ttl_seconds: 交易时段内的缓存有效期（秒）
+            close_grace_seconds: 收盘后仍视为交易时段的宽限期（秒）
         """
-        self._cache: Dict[str, Dict[str, Any]] = {}
+        # 按访问顺序排列（最久未使用的在最前面）
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
         self._cache_time: Dict[str, float] = {}  # 存储缓存时间戳
+        self._expires_at: Dict[str, float] = {}  # 存储失效时间戳
+        self._cache_size: Dict[str, int] = {}  # 存储每项的估算字节数
+        self._total_bytes = 0
         self._lock = threading.Lock()
         self._ttl_seconds = ttl_hours * 3600  # 转换为秒
+        self._session_ttl_seconds = session_ttl_seconds
+        self._close_grace_seconds = close_grace_seconds
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        
+        # 统计计数
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        
+        # 后台清理线程
+        self._sweeper: Optional[threading.Thread] = None
+        self._sweeper_stop = threading.Event()
         
         # 可缓存的时间间隔（日K及以上）
         self._cacheable_intervals = {
@@ -40,8 +108,10 @@ class KlineCache:
             11: "quarterly"  # kline_type=11
         }
     
-    def _generate_cache_key(self, stock_id: str, kline_type: int, market_type: str) -> str:
-        """生成缓存键"""
+    def _generate_cache_key(self, stock_id: str, kline_type: int, market_type: str, variant: str = "") -> str:
+        """生成缓存键（variant 区分同一K线类型的不同来源，如由日K聚合的周K和上游周K）"""
+        if variant:
+            return f"{market_type}:{stock_id}:{kline_type}:{variant}"
         return f"{market_type}:{stock_id}:{kline_type}"
     
     def _is_cacheable(self, kline_type: int) -> bool:
@@ -61,12 +131,32 @@ class KlineCache:
         """
         return kline_type in self._cacheable_intervals
     
+    def _compute_expires_at(self, market_type: str, cache_time: float) -> float:
+        """计算缓存项的失效时间
+        
+        Args:
+            market_type: 市场类型
+            cache_time: 写入缓存的时间戳
+        
+        Returns:
+            失效时间戳：K线下一次可能变化的时间，未知市场为 cache_time + TTL
+        """
+        expires_at = next_kline_change_time(
+            market_type,
+            cache_time,
+            session_ttl_seconds=self._session_ttl_seconds,
+            close_grace_seconds=self._close_grace_seconds
+        )
+        if expires_at is None:
+            expires_at = cache_time + self._ttl_seconds
+        return expires_at
+    
     def _is_cache_valid(self, cache_key: str) -> bool:
         """判断缓存是否有效
         
         缓存有效条件：
         1. 缓存存在
-        2. 缓存时间未超过TTL（默认24小时）
+        2. 当前时间未到该项的失效时间
         
         Args:
             cache_key: 缓存键
@@ -77,21 +167,18 @@ class KlineCache:
         if cache_key not in self._cache:
             return False
         
-        if cache_key not in self._cache_time:
+        expires_at = self._expires_at.get(cache_key)
+        if expires_at is None:
             return False
         
-        # 检查缓存是否过期（超过TTL）
-        cache_time = self._cache_time[cache_key]
-        current_time = time.time()
-        elapsed = current_time - cache_time
-        
-        return elapsed < self._ttl_seconds
+        return time.time() < expires_at
     
     def get(
         self,
         stock_id: str,
         kline_type: int,
-        market_type: str
+        market_type: str,
+        variant: str = ""
     ) -> Optional[Dict[str, Any]]:
         """从缓存获取K线数据
         
@@ -99,6 +186,7 @@ class KlineCache:
             stock_id: 股票ID
             kline_type: K线类型
             market_type: 市场类型
+            variant: 数据来源（可选，默认为该K线类型的主缓存项）
         
         Returns:
             缓存的K线数据，如果不存在或已过期则返回None
@@ -107,17 +195,19 @@ class KlineCache:
         if not self._is_cacheable(kline_type):
             return None
         
-        cache_key = self._generate_cache_key(stock_id, kline_type, market_type)
+        cache_key = self._generate_cache_key(stock_id, kline_type, market_type, variant)
         
         with self._lock:
             if self._is_cache_valid(cache_key):
+                self._cache.move_to_end(cache_key)
+                self._hits += 1
                 return self._cache[cache_key]
             else:
                 # 缓存无效，清理
                 if cache_key in self._cache:
-                    del self._cache[cache_key]
-                if cache_key in self._cache_time:
-                    del self._cache_time[cache_key]
+                    self._remove(cache_key)
+                    self._expirations += 1
+                self._misses += 1
                 return None
     
     def set(
@@ -125,7 +215,8 @@ class KlineCache:
         stock_id: str,
         kline_type: int,
         market_type: str,
-        data: Dict[str, Any]
+        data: Dict[str, Any],
+        variant: str = ""
     ) -> None:
         """设置K线数据缓存
         
@@ -134,46 +225,116 @@ class KlineCache:
             kline_type: K线类型
             market_type: 市场类型
             data: K线数据
+            variant: 数据来源（可选，默认为该K线类型的主缓存项）
         """
         # 分钟级数据不缓存
         if not self._is_cacheable(kline_type):
             return
         
-        cache_key = self._generate_cache_key(stock_id, kline_type, market_type)
+        cache_key = self._generate_cache_key(stock_id, kline_type, market_type, variant)
+        
+        size = _estimate_size(data)
+        cache_time = time.time()
+        expires_at = self._compute_expires_at(market_type, cache_time)
         
         with self._lock:
+            if cache_key in self._cache:
+                self._remove(cache_key)
             self._cache[cache_key] = data
-            self._cache_time[cache_key] = time.time()  # 记录缓存时间戳
+            self._cache_time[cache_key] = cache_time  # 记录缓存时间戳
+            self._expires_at[cache_key] = expires_at
+            self._cache_size[cache_key] = size
+            self._total_bytes += size
+            self._evict()
+    
+    def _remove(self, cache_key: str) -> None:
+        """删除缓存项（调用方需持有锁）"""
+        self._cache.pop(cache_key, None)
+        self._cache_time.pop(cache_key, None)
+        self._expires_at.pop(cache_key, None)
+        self._total_bytes -= self._cache_size.pop(cache_key, 0)
+    
+    def _evict(self) -> None:
+        """超过条目数或内存上限时，按LRU淘汰最久未使用的缓存（调用方需持有锁）
+        
+        至少保留最新写入的一项，避免单项超过内存上限时缓存被清空后仍无法写入
+        """
+        while len(self._cache) > 1 and (
+            (self._max_entries > 0 and len(self._cache) > self._max_entries)
+            or (self._max_bytes > 0 and self._total_bytes > self._max_bytes)
+        ):
+            oldest_key = next(iter(self._cache))
+            self._remove(oldest_key)
+            self._evictions += 1
     
     def clear(self) -> None:
         """清空所有缓存"""
         with self._lock:
             self._cache.clear()
             self._cache_time.clear()
+            self._expires_at.clear()
+            self._cache_size.clear()
+            self._total_bytes = 0
     
     def clear_expired(self) -> int:
-        """清理过期的缓存（超过TTL的缓存）
+        """清理过期的缓存（已到失效时间的缓存）
         
         Returns:
             清理的缓存数量
         """
         current_time = time.time()
-        expired_keys = []
         
         with self._lock:
-            for cache_key, cache_time in self._cache_time.items():
-                elapsed = current_time - cache_time
-                if elapsed >= self._ttl_seconds:
-                    expired_keys.append(cache_key)
+            expired_keys = [
+                cache_key for cache_key, expires_at in self._expires_at.items()
+                if current_time >= expires_at
+            ]
             
             for cache_key in expired_keys:
-                if cache_key in self._cache:
-                    del self._cache[cache_key]
-                if cache_key in self._cache_time:
-                    del self._cache_time[cache_key]
+                self._remove(cache_key)
+            self._expirations += len(expired_keys)
         
         return len(expired_keys)
     
+    def start_sweeper(self, interval_seconds: float = 300) -> None:
+        """启动后台线程，定期清理过期缓存
+        
+        Args:
+            interval_seconds: 清理间隔（秒），<=0 表示不启动
+        """
+        if interval_seconds <= 0:
+            return
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        
+        self._sweeper_stop.clear()
+        
+        def _run():
+            while not self._sweeper_stop.wait(interval_seconds):
+                self.clear_expired()
+        
+        self._sweeper = threading.Thread(target=_run, name="kline-cache-sweeper", daemon=True)
+        self._sweeper.start()
+    
+    def stop_sweeper(self) -> None:
+        """停止后台清理线程"""
+        self._sweeper_stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+    
+    def get_counters(self) -> Dict[str, int]:
+        """获取命中/未命中/淘汰等计数（不遍历缓存项，供指标导出使用）"""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "entries": len(self._cache),
+                "estimated_bytes": self._total_bytes
+            }
+    
     def get_stats(self) -> Dict[str, Any]:
         """获取缓存统计信息
         
@@ -189,9 +350,7 @@ class KlineCache:
             newest_cache_time = None
             
             for cache_key, cache_time in self._cache_time.items():
-                elapsed = current_time - cache_time
-                
-                if elapsed < self._ttl_seconds:
+                if current_time < self._expires_at.get(cache_key, 0):
                     valid_count += 1
                 else:
                     expired_count += 1
@@ -207,7 +366,17 @@ class KlineCache:
                 "valid_count": valid_count,
                 "expired_count": expired_count,
                 "ttl_hours": self._ttl_seconds / 3600,
-                "current_time": datetime.fromtimestamp(current_time).isoformat()
+                "session_ttl_seconds": self._session_ttl_seconds,
+                "close_grace_seconds": self._close_grace_seconds,
+                "current_time": datetime.fromtimestamp(current_time).isoformat(),
+                "max_entries": self._max_entries,
+                "estimated_bytes": self._total_bytes,
+                "max_bytes": self._max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "sweeper_running": self._sweeper is not None and self._sweeper.is_alive()
             }
             
             # 添加最老和最新缓存的时间信息
@@ -260,23 +429,29 @@ class KlineCache:
                     "reason": "缓存时间丢失"
                 }
             
+            expires_at = self._expires_at.get(cache_key, cache_time)
             elapsed = current_time - cache_time
-            is_valid = elapsed < self._ttl_seconds
-            remaining = self._ttl_seconds - elapsed
+            is_valid = current_time < expires_at
+            remaining = expires_at - current_time
             
             return {
                 "cached": True,
                 "valid": is_valid,
+                "estimated_bytes": self._cache_size.get(cache_key, 0),
                 "cache_time": datetime.fromtimestamp(cache_time).isoformat(),
                 "age_hours": elapsed / 3600,
                 "remaining_hours": remaining / 3600 if remaining > 0 else 0,
-                "ttl_hours": self._ttl_seconds / 3600,
-                "expires_at": datetime.fromtimestamp(cache_time + self._ttl_seconds).isoformat()
+                "expires_at": datetime.fromtimestamp(expires_at).isoformat()
             }
 
 
 # 全局缓存实例
-_kline_cache = KlineCache()
+_kline_cache = KlineCache(
+    max_entries=KLINE_CACHE_MAX_ENTRIES,
+    max_bytes=KLINE_CACHE_MAX_BYTES,
+    session_ttl_seconds=KLINE_CACHE_SESSION_TTL,
+    close_grace_seconds=KLINE_CACHE_CLOSE_GRACE
+)
 
 
 def get_kline_cache() -> KlineCache:
@@ -2,18 +2,34 @@
 from fastapi import FastAPI, HTTPException, Security, Request
 from fastapi.security import APIKeyHeader
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.staticfiles import StaticFiles
 from typing import List, Optional, Dict, Any
+from contextlib import asynccontextmanager
 import os
+import numpy as np
 from futu_client import FutuClient
 from models import (
     AccountInfo, Position, StockQuote, TradeRequest, 
     TradeResponse, SearchStockRequest, StockSearchResult,
-    CancelOrderRequest
+    CancelOrderRequest, BatchQuoteRequest
+)
+from config import (
+    API_HOST, API_PORT, API_KEY, QUOTE_BATCH_MAX_CODES, KLINE_CACHE_SWEEP_INTERVAL,
+    SERVER_TIMING_ENABLED, SERVER_TIMING_LOG
 )
-from config import API_HOST, API_PORT, API_KEY
 from kline_cache import get_kline_cache
+from intraday_cache import get_intraday_cache
+from streaming_indicators import get_streaming_engine
+from indicator_cache import get_indicator_cache
+from market_time import format_local_times
+from kline_bars import KlineBars
+from technical_indicators import resample_kline_data
+from worker_pool import get_worker_pool, WorkerPoolBusy
+from circuit_breaker import CircuitOpenError
+from json_codec import FastJSONResponse
+from metrics import MetricsMiddleware, register_collector, render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from tracing import TracingMiddleware
 
 
 def convert_to_csv_text(data: Dict[str, Any]) -> str:
@@ -31,9 +47,8 @@ def convert_to_csv_text(data: Dict[str, Any]) -> str:
     
     lines = []
     
-    # 获取所有指标名称（从第一条数据中）
-    first_date = next(iter(data.keys()))
-    indicator_names = list(data[first_date].keys())
+    # 获取所有指标名称（按首次出现顺序；多指标合并时前几行可能缺少部分指标）
+    indicator_names = list(dict.fromkeys(name for values in data.values() for name in values))
     
     # 添加CSV表头
     header = ["Date"] + indicator_names
@@ -81,6 +96,67 @@ def convert_kline_to_csv_text(data: List[Dict[str, Any]]) -> str:
     
     return "\n".join(lines)
 
+
+def build_kline_rows(
+    bars: KlineBars,
+    resample_interval: Optional[str],
+    market_type: str,
+    date_only: bool
+) -> List[Dict[str, Any]]:
+    """
+    将列式K线（需要时先重采样）转换为接口返回的行列表
+    
+    Args:
+        bars: 列式K线数据
+        resample_interval: 重采样间隔（分钟级数据，如 5min/1h），为None时不重采样
+        market_type: 市场类型（用于时间转换）
+        date_only: 时间只显示日期（日K及以上）
+        
+    Returns:
+        [{"time", "datetime", "open", "high", "low", "close", "volume"}]
+    """
+    if resample_interval:
+        df = resample_kline_data(bars.to_dataframe(), resample_interval)
+        columns = [df[name].to_numpy() for name in ("time", "open", "high", "low", "close", "volume")]
+    else:
+        columns = [bars.time, bars.open, bars.high, bars.low, bars.close, bars.volume]
+    
+    # 按列转换为Python类型，避免逐行访问DataFrame
+    times, opens, highs, lows, closes, volumes = (
+        column.astype(dtype).tolist()
+        for column, dtype in zip(columns, (np.int64, float, float, float, float, np.int64))
+    )
+    
+    # 批量转换时间为市场本地时间
+    local_times = format_local_times(columns[0], market_type, date_only=date_only)
+    
+    return [
+        {
+            "time": t,
+            "datetime": local_time,
+            "open": o,
+            "high": h,
+            "low": l,
+            "close": c,
+            "volume": v
+        }
+        for t, local_time, o, h, l, c, v in zip(times, local_times, opens, highs, lows, closes, volumes)
+    ]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时建立上游连接池和缓存清理线程，关闭时释放"""
+    await futu_client.start()
+    get_kline_cache().start_sweeper(KLINE_CACHE_SWEEP_INTERVAL)
+    try:
+        yield
+    finally:
+        get_kline_cache().stop_sweeper()
+        get_worker_pool().shutdown()
+        await futu_client.close()
+
+
 app = FastAPI(
     title="富途模拟交易API",
     description="支持美股、港股、A股的模拟交易API服务",
@@ -88,7 +164,10 @@ app = FastAPI(
     # 配置文档URL
     docs_url="/docs",  # Swagger UI（使用默认CDN）
     redoc_url=None,  # 禁用 ReDoc（避免CDN访问问题）
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    # 使用 orjson（已安装时）渲染JSON响应
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # 配置CORS
@@ -100,9 +179,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 记录各接口的耗时/状态码/进行中请求数（/metrics）
+app.add_middleware(MetricsMiddleware)
+
+# 在响应头 Server-Timing 中输出各阶段耗时（最外层中间件，total 包含所有中间件的耗时）
+if SERVER_TIMING_ENABLED or SERVER_TIMING_LOG:
+    app.add_middleware(TracingMiddleware, emit_header=SERVER_TIMING_ENABLED, log=SERVER_TIMING_LOG)
+
 # 初始化富途客户端
 futu_client = FutuClient()
 
+
+def _collect_kline_cache_metrics():
+    """K线缓存指标（导出 /metrics 时读取缓存已有的计数）"""
+    counters = get_kline_cache().get_counters()
+    return [
+        ("futu_kline_cache_hits_total", "counter", "Kline cache hits.", [({}, counters["hits"])]),
+        ("futu_kline_cache_misses_total", "counter", "Kline cache misses.", [({}, counters["misses"])]),
+        ("futu_kline_cache_evictions_total", "counter", "Kline cache evictions.", [({}, counters["evictions"])]),
+        ("futu_kline_cache_expirations_total", "counter", "Kline cache expirations.", [({}, counters["expirations"])]),
+        ("futu_kline_cache_entries", "gauge", "Kline cache entries.", [({}, counters["entries"])]),
+        ("futu_kline_cache_bytes", "gauge", "Kline cache estimated size in bytes.", [({}, counters["estimated_bytes"])]),
+    ]
+
+
+register_collector(_collect_kline_cache_metrics)
+
 # API Key 校验
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
@@ -234,20 +336,79 @@ async def get_quote(stock_code: str, authenticated: bool = Security(verify_api_k
         # 自动判断市场类型
         market_type = futu_client._detect_market_type(normalized_code)
         
-        # 搜索股票获取security_id
-        stocks = await futu_client.search_stock(normalized_code, market_type)
-        if not stocks:
+        # 解析股票代码获取security_id（带缓存）
+        stock = await futu_client.resolve_stock(normalized_code, market_type)
+        if not stock:
             raise HTTPException(status_code=404, detail=f"未找到股票: {stock_code}")
         
-        security_id = stocks[0].security_id
+        security_id = stock.security_id
         quotes = await futu_client.get_stock_quote([security_id], market_type)
         return quotes
     except HTTPException:
         raise
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取行情失败: {str(e)}")
 
 
+async def _get_batch_quotes(stock_codes: List[str]) -> List[Dict[str, Any]]:
+    """批量行情公共处理（校验数量并调用客户端）"""
+    codes = [code for code in stock_codes if code and code.strip()]
+    if not codes:
+        raise HTTPException(status_code=400, detail="股票代码列表不能为空")
+    if len(codes) > QUOTE_BATCH_MAX_CODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"股票代码数量超过上限: {len(codes)} > {QUOTE_BATCH_MAX_CODES}"
+        )
+    
+    try:
+        return await futu_client.get_batch_quotes(codes)
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取批量行情失败: {str(e)}")
+
+
+@app.post("/api/quotes", tags=["行情"])
+async def post_batch_quotes(request: BatchQuoteRequest, authenticated: bool = Security(verify_api_key)):
+    """
+    批量获取股票行情（自动判断市场类型）- 使用JSON body传递参数
+    
+    请求体参数：
+    - **stock_codes**: 股票代码列表（必填，可混合美股/港股/A股，支持带后缀格式）
+    
+    按市场分组后合并为尽量少的上游批量请求，返回结果与请求顺序一致。
+    每项包含 **symbol** 字段（请求中的原始代码）；未找到的代码返回 `{"symbol": ..., "error": ...}`
+    
+    **示例**:
+    ```json
+    {
+      "stock_codes": ["AAPL", "TSLA", "00700", "600519.SH"]
+    }
+    ```
+    """
+    return await _get_batch_quotes(request.stock_codes)
+
+
+@app.get("/api/quotes", tags=["行情"])
+async def get_batch_quotes(codes: str, authenticated: bool = Security(verify_api_key)):
+    """
+    批量获取股票行情（自动判断市场类型）
+    
+    - **codes**: 逗号分隔的股票代码（必填），如 AAPL,TSLA,00700,600519.SH
+    
+    返回格式与 `POST /api/quotes` 相同
+    
+    **示例**:
+    ```
+    GET /api/quotes?codes=AAPL,TSLA,00700
+    ```
+    """
+    return await _get_batch_quotes(codes.split(","))
+
+
 @app.post("/api/trade", response_model=TradeResponse, tags=["交易"])
 async def trade(trade_request: TradeRequest, authenticated: bool = Security(verify_api_key)):
     """
@@ -353,6 +514,8 @@ async def get_orders(market_type: str, filter_status: int = 0, authenticated: bo
             filter_status=filter_status
         )
         return orders
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取订单失败: {str(e)}")
 
@@ -375,6 +538,8 @@ async def get_hot_news(lang: str = "zh-cn", authenticated: bool = Security(verif
     try:
         news = await futu_client.get_hot_news(lang=lang)
         return news
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取热门新闻失败: {str(e)}")
 
@@ -401,6 +566,8 @@ async def get_hot_stocks_list(market_type: str = "US", count: int = 10, authenti
             count=count
         )
         return stocks
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取热门股票失败: {str(e)}")
 
@@ -413,6 +580,7 @@ async def get_technical_analysis(
     format: str = "json",
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    raw: bool = False,
     authenticated: bool = Security(verify_api_key)
 ):
     """
@@ -424,12 +592,16 @@ async def get_technical_analysis(
       - 日线及以上: daily, weekly, monthly, quarterly, yearly
     - **indicator**: 技术指标（可选，默认macd）
       - 可选指标：close_50_sma, close_200_sma, close_10_ema, macd, rsi, boll, atr, vwma
+      - 支持逗号分隔的多个指标（如 macd,rsi,boll,atr），一次请求计算并按时间合并返回
       - RSI说明：返回4个周期的RSI值 - RSI(6)/RSI(12)/RSI(14)/RSI(24)
     - **format**: 返回格式（可选，默认json）
       - json: JSON格式
       - csv: CSV格式
     - **start_date**: 开始日期（可选，格式：YYYY-MM-DD）
     - **end_date**: 结束日期（可选，格式：YYYY-MM-DD）
+    - **raw**: 指标值是否返回数值（可选，默认false）
+      - false: 返回格式化字符串（如 "9.4638"）
+      - true: 返回按相同精度四舍五入的浮点数（如 9.4638），减少序列化开销
     
     返回技术分析指标的时间序列数据，可用于绘制曲线图
     
@@ -443,6 +615,7 @@ async def get_technical_analysis(
     - **rsi**: 返回 RSI(6), RSI(12), RSI(14), RSI(24) 四个值
     - **boll**: 返回 Boll_Upper, Boll_Middle, Boll_Lower 三个值
     - 其他指标返回单个值
+    - 多个指标时，每个日期包含该时间点已有有效值的所有指标
     
     **日期范围说明**：
     - 如果不指定日期范围，返回所有可用数据
@@ -460,6 +633,8 @@ async def get_technical_analysis(
     GET /api/technical-analysis?symbol=AAPL&start_date=2025-10-01&end_date=2025-10-31
     GET /api/technical-analysis?symbol=AAPL&interval=daily&indicator=macd&start_date=2025-10-01
     GET /api/technical-analysis?symbol=AAPL&interval=5min&start_date=2025-11-01&end_date=2025-11-01
+    GET /api/technical-analysis?symbol=AAPL&indicator=rsi&raw=true
+    GET /api/technical-analysis?symbol=AAPL&indicator=macd,rsi,boll,atr
     ```
     
     **CSV格式返回示例**:
@@ -490,7 +665,8 @@ async def get_technical_analysis(
             interval=interval,
             indicator=indicator,
             start_date=start_date,
-            end_date=end_date
+            end_date=end_date,
+            raw_values=raw
         )
         
         # 检查是否有错误（直接返回错误信息，不抛出异常）
@@ -500,19 +676,23 @@ async def get_technical_analysis(
         # 根据格式返回数据
         if format_lower == "csv":
             # 转换data字段为CSV文本
-            csv_content = convert_to_csv_text(result.get("data", {}))
+            csv_content = await get_worker_pool().run(
+                "indicator_csv", convert_to_csv_text, result.get("data", {})
+            )
             
             # 返回JSON，但data字段为CSV文本
-            return {
+            return FastJSONResponse({
                 "meta": result.get("meta", {}),
                 "data": csv_content,
                 "format": "csv"
-            }
+            })
         else:
-            # 返回JSON格式
-            return result
+            # 返回JSON格式（直接返回响应对象，跳过 FastAPI 对大结果的逐项转换）
+            return FastJSONResponse(result)
     except HTTPException:
         raise
+    except (WorkerPoolBusy, CircuitOpenError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取技术分析失败: {str(e)}")
 
@@ -552,6 +732,11 @@ async def get_kline(
     - 港股（HK）：香港时间 HKT (UTC+8)
     - A股（CN）：中国标准时间 CST (UTC+8)
     
+    **周K/月K/季K/年K说明**：
+    - 优先由日K聚合得到，每根K线的时间为该周期内最后一个交易日
+      （尚未结束的当前周期，时间随每个新交易日向后移动）
+    - 日K历史聚合出的周期数不足时改为直接请求上游周K/月K等数据
+    
     **日期范围说明**：
     - 如果不指定日期范围，返回所有可用数据
     - **周K线特殊处理**：如果不指定日期范围，默认返回最近1个月的数据
@@ -721,32 +906,22 @@ async def get_kline(
                     detail=f"无效的结束日期格式: {end_date}，请使用 YYYY-MM-DD。错误: {str(e)}"
                 )
         
-        # 搜索股票获取security_id（使用标准化的代码）
-        stocks = await futu_client.search_stock(normalized_symbol, market_type)
-        if not stocks:
+        # 解析股票代码获取security_id（带缓存）
+        stock = await futu_client.resolve_stock(normalized_symbol, market_type)
+        if not stock:
             raise HTTPException(status_code=404, detail=f"未找到股票: {symbol}")
         
-        security_id = stocks[0].security_id
-        stock_name = stocks[0].stock_name
+        security_id = stock.security_id
+        stock_name = stock.stock_name
         
-        # 获取K线数据
-        kline_data = await futu_client.get_kline_data(
+        # 获取列式K线数据（带缓存，已解析为NumPy列）
+        bars = await futu_client.get_kline_bars(
             stock_id=security_id,
             kline_type=kline_type,
             market_type=market_type
         )
         
-        # 提取K线列表
-        kline_list = kline_data.get("minus", {}).get("list", [])
-        
-        if not kline_list:
-            # 尝试其他路径
-            if "data" in kline_data:
-                kline_list = kline_data["data"].get("list", [])
-            if not kline_list and "list" in kline_data:
-                kline_list = kline_data["list"]
-        
-        if not kline_list:
+        if len(bars) == 0:
             # 返回友好的错误信息，包含上游响应
             error_detail = {
                 "error": "未获取到K线数据",
@@ -754,102 +929,16 @@ async def get_kline(
                 "interval": interval,
                 "market_type": market_type,
                 "message": "可能原因：1) 该股票在指定日期范围内没有交易数据 2) 股票代码不正确 3) 市场休市",
-                "upstream_response": kline_data
+                "upstream_response": bars.upstream_response
             }
             return error_detail
         
-        # 先转换为DataFrame进行处理
-        import pandas as pd
-        
-        df_data = []
-        filtered_count = 0
-        for item in kline_list:
-            # 时间
-            time_val = item.get("time") or item.get("k")
-            if not time_val:
-                continue
-            
-            # 如果指定了日期范围，过滤数据
-            if start_timestamp and time_val < start_timestamp:
-                filtered_count += 1
-                continue
-            if end_timestamp and time_val > end_timestamp:
-                filtered_count += 1
-                continue
-            
-            # 价格数据 - 收盘价
-            close_price = item.get("cc_price") or item.get("c")
-            if close_price is None:
-                price_raw = item.get("price", 0)
-                close_price = price_raw / 10000 if price_raw else 0
-            else:
-                close_price = float(close_price)
-                # 检查是否需要除以10000（如果值过大，说明是原始值）
-                if close_price > 100000:
-                    close_price = close_price / 10000
-            
-            # 如果没有收盘价，跳过这条数据
-            if close_price == 0:
-                continue
-            
-            # 开盘价
-            open_price = item.get("cc_open") or item.get("o")
-            if open_price is None:
-                open_raw = item.get("open", 0)
-                open_price = open_raw / 10000 if open_raw else 0
-            else:
-                open_price = float(open_price)
-                # 检查是否需要除以10000（如果值过大，说明是原始值）
-                if open_price > 100000:
-                    open_price = open_price / 10000
-            
-            # 如果开盘价为0，使用收盘价
-            if open_price == 0:
-                open_price = close_price
-            
-            # 最高价
-            high_price = item.get("cc_high") or item.get("h")
-            if high_price is None:
-                high_raw = item.get("high", 0)
-                high_price = high_raw / 10000 if high_raw else 0
-            else:
-                high_price = float(high_price)
-                # 检查是否需要除以10000（如果值过大，说明是原始值）
-                if high_price > 100000:
-                    high_price = high_price / 10000
-            
-            # 如果最高价为0，使用收盘价
-            if high_price == 0:
-                high_price = close_price
-            
-            # 最低价
-            low_price = item.get("cc_low") or item.get("l")
-            if low_price is None:
-                low_raw = item.get("low", 0)
-                low_price = low_raw / 10000 if low_raw else 0
-            else:
-                low_price = float(low_price)
-                # 检查是否需要除以10000（如果值过大，说明是原始值）
-                if low_price > 100000:
-                    low_price = low_price / 10000
-            
-            # 如果最低价为0，使用收盘价
-            if low_price == 0:
-                low_price = close_price
-            
-            volume = item.get("volume") or item.get("v", 0)
-            
-            df_data.append({
-                "time": time_val,
-                "open": open_price,
-                "high": high_price,
-                "low": low_price,
-                "close": close_price,
-                "volume": volume
-            })
+        # 如果指定了日期范围，截取范围内的K线（二分查找，零拷贝）
+        if start_timestamp or end_timestamp:
+            bars = bars.time_range(start_timestamp or None, end_timestamp or None)
         
         # 检查是否有有效数据
-        if not df_data:
+        if len(bars) == 0:
             error_detail = {
                 "error": "指定日期范围内没有有效的K线数据",
                 "symbol": symbol,
@@ -863,86 +952,31 @@ async def get_kline(
             }
             return error_detail
         
-        # 创建DataFrame
-        df = pd.DataFrame(df_data)
-        
-        # 确保数据类型正确
-        try:
-            df['open'] = df['open'].astype(float)
-            df['high'] = df['high'].astype(float)
-            df['low'] = df['low'].astype(float)
-            df['close'] = df['close'].astype(float)
-            df['volume'] = df['volume'].astype(int)
-        except KeyError as e:
-            error_detail = {
-                "error": f"数据格式错误，缺少必需字段: {str(e)}",
-                "symbol": symbol,
-                "interval": interval,
-                "available_columns": list(df.columns) if len(df) > 0 else [],
-                "message": "上游API返回的数据格式不符合预期"
-            }
-            return error_detail
-        
-        # 过滤无效数据
-        df = df[(df['close'] > 0) & (df['time'].notna())].copy()
-        
-        # 再次检查过滤后是否还有数据
-        if len(df) == 0:
-            error_detail = {
-                "error": "过滤后没有有效的K线数据",
-                "symbol": symbol,
-                "interval": interval,
-                "market_type": market_type,
-                "message": "所有数据点的价格都为0或时间戳无效"
-            }
-            return error_detail
-        
         # 如果是周K及以下时间间隔且未指定日期范围，基于数据最新日期限制为最近1个月
-        if apply_default_range and len(df) > 0:
+        if apply_default_range:
             from datetime import datetime, timedelta
             # 获取数据中的最新时间戳
-            latest_timestamp = df['time'].max()
+            latest_timestamp = int(bars.time[-1])
             # 计算1个月前的时间戳（30天）
             one_month_ago_timestamp = latest_timestamp - (30 * 24 * 60 * 60)
-            # 过滤数据
-            df = df[df['time'] >= one_month_ago_timestamp].copy()
+            # 截取最近1个月的K线（二分查找，零拷贝）
+            bars = bars.time_range(one_month_ago_timestamp)
             # 记录自动设置的日期范围
             start_date = datetime.fromtimestamp(one_month_ago_timestamp).strftime("%Y-%m-%d")
             end_date = datetime.fromtimestamp(latest_timestamp).strftime("%Y-%m-%d")
         
-        # 如果需要重采样（分钟级数据）
-        if resample_interval:
-            from technical_indicators import resample_kline_data
-            df = resample_kline_data(df, resample_interval)
-        
-        # 格式化输出数据
-        formatted_data = []
+        # 重采样（分钟级数据）并格式化输出数据（CPU密集，在工作池中执行，不阻塞事件循环）
         date_only_intervals = ["daily", "weekly", "monthly", "quarterly", "yearly"]
-        
-        for _, row in df.iterrows():
-            time_val = int(row['time'])
-            
-            # 转换时间为本地时间
-            if interval in date_only_intervals:
-                from datetime import datetime
-                local_time = datetime.fromtimestamp(time_val).strftime('%Y-%m-%d')
-            else:
-                local_time = futu_client._convert_timestamp_to_local_time(time_val, market_type)
-            
-            formatted_data.append({
-                "time": time_val,
-                "datetime": local_time,
-                "open": float(row['open']),
-                "high": float(row['high']),
-                "low": float(row['low']),
-                "close": float(row['close']),
-                "volume": int(row['volume'])
-            })
+        pool = get_worker_pool()
+        formatted_data = await pool.run(
+            "format_kline", build_kline_rows,
+            bars, resample_interval, market_type, interval in date_only_intervals
+        )
         
         # 根据格式返回数据
         if format_lower == "csv":
             # 转换data为CSV文本
-            csv_content = convert_kline_to_csv_text(formatted_data)
+            csv_content = await pool.run("kline_csv", convert_kline_to_csv_text, formatted_data)
             
             result = {
                 "meta": {
@@ -976,9 +1010,12 @@ async def get_kline(
         if end_date:
             result["meta"]["requested_end_date"] = end_date
         
-        return result
+        # 直接返回响应对象，跳过 FastAPI 对数千行K线的逐项转换
+        return FastJSONResponse(result)
     except HTTPException:
         raise
+    except (WorkerPoolBusy, CircuitOpenError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取K线数据失败: {str(e)}")
 
@@ -992,8 +1029,13 @@ async def get_cache_stats(authenticated: bool = Security(verify_api_key)):
     - 总缓存数量
     - 有效缓存数量
     - 过期缓存数量
-    - TTL（生存时间）
+    - 失效策略（交易时段内有效期、收盘宽限期、未知市场TTL）
     - 最老和最新缓存的时间
+    - 估算内存占用、条目/内存上限
+    - 命中/未命中/LRU淘汰/过期清理次数
+    - intraday_cache_stats: 分时增量缓存（命中率、刷新次数、接收/实际解析的上游条目数）
+    - streaming_indicator_stats: 分时指标流式计算图（计算图数、重建/增量同步次数、追加/更新的K线数）
+    - indicator_cache_stats: 技术指标结果缓存（命中率、K线变化导致的失效次数、LRU淘汰次数）
     
     **示例**:
     ```
@@ -1006,12 +1048,93 @@ async def get_cache_stats(authenticated: bool = Security(verify_api_key)):
         return {
             "status": "success",
             "cache_stats": stats,
-            "message": "K线数据缓存统计（只缓存日K及以上级别，分钟级数据不缓存，TTL=24小时）"
+            "intraday_cache_stats": get_intraday_cache().get_stats(),
+            "streaming_indicator_stats": get_streaming_engine().get_stats(),
+            "indicator_cache_stats": get_indicator_cache().get_stats(),
+            "message": "K线数据缓存统计（日K及以上级别非交易时段缓存有效到下一个交易时段开盘；分时数据使用短有效期的增量缓存）"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取缓存统计失败: {str(e)}")
 
 
+@app.get("/api/upstream/stats", tags=["系统"])
+async def get_upstream_stats(authenticated: bool = Security(verify_api_key)):
+    """
+    获取上游请求统计信息
+
+    返回上游请求的统计信息，包括：
+    - single_flight: 相同GET请求合并情况（总调用数、实际上游请求数、合并节省的请求数）
+    - rate_limiter: 各上游主机的限流状态（当前速率、剩余令牌、429/错误次数，
+      以及下单撤单/行情/热门资讯三个优先级的排队深度和平均/最大等待时间）
+    - retries: GET请求因超时/网络错误/5xx/429重试的次数
+    - circuit_breakers: 按上游方法（_m）的熔断器状态（closed/open/half_open）、
+      熔断次数、连续失败次数和熔断期间被拒绝的调用数
+    - symbol_cache: 股票代码解析缓存（命中/未命中/负缓存命中/淘汰次数）
+    - kline_derive: 周K/月K/季K/年K由日K聚合的次数，以及日K历史不足回退到上游的次数
+    - worker_pool_stats: CPU任务工作池（执行/排队中的任务数、拒绝次数，
+      以及重采样、指标计算、格式化等各阶段的平均/最大排队等待时间和执行时间）
+
+    **示例**:
+    ```
+    GET /api/upstream/stats
+    ```
+    """
+    try:
+        return {
+            "status": "success",
+            "upstream_stats": futu_client.get_upstream_stats(),
+            "worker_pool_stats": get_worker_pool().get_stats()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取上游统计失败: {str(e)}")
+
+
+@app.get("/metrics", tags=["系统"])
+async def metrics(authenticated: bool = Security(verify_api_key)):
+    """
+    Prometheus 格式的运行指标
+    
+    - futu_upstream_request_duration_seconds: 按上游方法（_m / URL路径最后一段）的耗时直方图
+    - futu_upstream_requests_in_flight: 按上游方法的进行中请求数
+    - futu_upstream_errors_total: 按上游方法和错误码的错误数（http_502、timeout、network、
+      circuit_open、富途业务错误码如 1002 未登录等）
+    - http_request_duration_seconds / http_requests_total / http_requests_in_flight:
+      按路由模板的接口耗时、请求数（含状态码）和进行中请求数
+    - futu_kline_cache_*: K线缓存命中/未命中/淘汰/过期次数和条目数
+    
+    配置了 API_KEY 时，抓取配置需带上 X-API-Key 请求头
+    
+    **示例**:
+    ```
+    GET /metrics
+    ```
+    """
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.post("/api/upstream/circuit-breakers/reset", tags=["系统"])
+async def reset_circuit_breakers(authenticated: bool = Security(verify_api_key)):
+    """
+    恢复所有上游熔断器
+    
+    上游恢复后无需等待冷却时间，立即允许所有方法的请求
+    
+    **示例**:
+    ```
+    POST /api/upstream/circuit-breakers/reset
+    ```
+    """
+    try:
+        reset_count = futu_client.reset_circuit_breakers()
+        return {
+            "status": "success",
+            "reset_count": reset_count,
+            "message": f"已恢复 {reset_count} 个熔断中的上游接口"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"恢复熔断器失败: {str(e)}")
+
+
 @app.get("/api/cache/info", tags=["系统"])
 async def get_cache_info(
     symbol: str,
@@ -1064,17 +1187,19 @@ async def get_cache_info(
         normalized_symbol = futu_client._normalize_stock_code(symbol)
         market_type = futu_client._detect_market_type(normalized_symbol)
         
-        # 搜索股票获取security_id
-        stocks = await futu_client.search_stock(normalized_symbol, market_type)
-        if not stocks:
+        # 解析股票代码获取security_id（带缓存）
+        stock = await futu_client.resolve_stock(normalized_symbol, market_type)
+        if not stock:
             raise HTTPException(status_code=404, detail=f"未找到股票: {symbol}")
         
-        stock_id = stocks[0].security_id
-        stock_name = stocks[0].stock_name
+        stock_id = stock.security_id
+        stock_name = stock.stock_name
         
         # 获取缓存信息
-        cache = get_kline_cache()
-        cache_info = cache.get_cache_info(stock_id, kline_type, market_type)
+        if kline_type == 1:
+            cache_info = get_intraday_cache().get_cache_info(stock_id, market_type)
+        else:
+            cache_info = get_kline_cache().get_cache_info(stock_id, kline_type, market_type)
         
         return {
             "status": "success",
@@ -1109,6 +1234,9 @@ async def clear_cache(authenticated: bool = Security(verify_api_key)):
     try:
         cache = get_kline_cache()
         cache.clear()
+        get_intraday_cache().clear()
+        get_streaming_engine().clear()
+        get_indicator_cache().clear()
         return {
             "status": "success",
             "message": "所有K线数据缓存已清空"
@@ -1122,7 +1250,7 @@ async def clear_expired_cache(authenticated: bool = Security(verify_api_key)):
     """
     清理过期的K线数据缓存
     
-    只清理过期的缓存（非今天的缓存），保留今天有效的缓存
+    只清理已到失效时间的缓存，保留仍然有效的缓存
     
     **示例**:
     ```
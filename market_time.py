@@ -0,0 +1,209 @@
+"""市场时间模块
+
+提供各市场（US/HK/CN）的时区与交易时段信息，用于计算K线数据何时可能发生变化，
+以及批量将时间戳转换为市场本地时间字符串。
+
+- 时区与 FutuClient._convert_timestamp_to_local_time 保持一致
+- 交易时段按本地时间定义，港股/A股包含午间休市
+- 不包含节假日日历：节假日当天开盘时间点缓存会失效一次，重新获取后顺延到下一个交易时段
+"""
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+# 市场类型 -> IANA时区名称（未知市场默认使用UTC+8）
+MARKET_TIMEZONES: Dict[str, str] = {
+    "US": "America/New_York",
+    "HK": "Asia/Hong_Kong",
+    "CN": "Asia/Shanghai",
+}
+DEFAULT_TIMEZONE = "Asia/Shanghai"
+
+# 市场类型 -> 时区显示名称（不在表中的市场使用时区缩写，如美股的 EST/EDT）
+MARKET_TZ_LABELS: Dict[str, str] = {
+    "HK": "HKT",
+    "CN": "CST",
+}
+DEFAULT_TZ_LABEL = "UTC+8"
+
+# zoneinfo/pytz 都不可用时使用的固定偏移（不处理夏令时）
+_FIXED_OFFSETS: Dict[str, int] = {
+    "America/New_York": -5,
+    "Asia/Hong_Kong": 8,
+    "Asia/Shanghai": 8,
+}
+
+# 市场类型 -> 交易时段列表 [(开盘分钟, 收盘分钟)]，以本地时间当天0点起的分钟数表示
+MARKET_SESSIONS: Dict[str, List[Tuple[int, int]]] = {
+    "US": [(9 * 60 + 30, 16 * 60)],                              # 09:30-16:00
+    "HK": [(9 * 60 + 30, 12 * 60), (13 * 60, 16 * 60 + 10)],     # 09:30-12:00, 13:00-16:10（含收市竞价）
+    "CN": [(9 * 60 + 30, 11 * 60 + 30), (13 * 60, 15 * 60)],     # 09:30-11:30, 13:00-15:00
+}
+
+_tz_cache: Dict[str, tzinfo] = {}
+
+
+def get_market_timezone_name(market_type: str) -> str:
+    """获取市场对应的IANA时区名称"""
+    return MARKET_TIMEZONES.get(market_type, DEFAULT_TIMEZONE)
+
+
+def get_market_timezone(market_type: str) -> tzinfo:
+    """
+    获取市场对应的时区对象（带缓存）
+
+    优先使用 zoneinfo，其次 pytz，都不可用时退回固定偏移
+    """
+    tz_name = get_market_timezone_name(market_type)
+    tz = _tz_cache.get(tz_name)
+    if tz is not None:
+        return tz
+
+    try:
+        from zoneinfo import ZoneInfo
+        tz = ZoneInfo(tz_name)
+    except ImportError:
+        try:
+            import pytz
+            tz = pytz.timezone(tz_name)
+        except ImportError:
+            tz = timezone(timedelta(hours=_FIXED_OFFSETS.get(tz_name, 8)))
+
+    _tz_cache[tz_name] = tz
+    return tz
+
+
+def _localize(naive: datetime, tz: tzinfo) -> datetime:
+    """为本地时间附加时区（兼容 pytz 的 localize 接口）"""
+    localize = getattr(tz, "localize", None)
+    if localize is not None:
+        return localize(naive)
+    return naive.replace(tzinfo=tz)
+
+
+def next_kline_change_time(
+    market_type: str,
+    now: float,
+    session_ttl_seconds: float = 60,
+    close_grace_seconds: float = 900
+) -> Optional[float]:
+    """
+    计算日K及以上级别K线下一次可能发生变化的时间
+
+    - 交易时段内（含收盘后的宽限期）：K线随时在变，返回 now + session_ttl_seconds
+    - 非交易时段（盘前、午间休市、收盘后、周末）：返回下一个交易时段的开盘时间
+    - 没有交易时段定义的市场返回None，由调用方使用默认TTL
+
+    Args:
+        market_type: 市场类型 (US/HK/CN)
+        now: 当前Unix时间戳（秒）
+        session_ttl_seconds: 交易时段内的缓存有效期（秒）
+        close_grace_seconds: 收盘后仍视为交易时段的宽限期（秒），用于等待收盘数据最终确认
+
+    Returns:
+        Unix时间戳（秒）或None
+    """
+    sessions = MARKET_SESSIONS.get(market_type)
+    if not sessions:
+        return None
+
+    tz = get_market_timezone(market_type)
+    local_now = datetime.fromtimestamp(now, tz=tz)
+    today = local_now.replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+
+    # 向后最多查找7天，必然覆盖周末
+    for day_offset in range(8):
+        day = today + timedelta(days=day_offset)
+        if day.weekday() >= 5:
+            continue
+        for open_minute, close_minute in sessions:
+            session_open = _localize(day + timedelta(minutes=open_minute), tz).timestamp()
+            session_close = _localize(day + timedelta(minutes=close_minute), tz).timestamp()
+            if now < session_open:
+                return session_open
+            if now < session_close + close_grace_seconds:
+                return now + session_ttl_seconds
+
+    return None
+
+
+def local_date_bounds(
+    start_date: Optional[str],
+    end_date: Optional[str],
+    market_type: str
+) -> Tuple[Optional[int], Optional[int]]:
+    """
+    将日期范围（YYYY-MM-DD，按市场本地日期）转换为Unix时间戳范围
+
+    - 开始：开始日期本地 00:00:00
+    - 结束：结束日期本地 23:59:59（即下一天 00:00:00 前一秒）
+    时间戳落在该范围内，等价于其市场本地日期在 [start_date, end_date] 内
+
+    Returns:
+        (开始时间戳, 结束时间戳)，未指定的一端为None
+    """
+    tz = get_market_timezone(market_type)
+    start_time = end_time = None
+    if start_date:
+        day = datetime.strptime(start_date, "%Y-%m-%d")
+        start_time = int(_localize(day, tz).timestamp())
+    if end_date:
+        day = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+        end_time = int(_localize(day, tz).timestamp()) - 1
+    return start_time, end_time
+
+
+def format_local_times(
+    timestamps: Union[np.ndarray, Sequence[int]],
+    market_type: str,
+    date_only: bool = False
+) -> List[str]:
+    """
+    批量将Unix时间戳转换为市场本地时间字符串（向量化）
+
+    - date_only=False: YYYY-MM-DD HH:MM:SS 时区名称（如 2024-01-02 09:30:00 EST）
+    - date_only=True: YYYY-MM-DD（按市场本地日期）
+
+    Args:
+        timestamps: Unix时间戳数组（秒）
+        market_type: 市场类型 (US/HK/CN)
+        date_only: 是否只返回日期
+
+    Returns:
+        与输入等长的字符串列表
+    """
+    utc_seconds = np.asarray(timestamps, dtype=np.int64)
+    if utc_seconds.size == 0:
+        return []
+
+    tz_name = get_market_timezone_name(market_type)
+    local = (
+        pd.DatetimeIndex(pd.to_datetime(utc_seconds, unit="s", utc=True))
+        .tz_convert(tz_name)
+        .tz_localize(None)
+        .values.astype("datetime64[s]")
+    )
+
+    if date_only:
+        return np.datetime_as_string(local, unit="D").tolist()
+
+    text = np.char.replace(np.datetime_as_string(local, unit="s"), "T", " ")
+    if market_type in MARKET_TZ_LABELS:
+        labels = " " + MARKET_TZ_LABELS[market_type]
+    elif market_type in MARKET_TIMEZONES:
+        # 有夏令时的市场：按UTC偏移取时区缩写（每种偏移只计算一次）
+        offsets = local.astype(np.int64) - utc_seconds
+        unique_offsets, first_index = np.unique(offsets, return_index=True)
+        tz = get_market_timezone(market_type)
+        abbreviations = np.array([
+            " " + datetime.fromtimestamp(int(utc_seconds[i]), tz=tz).strftime("%Z")
+            for i in first_index
+        ])
+        labels = abbreviations[np.searchsorted(unique_offsets, offsets)]
+    else:
+        labels = " " + DEFAULT_TZ_LABEL
+
+    return np.char.add(text, labels).tolist()
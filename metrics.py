@@ -0,0 +1,226 @@
+"""Prometheus 指标模块
+
+以 Prometheus 文本格式（text/plain; version=0.0.4）导出运行指标，不依赖 prometheus_client：
+- 上游请求：按富途API方法（_m，没有时为URL路径最后一段）的耗时直方图、进行中请求数、
+  按错误码的错误计数（HTTP状态码、超时、网络错误、富途业务错误码如1002未登录等）
+- 接口请求：按路由模板的耗时直方图、按状态码的请求计数、进行中请求数
+- 采集时读取的指标：通过 register_collector 注册的回调（如K线缓存命中/未命中/淘汰次数），
+  在 /metrics 被请求时才计算，不占用请求路径
+
+热路径上每次记录只有一次字典查找和几次整数加法；指标只在事件循环中更新（不是线程安全的）。
+"""
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+from bisect import bisect_left
+import math
+import time
+
+# 默认耗时直方图分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    """转义标签值"""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """计数器（只增不减）"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labelvalues, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """仪表（可增可减，如进行中的请求数）"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *labelvalues: str) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + 1
+
+    def dec(self, *labelvalues: str) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0) - 1
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labelvalues, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """直方图（按固定分桶计数，导出时转换为累计计数）"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._buckets = tuple(sorted(buckets))
+        # labelvalues -> [各分桶计数（最后一个为+Inf）, 总和]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [[0] * (len(self._buckets) + 1), 0.0]
+        series[0][bisect_left(self._buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        bucket_names = self.labelnames + ("le",)
+        bounds = [_format_value(bound) for bound in self._buckets] + ["+Inf"]
+        for labelvalues, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _format_labels(bucket_names, labelvalues + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# 采集回调返回的样本：(指标名, 类型, 说明, [(标签字典, 值)])
+Sample = Tuple[str, str, str, Iterable[Tuple[Dict[str, str], float]]]
+
+_metrics: List[_Metric] = []
+_collectors: List[Callable[[], Iterable[Sample]]] = []
+
+
+def _register(metric: _Metric) -> _Metric:
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(collector: Callable[[], Iterable[Sample]]) -> None:
+    """注册采集回调（导出指标时调用，用于读取缓存统计等已有计数）"""
+    _collectors.append(collector)
+
+
+def render_metrics() -> str:
+    """以 Prometheus 文本格式导出所有指标"""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        for name, type_name, documentation, samples in collector():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {type_name}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# 上游请求指标
+UPSTREAM_LATENCY = _register(Histogram(
+    "futu_upstream_request_duration_seconds", "Upstream request latency by Futu API method.", ("method",)
+))
+UPSTREAM_IN_FLIGHT = _register(Gauge(
+    "futu_upstream_requests_in_flight", "Upstream requests currently in flight by Futu API method.", ("method",)
+))
+UPSTREAM_ERRORS = _register(Counter(
+    "futu_upstream_errors_total",
+    "Upstream errors by Futu API method and code (HTTP status, timeout, network, circuit_open or Futu error code).",
+    ("method", "code")
+))
+
+# 接口请求指标
+HTTP_LATENCY = _register(Histogram(
+    "http_request_duration_seconds", "API request latency by route.", ("route", "method")
+))
+HTTP_REQUESTS = _register(Counter(
+    "http_requests_total", "API requests by route and status code.", ("route", "method", "status")
+))
+HTTP_IN_FLIGHT = _register(Gauge(
+    "http_requests_in_flight", "API requests currently being processed."
+))
+
+
+class MetricsMiddleware:
+    """记录接口请求指标的ASGI中间件（按路由模板统计，如 /api/kline）"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec()
+            # 路由匹配后 scope 中才有 route；未匹配的路径统一归为 unmatched，避免标签基数失控
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_LATENCY.observe(elapsed, path, scope["method"])
+            HTTP_REQUESTS.inc(path, scope["method"], str(status))
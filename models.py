@@ -106,6 +106,11 @@ class StockSearchResult(BaseModel):
     security_type: str = Field(..., description="证券类型")
 
 
+class BatchQuoteRequest(BaseModel):
+    """批量行情请求"""
+    stock_codes: List[str] = Field(..., description="股票代码列表，如 [\"AAPL\", \"00700\", \"600519\"]", min_length=1)
+
+
 class CancelOrderRequest(BaseModel):
     """撤单请求"""
     order_id: str = Field(..., description="订单ID")
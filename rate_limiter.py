@@ -0,0 +1,234 @@
+"""上游请求限流模块
+
+每个上游主机一个令牌桶，按优先级调度排队的请求，并根据上游响应自适应调整速率：
+- 优先级：trade（下单/撤单）> market_data（行情、K线、账户查询等）> background（热门资讯/热门榜单）
+- 有请求排队时，令牌总是先分配给最高优先级的队首请求；同一优先级内先到先得
+- 为 trade 保留部分令牌：其他优先级只有在剩余令牌超过保留数时才能取用，
+  突发的行情请求不会耗尽下单/撤单所需的令牌
+- 收到429时速率减半并清空令牌（有 Retry-After 时按其暂停），5xx/网络错误时速率降为80%；
+  成功响应逐步恢复速率，直到配置的上限
+- 按优先级统计排队深度和等待时间
+
+只在事件循环中使用（不是线程安全的）。
+"""
+from typing import Any, Deque, Dict, Optional
+from collections import deque
+import asyncio
+import time
+
+# 优先级（从高到低）
+PRIORITY_TRADE = "trade"
+PRIORITY_MARKET_DATA = "market_data"
+PRIORITY_BACKGROUND = "background"
+PRIORITY_CLASSES = (PRIORITY_TRADE, PRIORITY_MARKET_DATA, PRIORITY_BACKGROUND)
+
+# 自适应调整参数
+_THROTTLED_FACTOR = 0.5    # 收到429时的速率系数
+_ERROR_FACTOR = 0.8        # 5xx/网络错误时的速率系数
+_RECOVERY_STEP = 0.02      # 每次成功响应恢复的速率（占速率上限的比例）
+_DECREASE_COOLDOWN = 1.0   # 两次降速之间的最小间隔（秒），避免同一批失败把速率一次降到底
+
+
+class _ClassStats:
+    """单个优先级的排队统计"""
+
+    __slots__ = ("acquired", "queued", "cancelled", "wait_total", "wait_max", "max_depth")
+
+    def __init__(self):
+        self.acquired = 0
+        self.queued = 0
+        self.cancelled = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.max_depth = 0
+
+    def record(self, wait: float) -> None:
+        self.acquired += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+
+class HostRateLimiter:
+    """单个上游主机的自适应令牌桶限流器"""
+
+    def __init__(self, rate: float, burst: float, min_rate: float = 1.0, trade_reserve: float = 0.0):
+        """
+        初始化限流器
+
+        Args:
+            rate: 速率上限（每秒请求数）
+            burst: 令牌桶容量（允许的突发请求数）
+            min_rate: 自适应降速的下限（每秒请求数）
+            trade_reserve: 为 trade 优先级保留的令牌数
+        """
+        self._max_rate = rate
+        self._min_rate = min(min_rate, rate)
+        self._rate = rate
+        self._burst = max(1.0, burst)
+        self._reserve = max(0.0, min(trade_reserve, self._burst - 1))
+
+        self._tokens = self._burst
+        self._updated = time.monotonic()
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {name: deque() for name in PRIORITY_CLASSES}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._last_decrease = 0.0
+
+        self._stats = {name: _ClassStats() for name in PRIORITY_CLASSES}
+        self._throttled = 0   # 收到429的次数
+        self._errors = 0      # 5xx/网络错误次数
+        self._decreases = 0   # 实际降速次数
+
+    def _refill(self, now: float) -> None:
+        """按经过的时间补充令牌"""
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def _needed(self, priority: str) -> float:
+        """取用一个令牌前桶内至少需要的令牌数（非 trade 优先级不能动用保留令牌）"""
+        return 1.0 if priority == PRIORITY_TRADE else 1.0 + self._reserve
+
+    def _has_waiters(self, up_to: str) -> bool:
+        """优先级不低于 up_to 的队列中是否有等待的请求"""
+        for name in PRIORITY_CLASSES:
+            if any(not waiter.done() for waiter in self._waiters[name]):
+                return True
+            if name == up_to:
+                return False
+        return False
+
+    async def acquire(self, priority: str = PRIORITY_MARKET_DATA) -> float:
+        """
+        获取一个令牌（令牌不足时按优先级排队等待）
+
+        Args:
+            priority: 请求优先级（PRIORITY_CLASSES 之一）
+
+        Returns:
+            排队等待的时间（秒）
+        """
+        stats = self._stats[priority]
+        started = time.monotonic()
+        self._refill(started)
+        if self._tokens >= self._needed(priority) and not self._has_waiters(priority):
+            self._tokens -= 1
+            stats.record(0.0)
+            return 0.0
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue = self._waiters[priority]
+        queue.append(waiter)
+        stats.queued += 1
+        stats.max_depth = max(stats.max_depth, sum(1 for w in queue if not w.done()))
+        self._schedule()
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            if waiter.done() and not waiter.cancelled():
+                # 令牌已分配但调用者被取消：归还令牌
+                self._tokens = min(self._burst, self._tokens + 1)
+            self._schedule()
+            raise
+
+        wait = time.monotonic() - started
+        stats.record(wait)
+        return wait
+
+    def _dispatch(self) -> None:
+        """按优先级把可用令牌分配给排队的请求"""
+        self._timer = None
+        self._refill(time.monotonic())
+        for name in PRIORITY_CLASSES:
+            queue = self._waiters[name]
+            while queue:
+                if queue[0].done():  # 已取消
+                    queue.popleft()
+                    continue
+                if self._tokens < self._needed(name):
+                    break
+                self._tokens -= 1
+                queue.popleft().set_result(None)
+            if queue:
+                # 高优先级请求仍在等待，低优先级不能越过
+                break
+        self._schedule()
+
+    def _schedule(self) -> None:
+        """按最高优先级等待请求所需的令牌数安排下一次分配"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for name in PRIORITY_CLASSES:
+            queue = self._waiters[name]
+            while queue and queue[0].done():
+                queue.popleft()
+            if queue:
+                self._refill(time.monotonic())
+                delay = max(0.0, (self._needed(name) - self._tokens) / self._rate)
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+
+    def _decrease(self, factor: float) -> None:
+        """降低速率（冷却期内只降一次）"""
+        now = time.monotonic()
+        if now - self._last_decrease < _DECREASE_COOLDOWN:
+            return
+        self._refill(now)
+        self._rate = max(self._min_rate, self._rate * factor)
+        self._last_decrease = now
+        self._decreases += 1
+
+    def on_response(self, status_code: int, retry_after: Optional[float] = None) -> None:
+        """
+        根据上游响应调整速率
+
+        Args:
+            status_code: HTTP状态码
+            retry_after: 429响应的 Retry-After（秒，可选）
+        """
+        if status_code == 429:
+            self._throttled += 1
+            self._decrease(_THROTTLED_FACTOR)
+            # 清空令牌；有 Retry-After 时令牌欠账到该时间之后才恢复
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -(retry_after or 0.0) * self._rate)
+            self._schedule()
+        elif status_code >= 500:
+            self.on_error()
+        elif self._rate < self._max_rate:
+            self._refill(time.monotonic())
+            self._rate = min(self._max_rate, self._rate + self._max_rate * _RECOVERY_STEP)
+
+    def on_error(self) -> None:
+        """上游5xx或网络错误（超时、连接失败等）"""
+        self._errors += 1
+        self._decrease(_ERROR_FACTOR)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取限流统计信息（当前速率、令牌数、各优先级的排队深度和等待时间）"""
+        self._refill(time.monotonic())
+        classes = {}
+        for name in PRIORITY_CLASSES:
+            stats = self._stats[name]
+            classes[name] = {
+                "queue_depth": sum(1 for waiter in self._waiters[name] if not waiter.done()),
+                "max_queue_depth": stats.max_depth,
+                "acquired": stats.acquired,
+                "queued": stats.queued,
+                "cancelled": stats.cancelled,
+                "wait_avg_ms": stats.wait_total / stats.acquired * 1000 if stats.acquired else 0.0,
+                "wait_max_ms": stats.wait_max * 1000
+            }
+        return {
+            "rate": self._rate,
+            "max_rate": self._max_rate,
+            "min_rate": self._min_rate,
+            "burst": self._burst,
+            "trade_reserve": self._reserve,
+            "tokens": self._tokens,
+            "throttled": self._throttled,
+            "errors": self._errors,
+            "rate_decreases": self._decreases,
+            "classes": classes
+        }
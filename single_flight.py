@@ -0,0 +1,66 @@
+"""上游请求合并模块（Single-Flight）
+
+同一时刻多个完全相同的上游GET请求只真正发送一次，
+其余调用者共享同一个结果（或同一个异常）。
+
+注意：共享的结果对象会返回给所有调用者，调用方应将其视为只读。
+"""
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+
+
+class SingleFlight:
+    """请求合并器
+
+    合并策略：
+    - 相同key的请求在飞行中时，后到的调用者直接等待已有的上游任务
+    - 上游任务完成后立即从飞行表移除，不做结果缓存
+    - 单个调用者被取消不会取消共享的上游任务
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._calls = 0      # 总调用次数
+        self._executed = 0   # 实际发送到上游的次数
+        self._shared = 0     # 通过合并节省的上游调用次数
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行（或加入）key对应的上游调用
+
+        Args:
+            key: 请求唯一标识
+            func: 无参协程工厂，只有在没有飞行中的相同请求时才会被调用
+
+        Returns:
+            上游调用结果
+        """
+        self._calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self._executed += 1
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, t))
+        else:
+            self._shared += 1
+
+        # shield：某个调用者被取消时，其他调用者仍能拿到结果
+        return await asyncio.shield(task)
+
+    def _on_done(self, key: Hashable, task: asyncio.Future) -> None:
+        """上游任务完成：移出飞行表，并标记异常已读取（所有调用者都取消时避免告警）"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取合并统计信息"""
+        return {
+            "calls": self._calls,
+            "executed": self._executed,
+            "shared": self._shared,
+            "inflight": len(self._inflight),
+            "saved_ratio": self._shared / self._calls if self._calls else 0.0
+        }
@@ -0,0 +1,652 @@
+"""增量（流式）技术指标计算模块
+
+为每个 (security_id, interval) 保存一个流式计算图：
+- 计算图的节点与 technical_indicators.IndicatorGraph 相同（节点键中包含指标参数，
+  如 ("ema", ("col", "close"), 12)），可直接传给 calculate_* 函数
+- 每个节点保存运行状态（EMA/Wilder平滑值、滚动窗口的环形缓冲区和补偿求和），
+  新K线到达或最后一根K线更新时，每个节点 O(1) 更新
+- 节点的更新公式与pandas的 ewm/rolling 实现一致，结果与批量计算相同
+- 输入为分时缓存的原始分钟K线：每次同步只用常数次比较判断历史是否变化，
+  只对最后一个已知周期起的分钟重采样，再追加/更新尾部K线；
+  计算图的 df 是K线列的零拷贝视图，不随每次同步重建
+- 接口输出（按日期范围格式化指标值）的耗时仍与返回的K线数成正比
+- 计算图保存在当前进程中，只在工作池的 thread/inline 模式下使用；process 模式下改为全量计算
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from math import isnan, sqrt, copysign
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config import STREAMING_INDICATORS_MAX_ENTRIES
+from kline_bars import KlineBars
+from technical_indicators import IndicatorGraph, resample_kline_data
+
+
+_NAN = float("nan")
+_BAR_FIELDS = ("time", "open", "high", "low", "close", "volume")
+
+
+class _Column:
+    """可增长的数组（K线列和输出序列，默认float64）"""
+
+    __slots__ = ("data", "size")
+
+    def __init__(self, capacity: int = 256, dtype=np.float64):
+        self.data = np.empty(max(capacity, 16), dtype=dtype)
+        self.size = 0
+
+    def _grow(self, capacity: int) -> None:
+        grown = np.empty(max(capacity, len(self.data) * 2), dtype=self.data.dtype)
+        grown[:self.size] = self.data[:self.size]
+        self.data = grown
+
+    def append(self, value: float) -> None:
+        if self.size == len(self.data):
+            self._grow(self.size + 1)
+        self.data[self.size] = value
+        self.size += 1
+
+    def extend(self, values: np.ndarray) -> None:
+        end = self.size + len(values)
+        if end > len(self.data):
+            self._grow(end)
+        self.data[self.size:end] = values
+        self.size = end
+
+    def set_last(self, value: float) -> None:
+        self.data[self.size - 1] = value
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.size]
+
+
+class _Node:
+    """流式节点基类
+
+    step(inputs, replace):
+    - replace=False：追加一根新K线
+    - replace=True：替换最后一根K线（先回滚到上一根K线之后的状态再重新计算）
+    """
+
+    __slots__ = ("deps", "output")
+
+    def __init__(self, deps: Tuple[tuple, ...], capacity: int):
+        self.deps = deps
+        self.output = _Column(capacity)
+
+    def step(self, inputs: List[float], replace: bool) -> float:
+        raise NotImplementedError
+
+
+class _ColNode(_Node):
+    """原始列（输入为当前K线的字段值）"""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str, capacity: int):
+        super().__init__((), capacity)
+        self.name = name
+
+    def step(self, inputs: List[float], replace: bool) -> float:
+        return inputs[0]
+
+
+class _ShiftNode(_Node):
+    """shift(1)：输出上一根K线的输入值"""
+
+    __slots__ = ("last", "before_last")
+
+    def __init__(self, deps, capacity):
+        super().__init__(deps, capacity)
+        self.last = _NAN
+        self.before_last = _NAN
+
+    def step(self, inputs, replace):
+        if replace:
+            self.last = inputs[0]
+            return self.before_last
+        out = self.last
+        self.before_last = self.last
+        self.last = inputs[0]
+        return out
+
+
+class _DiffNode(_ShiftNode):
+    """diff(1)：当前值减上一根K线的值"""
+
+    __slots__ = ()
+
+    def step(self, inputs, replace):
+        return inputs[0] - _ShiftNode.step(self, inputs, replace)
+
+
+class _PointwiseNode(_Node):
+    """逐点计算的节点（无状态）"""
+
+    __slots__ = ("func",)
+
+    def __init__(self, deps, capacity, func):
+        super().__init__(deps, capacity)
+        self.func = func
+
+    def step(self, inputs, replace):
+        return self.func(*inputs)
+
+
+class _EwmNode(_Node):
+    """adjust=False 的指数加权均值（与 pandas ewm(...).mean() 的更新公式一致）
+
+    状态为 (weighted, old_wt)，替换最后一根K线时从上一根K线之后的状态重新计算
+    """
+
+    __slots__ = ("alpha", "old_wt_factor", "state", "prev_state")
+
+    def __init__(self, deps, capacity, com: float):
+        super().__init__(deps, capacity)
+        # 与pandas相同：span/alpha 先换算为 com，再由 com 得到 alpha
+        alpha = 1. / (1. + com)
+        self.alpha = alpha
+        self.old_wt_factor = 1. - alpha
+        self.state = (_NAN, 1.)
+        self.prev_state = self.state
+
+    def step(self, inputs, replace):
+        if not replace:
+            self.prev_state = self.state
+        weighted, old_wt = self.prev_state
+        cur = inputs[0]
+
+        if isnan(weighted):
+            if not isnan(cur):
+                weighted = cur
+                old_wt = 1.
+        else:
+            old_wt *= self.old_wt_factor
+            if not isnan(cur):
+                if weighted != cur:
+                    weighted = ((old_wt * weighted) + (self.alpha * cur)) / (old_wt + self.alpha)
+                old_wt = 1.
+
+        self.state = (weighted, old_wt)
+        return weighted
+
+
+class _RollingNode(_Node):
+    """固定窗口滚动统计（环形缓冲区 + 补偿求和，每根K线O(1)更新）
+
+    kind:
+    - "sum": 滚动求和
+    - "mean": 滚动均值
+    - "std": 滚动标准差（ddof=1）
+    窗口内有效值不足 window 个时输出NaN（与 rolling(window=window) 默认行为一致）
+    """
+
+    __slots__ = ("kind", "window", "buffer", "stats", "prev_stats", "evicted")
+
+    def __init__(self, deps, capacity, kind: str, window: int):
+        super().__init__(deps, capacity)
+        self.kind = kind
+        self.window = window
+        self.buffer: deque = deque()
+        # (有效值个数, 负数个数, 和/均值, 加入补偿, 移出补偿, 离差平方和, 连续相同值个数, 上一个值)
+        self.stats = (0, 0, 0., 0., 0., 0., 0, _NAN)
+        self.prev_stats = self.stats
+        self.evicted: Optional[float] = None
+
+    # --- 求和/均值：Kahan补偿的增量求和 ---
+
+    @staticmethod
+    def _add_sum(val, stats):
+        nobs, neg_ct, sum_x, comp_add, comp_remove, ssqdm_x, same, prev_value = stats
+        if val == val:
+            nobs += 1
+            y = val - comp_add
+            t = sum_x + y
+            comp_add = t - sum_x - y
+            sum_x = t
+            if copysign(1., val) < 0:
+                neg_ct += 1
+            if val == prev_value:
+                same += 1
+            else:
+                same = 1
+            prev_value = val
+        return (nobs, neg_ct, sum_x, comp_add, comp_remove, ssqdm_x, same, prev_value)
+
+    @staticmethod
+    def _remove_sum(val, stats):
+        nobs, neg_ct, sum_x, comp_add, comp_remove, ssqdm_x, same, prev_value = stats
+        if val == val:
+            nobs -= 1
+            y = -val - comp_remove
+            t = sum_x + y
+            comp_remove = t - sum_x - y
+            sum_x = t
+            if copysign(1., val) < 0:
+                neg_ct -= 1
+        return (nobs, neg_ct, sum_x, comp_add, comp_remove, ssqdm_x, same, prev_value)
+
+    # --- 标准差：带补偿的Welford增量方差 ---
+
+    @staticmethod
+    def _add_var(val, stats):
+        nobs, neg_ct, mean_x, comp, _, ssqdm_x, same, prev_value = stats
+        if val == val:
+            nobs += 1
+            prev_mean = mean_x - comp
+            y = val - comp
+            t = y - mean_x
+            comp = t + mean_x - y
+            mean_x = mean_x + t / nobs
+            ssqdm_x += (val - prev_mean) * (val - mean_x)
+            if ssqdm_x < 0:
+                # 舍入误差导致离差平方和为负时重置（与pandas一致）
+                mean_x = val
+                ssqdm_x = 0.
+        return (nobs, neg_ct, mean_x, comp, 0., ssqdm_x, same, prev_value)
+
+    @staticmethod
+    def _remove_var(val, stats):
+        nobs, neg_ct, mean_x, comp, _, ssqdm_x, same, prev_value = stats
+        if val == val:
+            nobs -= 1
+            if nobs:
+                prev_mean = mean_x - comp
+                y = val - comp
+                t = y - mean_x
+                comp = t + mean_x - y
+                mean_x -= t / nobs
+                ssqdm_x -= (val - prev_mean) * (val - mean_x)
+            else:
+                mean_x = 0.
+                ssqdm_x = 0.
+        return (nobs, neg_ct, mean_x, comp, 0., ssqdm_x, same, prev_value)
+
+    def _result(self) -> float:
+        nobs, neg_ct, value, _, _, ssqdm_x, same, prev_value = self.stats
+        if nobs < self.window:
+            return _NAN
+
+        if self.kind == "sum":
+            return prev_value * nobs if same >= nobs else value
+
+        if self.kind == "mean":
+            result = value / nobs
+            if same >= nobs:
+                return prev_value
+            if neg_ct == 0 and result < 0:
+                return 0.
+            if neg_ct == nobs and result > 0:
+                return 0.
+            return result
+
+        # std
+        if nobs == 1:
+            return 0.
+        variance = ssqdm_x / (nobs - 1)
+        return sqrt(variance) if variance > 0 else 0.
+
+    def step(self, inputs, replace):
+        val = inputs[0]
+        if replace:
+            # 回滚上一次追加：移除最后一个值，恢复被挤出的值和统计状态
+            self.buffer.pop()
+            if self.evicted is not None:
+                self.buffer.appendleft(self.evicted)
+            self.stats = self.prev_stats
+        self.prev_stats = self.stats
+
+        if self.kind == "std":
+            add, remove = self._add_var, self._remove_var
+        else:
+            add, remove = self._add_sum, self._remove_sum
+
+        self.evicted = None
+        if len(self.buffer) == self.window:
+            self.evicted = self.buffer.popleft()
+            self.stats = add(val, remove(self.evicted, self.stats))
+        else:
+            self.stats = add(val, self.stats)
+        self.buffer.append(val)
+        return self._result()
+
+
+def _gain(delta: float) -> float:
+    return delta if delta > 0 else 0.
+
+
+def _loss(delta: float) -> float:
+    return -(delta if delta < 0 else 0.)
+
+
+def _true_range(high: float, low: float, prev_close: float) -> float:
+    # 与 concat([tr1, tr2, tr3]).max(axis=1) 一致：忽略NaN
+    values = [v for v in (high - low, abs(high - prev_close), abs(low - prev_close)) if not isnan(v)]
+    return max(values) if values else _NAN
+
+
+def _build_node(key: tuple, capacity: int) -> _Node:
+    """根据节点键创建流式节点（依赖节点键在 deps 中）"""
+    kind = key[0]
+    if kind == "col":
+        return _ColNode(key[1], capacity)
+    if kind == "shift":
+        return _ShiftNode((key[1],), capacity)
+    if kind == "diff":
+        return _DiffNode((key[1],), capacity)
+    if kind == "gain":
+        return _PointwiseNode((("diff", key[1]),), capacity, _gain)
+    if kind == "loss":
+        return _PointwiseNode((("diff", key[1]),), capacity, _loss)
+    if kind == "ema":
+        return _EwmNode((key[1],), capacity, (key[2] - 1.) / 2.)
+    if kind == "wilder":
+        return _EwmNode((key[1],), capacity, (1. - 1. / key[2]) / (1. / key[2]))
+    if kind == "sma":
+        return _RollingNode((key[1],), capacity, "mean", key[2])
+    if kind == "rolling_sum":
+        return _RollingNode((key[1],), capacity, "sum", key[2])
+    if kind == "rolling_std":
+        return _RollingNode((key[1],), capacity, "std", key[2])
+    if kind == "sub":
+        return _PointwiseNode((key[1], key[2]), capacity, lambda a, b: a - b)
+    if kind == "mul":
+        return _PointwiseNode((key[1], key[2]), capacity, lambda a, b: a * b)
+    if kind == "scale":
+        factor = key[2]
+        return _PointwiseNode((key[1],), capacity, lambda a: a * factor)
+    if kind == "true_range":
+        return _PointwiseNode((("col", "high"), ("col", "low"), ("shift", ("col", "close"))), capacity, _true_range)
+    if kind == "typical_price":
+        return _PointwiseNode(
+            (("col", "high"), ("col", "low"), ("col", "close")), capacity,
+            lambda high, low, close: (high + low + close) / 3
+        )
+    if kind == "money_flow":
+        rising = key[1] > 0
+        return _PointwiseNode(
+            (("typical_price",), ("shift", ("typical_price",)), ("mul", ("typical_price",), ("col", "volume"))),
+            capacity,
+            lambda tp, prev, flow: flow if (tp > prev if rising else tp < prev) else 0.
+        )
+    raise KeyError(f"Unsupported streaming node: {key}")
+
+
+def _to_frame(bars: KlineBars, resample_interval: Optional[str]) -> pd.DataFrame:
+    """原始分钟K线转换为DataFrame（需要时重采样）"""
+    df = bars.to_dataframe()
+    if resample_interval:
+        df = resample_kline_data(df, resample_interval)
+    return df
+
+
+def _resample_tail(bars: KlineBars, resample_interval: str) -> pd.DataFrame:
+    """
+    重采样同步时的少量尾部分钟K线，结果与 resample_kline_data 相同
+
+    按周期起点分组（各重采样间隔都能整除一天，与pandas按当天零点对齐的分组一致），
+    组内 open 取第一根、close 取最后一根、high/low 取极值、volume 求和；
+    含NaN时交给 resample_kline_data 处理（pandas的 first/last/max/min 会跳过NaN）
+    """
+    prices = (bars.open, bars.high, bars.low, bars.close)
+    if len(bars) == 0 or any(np.isnan(column).any() for column in prices):
+        return _to_frame(bars, resample_interval)
+    step = int(pd.Timedelta(resample_interval).total_seconds())
+    buckets = bars.time // step * step
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(bars)] - 1
+    return pd.DataFrame({
+        "open": bars.open[starts],
+        "high": np.maximum.reduceat(bars.high, starts),
+        "low": np.minimum.reduceat(bars.low, starts),
+        "close": bars.close[ends],
+        "volume": np.add.reduceat(bars.volume, starts),
+        "time": buckets[starts]
+    })
+
+
+class StreamingIndicatorGraph(IndicatorGraph):
+    """流式指标计算图
+
+    - 与 IndicatorGraph 接口相同，可直接传给 calculate_* 函数
+    - 节点首次被请求时用已有K线回放建立状态，之后随 append_bar/update_last_bar O(1) 更新
+    - 节点按创建顺序（依赖在前）依次更新
+    - df 为K线列（预分配、按倍数增长）的零拷贝视图，K线数变化后首次访问时重新包装（不复制数据）
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self._bars: Dict[str, _Column] = {
+            name: _Column(len(df) + 64, np.int64 if name == "time" else np.float64) for name in _BAR_FIELDS
+        }
+        for name in _BAR_FIELDS:
+            self._bars[name].extend(df[name].to_numpy())
+        super().__init__(None)
+        self._stream_nodes: "OrderedDict[tuple, _Node]" = OrderedDict()
+        self.lock = threading.Lock()
+        # 最近一次同步的原始分钟K线（用于判断下次同步时历史是否变化）
+        self.source: Optional[KlineBars] = None
+
+    @property
+    def df(self) -> pd.DataFrame:
+        frame = self._frame
+        if frame is None or len(frame) != len(self):
+            frame = self._frame = pd.DataFrame(
+                {name: self._bars[name].view() for name in _BAR_FIELDS}, copy=False
+            )
+        return frame
+
+    @df.setter
+    def df(self, value: Optional[pd.DataFrame]) -> None:
+        # 只在 IndicatorGraph.__init__ 中被赋值，实际的帧由K线列按需生成
+        self._frame = value
+
+    def __len__(self) -> int:
+        return self._bars["time"].size
+
+    @property
+    def times(self) -> np.ndarray:
+        return self._bars["time"].view()
+
+    def _ensure_node(self, key: tuple) -> _Node:
+        """创建节点（先创建依赖节点），并用已有K线回放建立状态"""
+        node = self._stream_nodes.get(key)
+        if node is not None:
+            return node
+
+        node = _build_node(key, len(self) + 64)
+        dep_nodes = [self._ensure_node(dep) for dep in node.deps]
+
+        if isinstance(node, _ColNode):
+            for value in self._bars[node.name].view():
+                node.output.append(value)
+        else:
+            dep_values = [dep.output.view() for dep in dep_nodes]
+            for i in range(len(self)):
+                node.output.append(node.step([values[i] for values in dep_values], False))
+
+        self._stream_nodes[key] = node
+        self.evaluated += 1
+        return node
+
+    def get(self, key: tuple) -> pd.Series:
+        """获取节点值序列（与 IndicatorGraph.get 相同，但值来自流式状态）"""
+        node = self._ensure_node(key)
+        return pd.Series(node.output.view(), index=self.df.index, copy=False)
+
+    def _push(self, bar: Dict[str, float], replace: bool) -> None:
+        for name in _BAR_FIELDS:
+            column = self._bars[name]
+            if replace:
+                column.set_last(bar[name])
+            else:
+                column.append(bar[name])
+
+        nodes = self._stream_nodes
+        for node in nodes.values():
+            if isinstance(node, _ColNode):
+                value = bar[node.name]
+            else:
+                # 依赖节点已先于当前节点更新，取其最新值
+                inputs = [nodes[dep].output.data[nodes[dep].output.size - 1] for dep in node.deps]
+                value = node.step(inputs, replace)
+            if replace:
+                node.output.set_last(value)
+            else:
+                node.output.append(value)
+
+    def append_bar(self, bar: Dict[str, float]) -> None:
+        """追加一根新K线（所有节点O(1)更新）"""
+        self._push(bar, replace=False)
+
+    def update_last_bar(self, bar: Dict[str, float]) -> None:
+        """更新最后一根K线（例如当前分钟/当前5分钟K线仍在变化）"""
+        self._push(bar, replace=True)
+
+
+class StreamingIndicatorEngine:
+    """流式指标计算图注册表
+
+    - 以 (security_id, interval) 为键保存计算图，节点键中已包含指标参数
+    - use() 将计算图与最新的原始分钟K线对齐：历史未变化时只重采样并追加/更新尾部K线，否则重建
+    - 超过 max_entries 时按LRU淘汰
+    - 线程安全：每个计算图带独立的锁，use() 在对齐和读取期间一直持有该锁
+    """
+
+    def __init__(self, max_entries: int = 200):
+        self._graphs: "OrderedDict[Tuple[str, str], StreamingIndicatorGraph]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+
+        self._rebuilds = 0
+        self._incremental_syncs = 0
+        self._bars_appended = 0
+        self._bars_updated = 0
+
+    @contextmanager
+    def use(
+        self,
+        security_id: str,
+        interval: str,
+        bars: KlineBars,
+        resample_interval: Optional[str] = None
+    ) -> Iterator[StreamingIndicatorGraph]:
+        """
+        获取与 bars 对齐的流式计算图，with 块内持有该计算图的锁
+
+        Args:
+            security_id: 股票ID
+            interval: 时间间隔
+            bars: 原始分钟K线（分时缓存中的序列：除最后一根外只追加、不修改）
+            resample_interval: 重采样间隔（如 5min/1h），为None时直接使用 bars
+
+        Yields:
+            StreamingIndicatorGraph（graph.df 与 bars 重采样后的K线一致）
+        """
+        key = (security_id, interval)
+        with self._lock:
+            graph = self._graphs.get(key)
+            if graph is not None:
+                self._graphs.move_to_end(key)
+
+        if graph is not None:
+            graph.lock.acquire()
+            if not self._advance(graph, bars, resample_interval):
+                graph.lock.release()
+                graph = None
+
+        if graph is None:
+            graph = StreamingIndicatorGraph(_to_frame(bars, resample_interval))
+            graph.source = bars
+            graph.lock.acquire()
+            with self._lock:
+                self._rebuilds += 1
+                self._graphs[key] = graph
+                self._graphs.move_to_end(key)
+                while self._max_entries > 0 and len(self._graphs) > self._max_entries:
+                    self._graphs.popitem(last=False)
+
+        try:
+            yield graph
+        finally:
+            graph.lock.release()
+
+    def _advance(
+        self,
+        graph: StreamingIndicatorGraph,
+        bars: KlineBars,
+        resample_interval: Optional[str]
+    ) -> bool:
+        """
+        将已有计算图推进到 bars 的状态
+
+        - 与上次同步的是同一份序列时不做任何处理
+        - 只比较首根K线时间、上次最后一根K线的时间和K线数，判断历史是否被替换（如新交易日）；
+          分时缓存只追加新分钟或替换最后一根，这些检查足以确定已同步的部分未变化
+        - 只重采样最后一个已知周期起的分钟：最后一个周期可能仍在变化，之后的为新周期
+        不能增量更新时返回False（需要重建）
+        """
+        source = graph.source
+        if bars is source:
+            return True
+        known = 0 if source is None else len(source)
+        if known == 0 or len(graph) == 0 or len(bars) < known:
+            return False
+        if bars.time[0] != source.time[0] or bars.time[known - 1] != source.time[known - 1]:
+            return False
+
+        last_time = graph.times[-1]
+        start = int(np.searchsorted(bars.time, last_time, side="left"))
+        tail = bars.filter(slice(start, len(bars)))
+        tail = _resample_tail(tail, resample_interval) if resample_interval else tail.to_dataframe()
+        if len(tail) == 0 or tail["time"].iat[0] != last_time:
+            return False
+
+        columns = {name: tail[name].to_numpy(dtype=np.float64) for name in _BAR_FIELDS}
+        fixed = len(graph) - 1
+        appended = updated = 0
+        last = {name: columns[name][0] for name in _BAR_FIELDS}
+        if any(graph._bars[name].data[fixed] != last[name] for name in _BAR_FIELDS):
+            graph.update_last_bar(last)
+            updated = 1
+
+        for i in range(1, len(tail)):
+            graph.append_bar({name: columns[name][i] for name in _BAR_FIELDS})
+            appended += 1
+        graph.source = bars
+
+        with self._lock:
+            self._incremental_syncs += 1
+            self._bars_appended += appended
+            self._bars_updated += updated
+        return True
+
+    def clear(self) -> None:
+        """清空所有计算图"""
+        with self._lock:
+            self._graphs.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self._lock:
+            return {
+                "total_graphs": len(self._graphs),
+                "max_entries": self._max_entries,
+                "rebuilds": self._rebuilds,
+                "incremental_syncs": self._incremental_syncs,
+                "bars_appended": self._bars_appended,
+                "bars_updated": self._bars_updated,
+                "nodes": sum(len(graph._stream_nodes) for graph in self._graphs.values())
+            }
+
+
+# 全局实例
+_streaming_engine = StreamingIndicatorEngine(max_entries=STREAMING_INDICATORS_MAX_ENTRIES)
+
+
+def get_streaming_engine() -> StreamingIndicatorEngine:
+    """获取全局流式指标引擎实例"""
+    return _streaming_engine
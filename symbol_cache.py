@@ -0,0 +1,142 @@
+"""股票代码解析缓存模块
+
+缓存 (标准化代码, 市场) -> StockSearchResult 的解析结果，
+避免每个行情/K线/下单请求都调用一次 search-target-stock 接口。
+"""
+from typing import Dict, Any, Optional, Tuple
+from collections import OrderedDict
+import threading
+import time
+
+from config import (
+    SYMBOL_CACHE_MAX_ENTRIES, SYMBOL_CACHE_TTL_SECONDS,
+    SYMBOL_CACHE_NEGATIVE_TTL_SECONDS
+)
+from models import StockSearchResult
+
+
+class SymbolCache:
+    """股票代码解析缓存类
+
+    缓存策略：
+    - 以 (标准化代码, 市场类型) 为键
+    - 找到的股票缓存 ttl_seconds，未找到的代码缓存 negative_ttl_seconds（负缓存）
+    - 超过 max_entries 时按LRU淘汰
+    - 线程安全
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: float = 86400,
+        negative_ttl_seconds: float = 300
+    ):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最大缓存条目数
+            ttl_seconds: 正常解析结果的有效期（秒）
+            negative_ttl_seconds: 未找到结果的有效期（秒）
+        """
+        # key -> (结果或None, 过期时间戳)
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[Optional[StockSearchResult], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._negative_ttl_seconds = negative_ttl_seconds
+
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, code: str, market_type: str) -> Tuple[bool, Optional[StockSearchResult]]:
+        """从缓存获取解析结果
+
+        Args:
+            code: 标准化后的股票代码
+            market_type: 市场类型
+
+        Returns:
+            (是否命中, 解析结果)；命中负缓存时返回 (True, None)
+        """
+        key = (code, market_type)
+        now = time.time()
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self._misses += 1
+                return False, None
+
+            result, expires_at = entry
+            if now >= expires_at:
+                del self._cache[key]
+                self._misses += 1
+                return False, None
+
+            self._cache.move_to_end(key)
+            if result is None:
+                self._negative_hits += 1
+            else:
+                self._hits += 1
+            return True, result
+
+    def set(self, code: str, market_type: str, result: Optional[StockSearchResult]) -> None:
+        """设置解析结果缓存
+
+        Args:
+            code: 标准化后的股票代码
+            market_type: 市场类型
+            result: 解析结果，None表示未找到该股票
+        """
+        key = (code, market_type)
+        ttl = self._ttl_seconds if result is not None else self._negative_ttl_seconds
+
+        with self._lock:
+            self._cache[key] = (result, time.time() + ttl)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._max_entries:
+                self._cache.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """清空所有缓存"""
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息
+
+        Returns:
+            缓存统计信息
+        """
+        with self._lock:
+            negative_count = sum(1 for result, _ in self._cache.values() if result is None)
+            lookups = self._hits + self._negative_hits + self._misses
+            return {
+                "total_cached": len(self._cache),
+                "negative_cached": negative_count,
+                "max_entries": self._max_entries,
+                "hits": self._hits,
+                "negative_hits": self._negative_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_ratio": (self._hits + self._negative_hits) / lookups if lookups else 0.0,
+                "ttl_seconds": self._ttl_seconds,
+                "negative_ttl_seconds": self._negative_ttl_seconds
+            }
+
+
+# 全局缓存实例
+_symbol_cache = SymbolCache(
+    max_entries=SYMBOL_CACHE_MAX_ENTRIES,
+    ttl_seconds=SYMBOL_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=SYMBOL_CACHE_NEGATIVE_TTL_SECONDS
+)
+
+
+def get_symbol_cache() -> SymbolCache:
+    """获取全局股票代码解析缓存实例"""
+    return _symbol_cache
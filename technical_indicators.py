@@ -1,8 +1,11 @@
 """技术指标计算模块"""
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List
-from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+import math
+
+import indicator_kernels as kernels
+from market_time import format_local_times
 
 
 def resample_kline_data(df: pd.DataFrame, interval: str) -> pd.DataFrame:
@@ -60,7 +63,8 @@ def resample_kline_data(df: pd.DataFrame, interval: str) -> pd.DataFrame:
     resampled['volume'] = resampled['volume'].fillna(0)
     
     # 重新添加 time 列（从索引转换回 Unix 时间戳）
-    resampled['time'] = resampled.index.astype('int64') // 10**9
+    # 先统一为秒精度：pandas 3 默认的datetime精度为秒而不是纳秒，直接 // 10**9 会得到错误的时间戳
+    resampled['time'] = resampled.index.values.astype('datetime64[s]').astype('int64')
     
     # 重置索引，保持 time 列
     resampled = resampled.reset_index(drop=True)
@@ -68,17 +72,374 @@ def resample_kline_data(df: pd.DataFrame, interval: str) -> pd.DataFrame:
     return resampled
 
 
-def calculate_sma(df: pd.DataFrame, period: int, column: str = 'close') -> pd.Series:
-    """计算简单移动平均线 (SMA)"""
-    return df[column].rolling(window=period).mean()
+# 日K聚合支持的周期
+AGGREGATE_INTERVALS = ('weekly', 'monthly', 'quarterly', 'yearly')
+
+
+def _calendar_period_keys(times: np.ndarray, interval: str, tz: str) -> np.ndarray:
+    """
+    计算每根日K所属的日历周期编号（按市场本地日期）
+    
+    - weekly: 以周一为一周开始
+    - monthly/quarterly/yearly: 自然月/季度/年
+    """
+    local = pd.to_datetime(times, unit='s', utc=True).tz_convert(tz).tz_localize(None)
+    if interval == 'weekly':
+        # 1970-01-01 是周四，+3 后按7天整除即以周一为界
+        days = local.values.astype('datetime64[D]').astype(np.int64)
+        return (days + 3) // 7
+    
+    years = local.year.to_numpy(dtype=np.int64)
+    if interval == 'yearly':
+        return years
+    months = local.month.to_numpy(dtype=np.int64)
+    if interval == 'quarterly':
+        return years * 4 + (months - 1) // 3
+    return years * 12 + months - 1
+
+
+def aggregate_daily_kline_data(
+    df: pd.DataFrame,
+    interval: str,
+    tz: str = 'Asia/Shanghai',
+    drop_first: bool = True
+) -> pd.DataFrame:
+    """
+    将日K数据聚合为周K/月K/季K/年K（向量化按日历周期分组）
+    
+    - 按市场本地日期划分周期，组内 open 取第一根、close 取最后一根、
+      high/low 取极值、volume 求和
+    - time 使用周期内最后一个交易日的时间戳
+    - drop_first=True 时丢弃第一个周期（日K历史可能从周期中间开始，该周期不完整）
+    
+    Args:
+        df: 按时间升序排列、包含 time/open/high/low/close/volume 列的日K数据
+        interval: 目标周期 ('weekly', 'monthly', 'quarterly', 'yearly')
+        tz: 市场时区名称（如 'America/New_York'）
+        drop_first: 是否丢弃第一个（可能不完整的）周期
+    
+    Returns:
+        聚合后的DataFrame（列与输入相同）
+    """
+    if interval not in AGGREGATE_INTERVALS:
+        raise ValueError(f"Unsupported aggregate interval: {interval}")
+    
+    required_cols = ['time', 'open', 'high', 'low', 'close', 'volume']
+    missing_cols = [col for col in required_cols if col not in df.columns]
+    if missing_cols:
+        raise ValueError(f"DataFrame missing required columns: {missing_cols}")
+    
+    if df.empty:
+        return df[required_cols].copy()
+    
+    times = df['time'].to_numpy(dtype=np.int64)
+    keys = _calendar_period_keys(times, interval, tz)
+    
+    # 数据按时间升序，周期编号变化的位置即为每组的起点
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    ends = np.concatenate((starts[1:], [len(keys)])) - 1
+    
+    high = df['high'].to_numpy(dtype=np.float64)
+    low = df['low'].to_numpy(dtype=np.float64)
+    volume = df['volume'].to_numpy()
+    
+    result = pd.DataFrame({
+        'time': times[ends],
+        'open': df['open'].to_numpy(dtype=np.float64)[starts],
+        'high': np.maximum.reduceat(high, starts),
+        'low': np.minimum.reduceat(low, starts),
+        'close': df['close'].to_numpy(dtype=np.float64)[ends],
+        'volume': np.add.reduceat(volume, starts)
+    })
+    
+    if drop_first:
+        result = result.iloc[1:].reset_index(drop=True)
+    
+    return result
+
+
+# ---------------------------------------------------------------------------
+# 指标计算图
+#
+# 指标之间共享的中间结果（价格差分、EMA、滚动均值/标准差、真实波幅等）声明为节点，
+# 节点键为可哈希的元组，如 ("ema", ("col", "close"), 12)。同一帧数据上每个节点只计算一次，
+# 请求的指标只会计算其依赖的节点。
+# ---------------------------------------------------------------------------
+
+def _col(name: str) -> tuple:
+    """原始列节点"""
+    return ("col", name)
+
+
+def _node_col(graph: "IndicatorGraph", name: str) -> pd.Series:
+    return graph.df[name]
+
+
+def _node_diff(graph: "IndicatorGraph", src: tuple) -> pd.Series:
+    return graph.get(src).diff()
+
+
+def _node_shift(graph: "IndicatorGraph", src: tuple) -> pd.Series:
+    return graph.get(src).shift()
+
+
+def _node_gain(graph: "IndicatorGraph", src: tuple) -> pd.Series:
+    delta = graph.get(("diff", src))
+    return delta.where(delta > 0, 0)
+
+
+def _node_loss(graph: "IndicatorGraph", src: tuple) -> pd.Series:
+    delta = graph.get(("diff", src))
+    return -delta.where(delta < 0, 0)
+
+
+def _node_ema(graph: "IndicatorGraph", src: tuple, span: int) -> pd.Series:
+    return graph.get(src).ewm(span=span, adjust=False).mean()
+
+
+def _node_wilder(graph: "IndicatorGraph", src: tuple, period: int) -> pd.Series:
+    # Wilder's Smoothing 等价于 alpha = 1/period 的EMA
+    return graph.get(src).ewm(alpha=1/period, adjust=False).mean()
+
+
+def _node_sma(graph: "IndicatorGraph", src: tuple, window: int) -> pd.Series:
+    return graph.get(src).rolling(window=window).mean()
+
+
+def _node_rolling_sum(graph: "IndicatorGraph", src: tuple, window: int) -> pd.Series:
+    return graph.get(src).rolling(window=window).sum()
+
+
+def _node_rolling_std(graph: "IndicatorGraph", src: tuple, window: int) -> pd.Series:
+    return graph.get(src).rolling(window=window).std()
+
+
+def _node_sub(graph: "IndicatorGraph", a: tuple, b: tuple) -> pd.Series:
+    return graph.get(a) - graph.get(b)
+
+
+def _node_mul(graph: "IndicatorGraph", a: tuple, b: tuple) -> pd.Series:
+    return graph.get(a) * graph.get(b)
+
+
+def _node_scale(graph: "IndicatorGraph", src: tuple, factor: float) -> pd.Series:
+    return graph.get(src) * factor
+
+
+def _node_true_range(graph: "IndicatorGraph") -> pd.Series:
+    high = graph.get(_col('high'))
+    low = graph.get(_col('low'))
+    prev_close = graph.get(("shift", _col('close')))
+    
+    tr1 = high - low
+    tr2 = abs(high - prev_close)
+    tr3 = abs(low - prev_close)
+    return pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+
 
+def _node_typical_price(graph: "IndicatorGraph") -> pd.Series:
+    return (graph.get(_col('high')) + graph.get(_col('low')) + graph.get(_col('close'))) / 3
 
-def calculate_ema(df: pd.DataFrame, period: int, column: str = 'close') -> pd.Series:
+
+def _node_money_flow(graph: "IndicatorGraph", direction: int) -> pd.Series:
+    # 典型价格上涨(direction=1)/下跌(direction=-1)时的资金流量，其余为0
+    typical_price = graph.get(("typical_price",))
+    prev_typical_price = graph.get(("shift", ("typical_price",)))
+    money_flow = graph.get(("mul", ("typical_price",), _col('volume')))
+    moved = typical_price > prev_typical_price if direction > 0 else typical_price < prev_typical_price
+    return money_flow.where(moved, 0)
+
+
+# 节点类型 -> 计算函数（第一个参数为计算图，其余为节点键中的参数）
+_NODE_FUNCS = {
+    "col": _node_col,
+    "diff": _node_diff,
+    "shift": _node_shift,
+    "gain": _node_gain,
+    "loss": _node_loss,
+    "ema": _node_ema,
+    "wilder": _node_wilder,
+    "sma": _node_sma,
+    "rolling_sum": _node_rolling_sum,
+    "rolling_std": _node_rolling_std,
+    "sub": _node_sub,
+    "mul": _node_mul,
+    "scale": _node_scale,
+    "true_range": _node_true_range,
+    "typical_price": _node_typical_price,
+    "money_flow": _node_money_flow,
+}
+
+
+# ---------------------------------------------------------------------------
+# NumPy后端：节点值为float64数组，滚动/平滑类节点使用 indicator_kernels 中的内核。
+# 内核要求输入不含NaN，含NaN时回退到 pandas 计算。
+# ---------------------------------------------------------------------------
+
+def _np_node_col(graph: "IndicatorGraph", name: str) -> np.ndarray:
+    return graph.df[name].to_numpy(dtype=np.float64)
+
+
+def _np_node_diff(graph: "IndicatorGraph", src: tuple) -> np.ndarray:
+    return kernels.diff(graph.get(src))
+
+
+def _np_node_shift(graph: "IndicatorGraph", src: tuple) -> np.ndarray:
+    return kernels.shift(graph.get(src))
+
+
+def _np_node_gain(graph: "IndicatorGraph", src: tuple) -> np.ndarray:
+    delta = graph.get(("diff", src))
+    return np.where(delta > 0, delta, 0.0)
+
+
+def _np_node_loss(graph: "IndicatorGraph", src: tuple) -> np.ndarray:
+    delta = graph.get(("diff", src))
+    return -np.where(delta < 0, delta, 0.0)
+
+
+def _np_ewm(x: np.ndarray, alpha: float) -> np.ndarray:
+    if np.isnan(x).any():
+        return pd.Series(x).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return kernels.ewm_mean(x, alpha)
+
+
+def _np_rolling(x: np.ndarray, window: int, method: str) -> np.ndarray:
+    if np.isnan(x).any():
+        return getattr(pd.Series(x).rolling(window=window), method)().to_numpy()
+    return getattr(kernels, f"rolling_{method}")(x, window)
+
+
+def _np_node_ema(graph: "IndicatorGraph", src: tuple, span: int) -> np.ndarray:
+    return _np_ewm(graph.get(src), 2 / (span + 1))
+
+
+def _np_node_wilder(graph: "IndicatorGraph", src: tuple, period: int) -> np.ndarray:
+    return _np_ewm(graph.get(src), 1 / period)
+
+
+def _np_node_sma(graph: "IndicatorGraph", src: tuple, window: int) -> np.ndarray:
+    return _np_rolling(graph.get(src), window, "mean")
+
+
+def _np_node_rolling_sum(graph: "IndicatorGraph", src: tuple, window: int) -> np.ndarray:
+    return _np_rolling(graph.get(src), window, "sum")
+
+
+def _np_node_rolling_std(graph: "IndicatorGraph", src: tuple, window: int) -> np.ndarray:
+    return _np_rolling(graph.get(src), window, "std")
+
+
+def _np_node_true_range(graph: "IndicatorGraph") -> np.ndarray:
+    return kernels.true_range(
+        graph.get(_col('high')), graph.get(_col('low')), graph.get(("shift", _col('close')))
+    )
+
+
+def _np_node_money_flow(graph: "IndicatorGraph", direction: int) -> np.ndarray:
+    typical_price = graph.get(("typical_price",))
+    prev_typical_price = graph.get(("shift", ("typical_price",)))
+    money_flow = graph.get(("mul", ("typical_price",), _col('volume')))
+    moved = typical_price > prev_typical_price if direction > 0 else typical_price < prev_typical_price
+    return np.where(moved, money_flow, 0.0)
+
+
+# 逐元素运算的节点函数两种后端通用
+_NUMPY_NODE_FUNCS = {
+    **_NODE_FUNCS,
+    "col": _np_node_col,
+    "diff": _np_node_diff,
+    "shift": _np_node_shift,
+    "gain": _np_node_gain,
+    "loss": _np_node_loss,
+    "ema": _np_node_ema,
+    "wilder": _np_node_wilder,
+    "sma": _np_node_sma,
+    "rolling_sum": _np_node_rolling_sum,
+    "rolling_std": _np_node_rolling_std,
+    "true_range": _np_node_true_range,
+    "money_flow": _np_node_money_flow,
+}
+
+
+class IndicatorGraph:
+    """指标计算图
+    
+    - 绑定一帧K线数据（DataFrame），按需计算并缓存节点
+    - 多个指标共享的节点（如MACD三条线共用的EMA、布林带共用的均值/标准差、
+      各周期RSI共用的价格差分）只计算一次
+    """
+    
+    # 节点类型 -> 计算函数
+    node_funcs = _NODE_FUNCS
+    
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._nodes: Dict[tuple, pd.Series] = {}
+        self.evaluated = 0  # 实际计算的节点数
+    
+    def get(self, key: tuple) -> pd.Series:
+        """获取节点值（未计算时先计算依赖节点）"""
+        value = self._nodes.get(key)
+        if value is None:
+            value = self.node_funcs[key[0]](self, *key[1:])
+            self._nodes[key] = value
+            self.evaluated += 1
+        return value
+
+
+class NumpyIndicatorGraph(IndicatorGraph):
+    """NumPy后端的指标计算图
+    
+    节点值为float64数组而不是 pandas Series，指标函数返回的也是数组；
+    结果与 pandas 后端在浮点误差范围内一致
+    """
+    
+    node_funcs = _NUMPY_NODE_FUNCS
+
+
+# 指标计算后端
+INDICATOR_BACKENDS = {
+    "pandas": IndicatorGraph,
+    "numpy": NumpyIndicatorGraph,
+}
+
+
+def create_indicator_graph(df: pd.DataFrame, backend: str = "pandas") -> IndicatorGraph:
+    """
+    创建指定后端的指标计算图
+    
+    Args:
+        df: K线数据
+        backend: pandas（默认）或 numpy
+    """
+    graph_class = INDICATOR_BACKENDS.get(backend)
+    if graph_class is None:
+        raise ValueError(f"Unsupported indicator backend: {backend}")
+    return graph_class(df)
+
+
+def as_graph(data) -> IndicatorGraph:
+    """将DataFrame包装为计算图（已是计算图时直接返回）"""
+    if isinstance(data, IndicatorGraph):
+        return data
+    return IndicatorGraph(data)
+
+
+def calculate_sma(df, period: int, column: str = 'close') -> pd.Series:
+    """计算简单移动平均线 (SMA)
+    
+    df 可以是DataFrame，也可以是 IndicatorGraph（共享中间结果）
+    """
+    return as_graph(df).get(("sma", _col(column), period))
+
+
+def calculate_ema(df, period: int, column: str = 'close') -> pd.Series:
     """计算指数移动平均线 (EMA)"""
-    return df[column].ewm(span=period, adjust=False).mean()
+    return as_graph(df).get(("ema", _col(column), period))
 
 
-def calculate_macd(df: pd.DataFrame, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, pd.Series]:
+def calculate_macd(df, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, pd.Series]:
     """
     计算MACD指标
     
@@ -93,27 +454,27 @@ def calculate_macd(df: pd.DataFrame, fast: int = 12, slow: int = 26, signal: int
         - signal: DEA线（信号线）
         - histogram: MACD柱状图 = (DIF - DEA) * 2
     """
-    ema_fast = calculate_ema(df, fast)
-    ema_slow = calculate_ema(df, slow)
-    macd_line = ema_fast - ema_slow  # DIF
-    signal_line = macd_line.ewm(span=signal, adjust=False).mean()  # DEA
-    histogram = (macd_line - signal_line) * 2  # MACD柱 = (DIF - DEA) * 2
+    graph = as_graph(df)
+    close = _col('close')
+    dif = ("sub", ("ema", close, fast), ("ema", close, slow))  # DIF
+    dea = ("ema", dif, signal)  # DEA
+    histogram = ("scale", ("sub", dif, dea), 2)  # MACD柱 = (DIF - DEA) * 2
     
     return {
-        'macd': macd_line,
-        'signal': signal_line,
-        'histogram': histogram
+        'macd': graph.get(dif),
+        'signal': graph.get(dea),
+        'histogram': graph.get(histogram)
     }
 
 
-def calculate_rsi(df: pd.DataFrame, period: int = 14, column: str = 'close') -> pd.Series:
+def calculate_rsi(df, period: int = 14, column: str = 'close') -> pd.Series:
     """计算相对强弱指标 (RSI)
     
     使用Wilder's Smoothing方法（标准RSI计算方法）
-    优化版本：使用ewm代替循环，性能更好
+    优化版本：使用ewm代替循环，价格差分和涨跌幅序列在各周期间共享
     
     Args:
-        df: 包含价格数据的DataFrame
+        df: 包含价格数据的DataFrame（或 IndicatorGraph）
         period: RSI周期，默认14
             - 6: 短期RSI（通常对应股票软件的RSI1）
             - 12: 中期RSI（通常对应股票软件的RSI2）
@@ -124,30 +485,28 @@ def calculate_rsi(df: pd.DataFrame, period: int = 14, column: str = 'close') ->
     Returns:
         RSI序列
     """
-    delta = df[column].diff()
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
-    
-    # 使用ewm实现Wilder's Smoothing
-    # Wilder's Smoothing等价于 EMA with alpha = 1/period
-    # ewm的alpha参数 = 1/period
-    avg_gain = gain.ewm(alpha=1/period, adjust=False).mean()
-    avg_loss = loss.ewm(alpha=1/period, adjust=False).mean()
-    
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
+    graph = as_graph(df)
+    src = _col(column)
+    avg_gain = graph.get(("wilder", ("gain", src), period))
+    avg_loss = graph.get(("wilder", ("loss", src), period))
+    
+    # NumPy后端为数组运算，平均跌幅为0时与 pandas 一样得到 inf/NaN，不产生警告
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        rsi = 100 - (100 / (1 + rs))
     return rsi
 
 
-def calculate_bollinger_bands(df: pd.DataFrame, period: int = 20, std_dev: float = 2.0, column: str = 'close') -> Dict[str, pd.Series]:
+def calculate_bollinger_bands(df, period: int = 20, std_dev: float = 2.0, column: str = 'close') -> Dict[str, pd.Series]:
     """
     计算布林带
     
     Returns:
         dict: 包含 'upper', 'middle', 'lower' 的字典
     """
-    middle = calculate_sma(df, period, column)
-    std = df[column].rolling(window=period).std()
+    graph = as_graph(df)
+    middle = graph.get(("sma", _col(column), period))
+    std = graph.get(("rolling_std", _col(column), period))
     upper = middle + (std * std_dev)
     lower = middle - (std * std_dev)
     
@@ -158,36 +517,28 @@ def calculate_bollinger_bands(df: pd.DataFrame, period: int = 20, std_dev: float
     }
 
 
-def calculate_atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
+def calculate_atr(df, period: int = 14) -> pd.Series:
     """计算平均真实范围 (ATR)"""
-    high = df['high']
-    low = df['low']
-    close = df['close']
-    
-    tr1 = high - low
-    tr2 = abs(high - close.shift())
-    tr3 = abs(low - close.shift())
-    
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    atr = tr.rolling(window=period).mean()
-    
-    return atr
+    return as_graph(df).get(("sma", ("true_range",), period))
 
 
-def calculate_vwma(df: pd.DataFrame, period: int = 20) -> pd.Series:
+def calculate_vwma(df, period: int = 20) -> pd.Series:
     """计算成交量加权移动平均线 (VWMA)"""
-    return (df['close'] * df['volume']).rolling(window=period).sum() / df['volume'].rolling(window=period).sum()
+    graph = as_graph(df)
+    volume = _col('volume')
+    weighted = graph.get(("rolling_sum", ("mul", _col('close'), volume), period))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return weighted / graph.get(("rolling_sum", volume, period))
 
 
-def calculate_mfi(df: pd.DataFrame, period: int = 14) -> pd.Series:
+def calculate_mfi(df, period: int = 14) -> pd.Series:
     """计算资金流量指数 (MFI)"""
-    typical_price = (df['high'] + df['low'] + df['close']) / 3
-    money_flow = typical_price * df['volume']
-    
-    positive_flow = money_flow.where(typical_price > typical_price.shift(), 0).rolling(window=period).sum()
-    negative_flow = money_flow.where(typical_price < typical_price.shift(), 0).rolling(window=period).sum()
+    graph = as_graph(df)
+    positive_flow = graph.get(("rolling_sum", ("money_flow", 1), period))
+    negative_flow = graph.get(("rolling_sum", ("money_flow", -1), period))
     
-    mfi = 100 - (100 / (1 + positive_flow / negative_flow))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mfi = 100 - (100 / (1 + positive_flow / negative_flow))
     return mfi
 
 
@@ -229,7 +580,7 @@ INDICATOR_DESCRIPTIONS = {
     "vwma": "VWMA: A moving average weighted by volume. Usage: Confirm trends by integrating price action with volume data. Tips: Watch for skewed results from volume spikes; use in combination with other volume analyses."
 }
 
-# 指标计算函数映射
+# 指标计算函数映射（参数可以是DataFrame或IndicatorGraph）
 INDICATOR_CALC_FUNCS = {
     "close_50_sma": lambda df: calculate_sma(df, 50),
     "close_200_sma": lambda df: calculate_sma(df, 200),
@@ -249,27 +600,256 @@ INDICATOR_CALC_FUNCS = {
 }
 
 
-def format_timestamp(timestamp: int, date_only: bool = False) -> str:
+
+def ema_warmup(alpha: float, tolerance: float) -> int:
+    """
+    EMA类平滑的预热长度：初始值的权重 (1-alpha)^n 衰减到 tolerance 以下所需的K线数
+    
+    从序列中间开始计算时，只要向前多取这么多根K线，结果与使用全部历史的差异
+    不超过 tolerance × 初始偏差
+    """
+    if alpha >= 1:
+        return 1
+    return int(math.ceil(math.log(tolerance) / math.log(1 - alpha)))
+
+
+# 指标预热长度：计算某个时间点的指标值需要向前追溯的K线数
+# - SMA/布林带/VWMA/ATR等固定窗口指标：窗口长度（ATR另需前一根收盘价）
+# - EMA/MACD/RSI等递归平滑指标：按收敛容差计算（MACD为慢线EMA与信号线EMA之和）
+INDICATOR_LOOKBACKS = {
+    "close_50_sma": lambda tolerance: 50,
+    "close_200_sma": lambda tolerance: 200,
+    "close_10_ema": lambda tolerance: ema_warmup(2 / (10 + 1), tolerance),
+    "macd": lambda tolerance: ema_warmup(2 / (26 + 1), tolerance) + ema_warmup(2 / (9 + 1), tolerance),
+    "rsi": lambda tolerance: 1 + ema_warmup(1 / 24, tolerance),  # 组内最长周期 RSI(24)
+    "boll": lambda tolerance: 20,
+    "atr": lambda tolerance: 14 + 1,
+    "vwma": lambda tolerance: 20,
+}
+
+
+# 指标窗口长度：得到第一个完整窗口的指标值所需的K线数（EMA类为平滑周期，不含收敛所需的预热）
+INDICATOR_WINDOWS = {
+    "close_50_sma": 50,
+    "close_200_sma": 200,
+    "close_10_ema": 10,
+    "macd": 26 + 9,  # 慢线EMA加信号线EMA
+    "rsi": 24 + 1,  # 组内最长周期 RSI(24)，另需前一根收盘价
+    "boll": 20,
+    "atr": 14 + 1,
+    "vwma": 20,
+}
+
+
+def indicator_window(indicators: List[str]) -> int:
     """
-    将Unix时间戳转换为易读的日期时间格式
+    获取一组指标的最大窗口长度（K线数）
     
     Args:
-        timestamp: Unix时间戳（秒）
-        date_only: 是否只返回日期（不包含时间）
-        
+        indicators: 指标列表（同组指标如 macds/macdh 按所在组计算）
+    """
+    return max((INDICATOR_WINDOWS[INDICATOR_GROUPS.get(name, name)] for name in indicators), default=0)
+
+
+def indicator_lookback(indicators: List[str], tolerance: float = 1e-12) -> int:
+    """
+    获取一组指标所需的最大预热长度（K线数）
+    
+    Args:
+        indicators: 指标列表（同组指标如 macds/macdh 按所在组计算）
+        tolerance: EMA类指标的收敛容差
+    """
+    return max(
+        (INDICATOR_LOOKBACKS[INDICATOR_GROUPS.get(name, name)](tolerance) for name in indicators),
+        default=0
+    )
+
+
+def slice_for_range(
+    df: pd.DataFrame,
+    lookback: int,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    截取计算日期范围内指标所需的K线：范围内的K线加上范围开始前 lookback 根K线
+    
+    - 按时间列二分查找边界（time 必须升序）
+    - 范围结束之后的K线不影响范围内的指标值，直接丢弃
+    
+    Args:
+        df: K线数据
+        lookback: 预热长度（indicator_lookback）
+        start_time: 范围开始时间戳（包含，可选）
+        end_time: 范围结束时间戳（包含，可选）
+    """
+    times = df['time'].to_numpy()
+    lo, hi = 0, len(times)
+    if start_time is not None:
+        lo = max(int(np.searchsorted(times, start_time, side='left')) - lookback, 0)
+    if end_time is not None:
+        hi = int(np.searchsorted(times, end_time, side='right'))
+    if lo == 0 and hi == len(times):
+        return df
+    return df.iloc[lo:hi]
+
+
+def merge_indicator_outputs(
+    times: pd.Series,
+    groups: List[List[tuple]],
+    market_type: str,
+    date_only: bool = False,
+    raw_values: bool = False,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    按列构建以日期为键的指标输出（向量化），多组指标按时间合并
+    
+    - 每组指标独立判断有效行：组内任一列为NaN的行不输出该组
+    - 至少有一组有效的行才会出现在结果中，结果按时间顺序排列
+    - 日期字符串批量生成，数值按列统一四舍五入/格式化
+    - 指定 start_time/end_time 时只输出该时间范围内的行
+    
+    Args:
+        times: 时间戳列
+        groups: 指标组列表，每组为 [(输出名称, 指标值Series, 小数位数)]
+        market_type: 市场类型（用于时间转换）
+        date_only: 是否只显示日期
+        raw_values: True 返回四舍五入后的浮点数，False 返回格式化字符串
+        start_time: 输出范围开始时间戳（包含，可选）
+        end_time: 输出范围结束时间戳（包含，可选）
+    
     Returns:
-        格式化的日期时间字符串
-        - date_only=True: YYYY-MM-DD
-        - date_only=False: YYYY-MM-DD HH:MM:SS
+        {日期字符串: {输出名称: 值}}
+    """
+    times = np.asarray(times)
+    in_range = np.ones(len(times), dtype=bool)
+    if start_time is not None:
+        in_range &= times >= start_time
+    if end_time is not None:
+        in_range &= times <= end_time
+    
+    group_masks = []
+    for columns in groups:
+        valid = in_range.copy()
+        for _, series, _ in columns:
+            valid &= ~np.isnan(np.asarray(series, dtype=np.float64))
+        group_masks.append(valid)
+    
+    any_valid = np.zeros(len(times), dtype=bool)
+    for valid in group_masks:
+        any_valid |= valid
+    
+    all_keys = np.empty(len(times), dtype=object)
+    all_keys[any_valid] = format_local_times(times[any_valid], market_type, date_only=date_only)
+    
+    # 先按时间顺序建立所有日期键，再逐组填充
+    results = {key: {} for key in all_keys[any_valid]}
+    for columns, valid in zip(groups, group_masks):
+        names = [name for name, _, _ in columns]
+        formatted = []
+        for _, series, decimals in columns:
+            column = np.asarray(series, dtype=np.float64)[valid]
+            if raw_values:
+                formatted.append(np.round(column, decimals).tolist())
+            else:
+                formatted.append(np.char.mod(f"%.{decimals}f", column).tolist())
+        
+        for key, row in zip(all_keys[valid].tolist(), zip(*formatted)):
+            results[key].update(zip(names, row))
+    
+    return results
+
+
+def build_indicator_output(
+    times: pd.Series,
+    columns: List[tuple],
+    market_type: str,
+    date_only: bool = False,
+    raw_values: bool = False,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    按列构建单组指标的输出，丢弃任一列为NaN的行（参见 merge_indicator_outputs）
+    """
+    return merge_indicator_outputs(
+        times, [columns], market_type,
+        date_only=date_only, raw_values=raw_values,
+        start_time=start_time, end_time=end_time
+    )
+
+
+# 同一组内的指标共享计算结果和输出列（如 macd/macds/macdh 都输出MACD三列）
+INDICATOR_GROUPS = {
+    "macd": "macd", "macds": "macd", "macdh": "macd",
+    "rsi": "rsi", "rsi_6": "rsi", "rsi_12": "rsi", "rsi_24": "rsi",
+    "boll": "boll", "boll_ub": "boll", "boll_lb": "boll",
+}
+
+
+def _required_columns(indicator: str) -> List[str]:
+    """获取计算指标所需的列"""
+    required_cols = ['time', 'close']
+    if indicator in ['atr', 'boll', 'boll_ub', 'boll_lb']:
+        required_cols.extend(['open', 'high', 'low'])
+    if indicator in ['vwma']:
+        required_cols.extend(['volume'])
+    return required_cols
+
+
+def _indicator_columns(df, indicator: str) -> List[tuple]:
+    """
+    计算指标并返回输出列定义 [(输出名称, 指标值Series, 小数位数)]
+    
+    df 传入 IndicatorGraph 时，多个指标共享中间节点
     """
-    dt = datetime.fromtimestamp(timestamp)
-    if date_only:
-        return dt.strftime('%Y-%m-%d')
-    else:
-        return dt.strftime('%Y-%m-%d %H:%M:%S')
+    # 特殊处理 MACD（返回三个值）
+    # macds 和 macdh 也映射到 macd
+    if indicator in ["macd", "macds", "macdh"]:
+        macd_data = calculate_macd(df)
+        return [
+            ("MACD", macd_data['macd'], 4),
+            ("MACD_Signal", macd_data['signal'], 4),
+            ("MACD_Hist", macd_data['histogram'], 4)
+        ]
+    
+    # 特殊处理 RSI（返回四个周期的值）
+    # rsi_6, rsi_12, rsi_24 也映射到 rsi
+    if indicator in ["rsi", "rsi_6", "rsi_12", "rsi_24"]:
+        return [
+            (f"RSI({period})", calculate_rsi(df, period), 2)
+            for period in [6, 12, 14, 24]
+        ]
+    
+    # 特殊处理布林带（返回三个值）
+    # boll_ub 和 boll_lb 也映射到 boll
+    if indicator in ["boll", "boll_ub", "boll_lb"]:
+        boll_data = calculate_bollinger_bands(df)
+        return [
+            ("Boll_Upper", boll_data['upper'], 4),
+            ("Boll_Middle", boll_data['middle'], 4),
+            ("Boll_Lower", boll_data['lower'], 4)
+        ]
+    
+    # 其他单值指标
+    calc_func = INDICATOR_CALC_FUNCS[indicator]
+    indicator_name = SUPPORTED_INDICATORS[indicator][0]
+    return [(indicator_name, calc_func(df), 4)]
 
 
-def calculate_single_indicator(df: pd.DataFrame, indicator: str, market_type: str, time_converter, interval: str = "daily") -> Dict[str, Any]:
+def calculate_single_indicator(
+    df: pd.DataFrame,
+    indicator: str,
+    market_type: str,
+    interval: str = "daily",
+    raw_values: bool = False,
+    graph: IndicatorGraph = None,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    backend: str = "pandas"
+) -> Dict[str, Any]:
     """
     计算单个技术指标的时间序列数据
     
@@ -277,8 +857,12 @@ def calculate_single_indicator(df: pd.DataFrame, indicator: str, market_type: st
         df: 包含OHLCV数据的DataFrame（必须有time列）
         indicator: 要计算的指标
         market_type: 市场类型（用于时间转换）
-        time_converter: 时间转换函数
         interval: 时间间隔（用于决定日期格式）
+        raw_values: 是否返回浮点数（默认返回格式化字符串）
+        graph: 绑定同一份K线的计算图（可选，如流式计算图；默认新建 IndicatorGraph）
+        start_time: 只输出该时间戳及之后的数据（可选）
+        end_time: 只输出该时间戳及之前的数据（可选）
+        backend: 未传入 graph 时新建计算图使用的后端（pandas / numpy）
         
     Returns:
         以日期为键的指标数据字典
@@ -291,13 +875,7 @@ def calculate_single_indicator(df: pd.DataFrame, indicator: str, market_type: st
         return {"error": f"Unsupported indicator: {indicator}"}
     
     # 检查必需的列（根据指标类型）
-    required_cols = ['time', 'close']
-    if indicator in ['atr', 'boll', 'boll_ub', 'boll_lb']:
-        required_cols.extend(['open', 'high', 'low'])
-    if indicator in ['vwma']:
-        required_cols.extend(['volume'])
-    
-    missing_cols = [col for col in required_cols if col not in df.columns]
+    missing_cols = [col for col in _required_columns(indicator) if col not in df.columns]
     if missing_cols:
         return {"error": f"DataFrame missing required columns: {missing_cols}"}
     
@@ -306,155 +884,44 @@ def calculate_single_indicator(df: pd.DataFrame, indicator: str, market_type: st
     use_date_only = interval in date_only_intervals
     
     try:
-        # 计算指标
-        calc_func = INDICATOR_CALC_FUNCS[indicator]
-        
-        # 特殊处理 MACD（返回三个值）
-        # macds 和 macdh 也映射到 macd
-        if indicator in ["macd", "macds", "macdh"]:
-            macd_data = calculate_macd(df)
-            
-            # 创建临时DataFrame用于向量化处理
-            temp_df = pd.DataFrame({
-                'time': df['time'],
-                'macd': macd_data['macd'],
-                'signal': macd_data['signal'],
-                'histogram': macd_data['histogram']
-            })
-            
-            # 过滤掉无效数据
-            temp_df = temp_df.dropna()
-            
-            # 向量化生成日期字符串
-            if use_date_only:
-                temp_df['date_str'] = temp_df['time'].apply(lambda x: format_timestamp(int(x), date_only=True))
-            else:
-                temp_df['date_str'] = temp_df['time'].apply(lambda x: time_converter(int(x), market_type))
-            
-            # 向量化格式化数值
-            results = {}
-            for _, row in temp_df.iterrows():
-                results[row['date_str']] = {
-                    "MACD": f"{float(row['macd']):.4f}",
-                    "MACD_Signal": f"{float(row['signal']):.4f}",
-                    "MACD_Hist": f"{float(row['histogram']):.4f}"
-                }
-            
-            return results
-        
-        # 特殊处理 RSI（返回四个周期的值）
-        # rsi_6, rsi_12, rsi_24 也映射到 rsi
-        elif indicator in ["rsi", "rsi_6", "rsi_12", "rsi_24"]:
-            periods = [6, 12, 14, 24]
-            rsi_results = {}
-            
-            # 串行计算各周期的RSI
-            for period in periods:
-                rsi_results[period] = calculate_rsi(df, period)
-            
-            # 创建临时DataFrame用于向量化处理
-            temp_df = pd.DataFrame({
-                'time': df['time'],
-                'rsi6': rsi_results[6],
-                'rsi12': rsi_results[12],
-                'rsi14': rsi_results[14],
-                'rsi24': rsi_results[24]
-            })
-            
-            # 过滤掉无效数据
-            temp_df = temp_df.dropna()
-            
-            # 向量化生成日期字符串
-            if use_date_only:
-                temp_df['date_str'] = temp_df['time'].apply(lambda x: format_timestamp(int(x), date_only=True))
-            else:
-                temp_df['date_str'] = temp_df['time'].apply(lambda x: time_converter(int(x), market_type))
-            
-            # 向量化格式化数值
-            results = {}
-            for _, row in temp_df.iterrows():
-                results[row['date_str']] = {
-                    "RSI(6)": f"{float(row['rsi6']):.2f}",
-                    "RSI(12)": f"{float(row['rsi12']):.2f}",
-                    "RSI(14)": f"{float(row['rsi14']):.2f}",
-                    "RSI(24)": f"{float(row['rsi24']):.2f}"
-                }
-            
-            return results
-        
-        # 特殊处理布林带（返回三个值）
-        # boll_ub 和 boll_lb 也映射到 boll
-        elif indicator in ["boll", "boll_ub", "boll_lb"]:
-            boll_data = calculate_bollinger_bands(df)
-            
-            # 创建临时DataFrame用于向量化处理
-            temp_df = pd.DataFrame({
-                'time': df['time'],
-                'upper': boll_data['upper'],
-                'middle': boll_data['middle'],
-                'lower': boll_data['lower']
-            })
-            
-            # 过滤掉无效数据
-            temp_df = temp_df.dropna()
-            
-            # 向量化生成日期字符串
-            if use_date_only:
-                temp_df['date_str'] = temp_df['time'].apply(lambda x: format_timestamp(int(x), date_only=True))
-            else:
-                temp_df['date_str'] = temp_df['time'].apply(lambda x: time_converter(int(x), market_type))
-            
-            # 向量化格式化数值
-            results = {}
-            for _, row in temp_df.iterrows():
-                results[row['date_str']] = {
-                    "Boll_Upper": f"{float(row['upper']):.4f}",
-                    "Boll_Middle": f"{float(row['middle']):.4f}",
-                    "Boll_Lower": f"{float(row['lower']):.4f}"
-                }
-            
-            return results
-        
-        # 其他单值指标
-        else:
-            values = calc_func(df)
-            indicator_name = SUPPORTED_INDICATORS[indicator][0]
-            
-            # 创建临时DataFrame用于向量化处理
-            temp_df = pd.DataFrame({
-                'time': df['time'],
-                'value': values
-            })
-            
-            # 过滤掉无效数据
-            temp_df = temp_df.dropna()
-            
-            # 向量化生成日期字符串
-            if use_date_only:
-                temp_df['date_str'] = temp_df['time'].apply(lambda x: format_timestamp(int(x), date_only=True))
-            else:
-                temp_df['date_str'] = temp_df['time'].apply(lambda x: time_converter(int(x), market_type))
-            
-            # 向量化格式化数值
-            results = {}
-            for _, row in temp_df.iterrows():
-                results[row['date_str']] = {
-                    indicator_name: f"{float(row['value']):.4f}"
-                }
-            
-            return results
+        return build_indicator_output(
+            df['time'], _indicator_columns(graph if graph is not None else create_indicator_graph(df, backend), indicator), market_type,
+            date_only=use_date_only, raw_values=raw_values,
+            start_time=start_time, end_time=end_time
+        )
             
     except Exception as e:
         return {"error": str(e)}
 
 
-def calculate_indicators_series(df: pd.DataFrame, indicators: list = None) -> Dict[str, Any]:
+def calculate_indicators_series(
+    df: pd.DataFrame,
+    indicators: list = None,
+    market_type: str = "US",
+    interval: str = "daily",
+    raw_values: bool = False,
+    graph: IndicatorGraph = None,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    backend: str = "pandas"
+) -> Dict[str, Any]:
     """
-    计算技术指标的时间序列数据
+    基于同一份K线数据一次计算多个技术指标，并按时间合并
+    
+    - 同组指标（如 macd/macds/macdh）只输出一次
+    - 所有指标共享一个 IndicatorGraph，公共中间结果只计算一次
+    - 每个日期只包含该时间点已有有效值的指标
     
     Args:
         df: 包含OHLCV数据的DataFrame（必须有time列）
         indicators: 要计算的指标列表，如果为None则计算所有指标
+        market_type: 市场类型（用于时间转换）
+        interval: 时间间隔（用于决定日期格式）
+        raw_values: 是否返回浮点数（默认返回格式化字符串）
+        graph: 绑定同一份K线的计算图（可选，如流式计算图；默认新建 IndicatorGraph）
+        start_time: 只输出该时间戳及之后的数据（可选）
+        end_time: 只输出该时间戳及之前的数据（可选）
+        backend: 未传入 graph 时新建计算图使用的后端（pandas / numpy）
         
     Returns:
         包含所有指标时间序列的字典，格式为 {日期: {指标名: 值}}
@@ -466,41 +933,36 @@ def calculate_indicators_series(df: pd.DataFrame, indicators: list = None) -> Di
     if 'time' not in df.columns:
         return {"error": "DataFrame must have 'time' column"}
     
-    # 计算所有指标
-    indicator_values = {}
-    for indicator in indicators:
-        if indicator in SUPPORTED_INDICATORS:
-            try:
-                calc_func = INDICATOR_CALC_FUNCS[indicator]
-                values = calc_func(df)
-                indicator_values[indicator] = values
-            except Exception as e:
-                indicator_values[indicator] = None
-    
-    # 按日期组织数据
-    results = {}
-    for i in range(len(df)):
-        time_val = df.iloc[i]['time']
-        if pd.isna(time_val):
-            continue
-        
-        timestamp = int(time_val)
-        date_str = format_timestamp(timestamp)
-        
-        # 创建该日期的数据字典
-        date_data = {}
+    unsupported = [indicator for indicator in indicators if indicator not in SUPPORTED_INDICATORS]
+    if unsupported:
+        return {"error": f"Unsupported indicators: {unsupported}"}
+    
+    required_cols = {col for indicator in indicators for col in _required_columns(indicator)}
+    missing_cols = sorted(col for col in required_cols if col not in df.columns)
+    if missing_cols:
+        return {"error": f"DataFrame missing required columns: {missing_cols}"}
+    
+    date_only_intervals = ["daily", "weekly", "monthly", "quarterly", "yearly"]
+    use_date_only = interval in date_only_intervals
+    
+    try:
+        # 所有指标共享同一个计算图，公共节点（EMA、均值、标准差、差分等）只计算一次
+        if graph is None:
+            graph = create_indicator_graph(df, backend)
+        groups = []
+        seen_groups = set()
         for indicator in indicators:
-            if indicator in indicator_values and indicator_values[indicator] is not None:
-                values = indicator_values[indicator]
-                if i < len(values):
-                    val = values.iloc[i]
-                    if not pd.isna(val):
-                        # 使用指标的显示名称
-                        indicator_name = SUPPORTED_INDICATORS[indicator][0]
-                        date_data[indicator_name] = f"{float(val):.4f}"
+            group = INDICATOR_GROUPS.get(indicator, indicator)
+            if group in seen_groups:
+                continue
+            seen_groups.add(group)
+            groups.append(_indicator_columns(graph, indicator))
         
-        # 只添加有数据的日期
-        if date_data:
-            results[date_str] = date_data
+        return merge_indicator_outputs(
+            df['time'], groups, market_type,
+            date_only=use_date_only, raw_values=raw_values,
+            start_time=start_time, end_time=end_time
+        )
     
-    return results
+    except Exception as e:
+        return {"error": str(e)}
@@ -0,0 +1,145 @@
+"""请求耗时分解模块（Server-Timing）
+
+每个接口请求创建一个追踪上下文（contextvars），客户端和接口代码用 span()/traced() 记录各阶段耗时，
+如 search_stock、get_kline_bars、上游请求、响应解析、重采样、指标计算和响应渲染：
+- 响应头 Server-Timing 列出各阶段累计耗时（同名阶段多次执行时合并，desc 中注明次数）和总耗时
+- 可选输出一行JSON格式的结构化日志
+
+没有追踪上下文时（如后台刷新任务）span() 只做一次 ContextVar 读取。
+工作池在线程模式下会把追踪上下文传递到工作线程，进程模式下只记录阶段的整体耗时。
+"""
+from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
+import json
+import time
+
+from starlette.datastructures import MutableHeaders
+
+
+class Trace:
+    """单个请求的追踪上下文"""
+
+    __slots__ = ("started", "spans")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # 阶段名 -> [累计耗时（秒）, 次数]，按首次出现的顺序
+        self.spans: Dict[str, List[float]] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        """记录一次阶段耗时"""
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def server_timing(self, total: float) -> str:
+        """生成 Server-Timing 响应头的值（毫秒）"""
+        parts = []
+        for name, (seconds, count) in self.spans.items():
+            if count > 1:
+                parts.append(f'{name};dur={seconds * 1000:.2f};desc="x{count}"')
+            else:
+                parts.append(f"{name};dur={seconds * 1000:.2f}")
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """各阶段耗时（毫秒）和次数"""
+        return {
+            name: {"ms": round(seconds * 1000, 3), "count": count}
+            for name, (seconds, count) in self.spans.items()
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    """当前请求的追踪上下文（不在请求中时为None）"""
+    return _current_trace.get()
+
+
+def add_span(name: str, seconds: float) -> None:
+    """向当前请求记录一个已测得的阶段耗时"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+@contextmanager
+def span(name: str):
+    """记录 with 块的耗时为一个阶段"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - started)
+
+
+def traced(name: str):
+    """记录异步函数耗时的装饰器"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TracingMiddleware:
+    """为每个接口请求创建追踪上下文，在响应头中输出 Server-Timing 的ASGI中间件"""
+
+    def __init__(self, app, emit_header: bool = True, log: bool = False):
+        """
+        Args:
+            app: ASGI应用
+            emit_header: 是否在响应头中输出 Server-Timing
+            log: 请求结束后是否输出一行JSON格式的耗时日志
+        """
+        self.app = app
+        self.emit_header = emit_header
+        self.log = log
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace()
+        token = _current_trace.set(trace)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.emit_header:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", trace.server_timing(time.perf_counter() - trace.started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            if self.log:
+                route = scope.get("route")
+                print(json.dumps({
+                    "event": "request_timing",
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(route, "path", None),
+                    "status": status,
+                    "total_ms": round((time.perf_counter() - trace.started) * 1000, 3),
+                    "spans": trace.to_dict()
+                }, ensure_ascii=False), flush=True)
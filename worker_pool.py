@@ -0,0 +1,224 @@
+"""CPU密集型任务工作池模块
+
+将K线重采样、指标计算、结果格式化等CPU密集型阶段从事件循环移到线程池或进程池执行，
+避免一个耗时的指标请求阻塞同一事件循环上的交易/行情请求。
+
+- mode: thread（默认，线程池；NumPy/pandas的大部分计算会释放GIL）、
+  process（进程池；任务函数和参数必须可pickle）、inline（在事件循环中直接执行）
+- 排队深度有上限：执行中+排队中的任务数超过 max_workers + max_queue 时抛出 WorkerPoolBusy；
+  任务在工作线程/进程中真正结束时才计为完成（等待方被取消不会提前释放名额）
+- 按阶段统计每次任务的排队等待时间和执行时间，并记入当前请求的 Server-Timing（阶段名和 pool_wait）
+- thread 模式下任务在提交时的 contextvars 上下文中执行，任务内记录的耗时阶段归入发起请求
+- process 模式下任务在子进程中执行，无法读写主进程的全局状态（如流式指标计算图），参数每次都要pickle
+"""
+from typing import Any, Callable, Dict, Optional, Tuple
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import contextvars
+import threading
+import time
+
+from config import WORKER_POOL_MODE, WORKER_POOL_MAX_WORKERS, WORKER_POOL_MAX_QUEUE
+from tracing import add_span
+
+
+class WorkerPoolBusy(Exception):
+    """工作池排队已满"""
+
+
+def _timed_call(func: Callable, args: tuple, kwargs: dict) -> Tuple[float, Any, float]:
+    """在工作线程/进程中执行任务，返回 (开始时间, 结果, 结束时间)
+
+    time.perf_counter 基于系统单调时钟，可在进程间比较
+    """
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return started, result, time.perf_counter()
+
+
+class _StageStats:
+    """单个阶段的耗时统计"""
+
+    __slots__ = ("calls", "errors", "wait_total", "wait_max", "run_total", "run_max")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+        self.run_max = 0.0
+
+    def record(self, wait: float, run: float) -> None:
+        self.calls += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.run_total += run
+        self.run_max = max(self.run_max, run)
+
+    def to_dict(self) -> Dict[str, Any]:
+        calls = self.calls or 1
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "wait_avg_ms": self.wait_total / calls * 1000,
+            "wait_max_ms": self.wait_max * 1000,
+            "run_avg_ms": self.run_total / calls * 1000,
+            "run_max_ms": self.run_max * 1000
+        }
+
+
+class WorkerPool:
+    """CPU密集型任务工作池
+
+    - 执行器在首次提交任务时创建，shutdown() 后再次提交会重新创建
+    - run() 在事件循环中等待任务完成，不阻塞其他请求
+    - 线程安全
+    """
+
+    def __init__(self, mode: str = "thread", max_workers: int = 4, max_queue: int = 32):
+        """
+        初始化工作池
+
+        Args:
+            mode: thread / process / inline
+            max_workers: 工作线程/进程数
+            max_queue: 最大排队任务数（不含正在执行的任务）
+        """
+        if mode not in ("thread", "process", "inline"):
+            raise ValueError(f"Unsupported worker pool mode: {mode}")
+        self._mode = mode
+        self._max_workers = max(1, max_workers)
+        self._max_queue = max(0, max_queue)
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+        self._pending = 0
+        self._max_pending = 0
+        self._rejected = 0
+        self._stages: Dict[str, _StageStats] = {}
+
+    @property
+    def mode(self) -> str:
+        """执行方式（thread / process / inline）"""
+        return self._mode
+
+    def _get_executor(self) -> Executor:
+        """获取执行器（不存在时创建）"""
+        with self._lock:
+            if self._executor is None:
+                if self._mode == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._max_workers, thread_name_prefix="cpu-worker"
+                    )
+            return self._executor
+
+    def _task_done(self, future: Optional[Future] = None) -> None:
+        """任务结束（或提交失败）时释放排队名额"""
+        with self._lock:
+            self._pending -= 1
+
+    def _stage(self, stage: str) -> _StageStats:
+        stats = self._stages.get(stage)
+        if stats is None:
+            stats = self._stages[stage] = _StageStats()
+        return stats
+
+    async def run(self, stage: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        在工作池中执行CPU密集型任务
+
+        Args:
+            stage: 阶段名称（用于耗时统计，如 resample_kline_data）
+            func: 任务函数（process 模式下必须是模块级函数）
+            *args, **kwargs: 任务参数
+
+        Returns:
+            任务函数的返回值
+
+        Raises:
+            WorkerPoolBusy: 执行中+排队中的任务数已达上限
+        """
+        submitted = time.perf_counter()
+
+        if self._mode == "inline":
+            try:
+                started, result, finished = _timed_call(func, args, kwargs)
+            except Exception:
+                with self._lock:
+                    self._stage(stage).errors += 1
+                raise
+            with self._lock:
+                self._stage(stage).record(started - submitted, finished - started)
+            add_span(stage, finished - started)
+            return result
+
+        with self._lock:
+            if self._pending >= self._max_workers + self._max_queue:
+                self._rejected += 1
+                raise WorkerPoolBusy(f"工作池繁忙（{self._pending}个任务执行或排队中），请稍后重试")
+            self._pending += 1
+            self._max_pending = max(self._max_pending, self._pending)
+
+        try:
+            if self._mode == "thread":
+                # 执行器不传递 contextvars，在提交时的上下文副本中执行
+                future = self._get_executor().submit(
+                    contextvars.copy_context().run, _timed_call, func, args, kwargs
+                )
+            else:
+                future = self._get_executor().submit(_timed_call, func, args, kwargs)
+        except BaseException:
+            self._task_done()
+            raise
+        # 任务真正结束（完成、出错或排队中被取消）时才释放名额：
+        # 等待方被取消（如客户端断开）后，已在执行的任务仍占用工作线程/进程
+        future.add_done_callback(self._task_done)
+
+        try:
+            started, result, finished = await asyncio.wrap_future(future)
+        except Exception:
+            with self._lock:
+                self._stage(stage).errors += 1
+            raise
+
+        with self._lock:
+            self._stage(stage).record(started - submitted, finished - started)
+        add_span("pool_wait", started - submitted)
+        add_span(stage, finished - started)
+        return result
+
+    def shutdown(self) -> None:
+        """关闭执行器（等待执行中的任务完成）"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取工作池统计信息（按阶段的排队等待/执行耗时）"""
+        with self._lock:
+            return {
+                "mode": self._mode,
+                "max_workers": self._max_workers,
+                "max_queue": self._max_queue,
+                "pending": self._pending,
+                "max_pending": self._max_pending,
+                "rejected": self._rejected,
+                "stages": {name: stats.to_dict() for name, stats in self._stages.items()}
+            }
+
+
+# 全局实例
+_worker_pool = WorkerPool(
+    mode=WORKER_POOL_MODE,
+    max_workers=WORKER_POOL_MAX_WORKERS,
+    max_queue=WORKER_POOL_MAX_QUEUE
+)
+
+
+def get_worker_pool() -> WorkerPool:
+    """获取全局CPU任务工作池实例"""
+    return _worker_pool